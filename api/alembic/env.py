@@ -2,6 +2,7 @@
 This file is executed by Alembic when migrations are run.
 """
 
+import logging
 import os
 import sys
 from logging.config import fileConfig
@@ -15,6 +16,7 @@ sys.path.insert(0, os.path.abspath("."))
 try:
     import app  # pylint: disable=unused-import
     from app.db.models import Base
+    from app.utils.database_service import dedupe_tag_links
 
     target_metadata = Base.metadata
 except ImportError:
@@ -22,6 +24,7 @@ except ImportError:
         "WARNING: Could not import 'Base' from 'app.db.models'. Autogenerate may fail."
     )
     target_metadata = None
+    dedupe_tag_links = None
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -31,6 +34,7 @@ config = context.config
 # This line sets up loggers basically.
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
+logger = logging.getLogger("alembic.env")
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -98,6 +102,11 @@ def run_migrations_online() -> None:
         context.configure(connection=connection, target_metadata=target_metadata)
 
         with context.begin_transaction():
+            if dedupe_tag_links is not None:
+                # Duplicate links would make adding their unique constraints fail
+                removed = dedupe_tag_links(connection)
+                if removed:
+                    logger.info(f"Removed {removed} duplicate tag links")
             context.run_migrations()
 
 
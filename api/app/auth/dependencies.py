@@ -106,6 +106,14 @@ class RequestContext:
 
         return stmt
 
+    def visibility_key(self) -> list:
+        """Identify the rows team_filter lets the user see.
+
+        Used in cache keys, so users seeing the same rows share cached results.
+        :return: ["admin"] for admins, sorted team IDs otherwise.
+        """
+        return ["admin"] if self.is_admin else sorted(self.team_ids)
+
     def require_admin(self):
         """Enforces that the current user has admin privileges.
 
@@ -89,6 +89,20 @@ class ConflictError(AppBaseException):
         super().__init__(message, "CONFLICT")
 
 
+class VersionConflictError(ConflictError):
+    """Exception for 409, when an entity changed since the client read it."""
+
+    def __init__(self, obj_type: str):
+        """Create VersionConflictError exception.
+
+        :param obj_type: Entity type
+        """
+        super().__init__(
+            f"{obj_type} was modified by another user. Reload it and try again."
+        )
+        self.code = "VERSION_CONFLICT"
+
+
 class TargetSaveError(AppBaseException):
     """Custom exception for Prometheus target saving errors."""
 
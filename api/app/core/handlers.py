@@ -3,6 +3,7 @@
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.core.exceptions import (
     AccessDeniedError,
@@ -69,6 +70,26 @@ def setup_exception_handlers(app: FastAPI):
             },
         )
 
+    @app.exception_handler(StaleDataError)
+    async def stale_data_handler(request: Request, exc: StaleDataError):
+        """Handler for 409 request caused by optimistic locking.
+
+        StaleDataError is raised when the version_id of an updated or deleted
+        row no longer matches, because another request changed it first.
+
+        :param request: Request body
+        :exc Exception: StaleDataError
+
+        """
+        return JSONResponse(
+            status_code=409,
+            content={
+                "detail": "This item was modified by another user. "
+                "Reload it and try again.",
+                "code": "VERSION_CONFLICT",
+            },
+        )
+
     @app.exception_handler(Exception)
     async def unhandled_exception_handler(request: Request, exc: Exception):
         """Handler for 500 request.
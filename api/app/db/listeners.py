@@ -1,15 +1,30 @@
-"""Database listeners for History logging."""
+"""Database listeners for History logging and cache invalidation."""
 
+import asyncio
 import json
+import logging
+import os
+import re
 from datetime import date, datetime
 from enum import Enum
-from typing import Any, Optional
+from typing import Any, Dict, Iterable, Optional, Tuple
 
+from dotenv import load_dotenv
 from sqlalchemy import event, inspect
 from sqlalchemy.exc import NoInspectionAvailable
-from sqlalchemy.orm import Session, UOWTransaction
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
+from sqlalchemy.sql.elements import TextClause
 
 from app.db.models import ActionType, EntityType, History
+from app.utils.cache_service import invalidate, registered_tags, track_invalidation
+
+logger = logging.getLogger(__name__)
+load_dotenv(".env/api.env")
+HISTORY_UPDATE_FORMAT = os.getenv("HISTORY_UPDATE_FORMAT", "diff")
+TEXT_WRITE_PATTERN = re.compile(
+    r"\b(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+\"?(\w+)", re.IGNORECASE
+)
+_invalidation_tasks = set()
 
 
 def json_serializer(obj: Any):
@@ -80,6 +95,124 @@ def identify_entity_type(obj: Any):
     return result
 
 
+def compact_update_states(before: dict, after: dict, changes: dict):
+    """Drop columns from UPDATE states which are already stored in extra_data.
+
+    Changed columns are kept in extra_data only and unchanged ones are not
+    stored at all. States keep version_id and changed relationships.
+    :param before: State before the update
+    :param after: State after the update
+    :param changes: Changed columns with old and new values
+    :return: Tuple of compacted before and after states
+    """
+    keys = {
+        key
+        for key in after
+        if key == "version_id"
+        or (key not in changes and before.get(key) != after.get(key))
+    }
+    return (
+        {key: before[key] for key in keys if key in before},
+        {key: after[key] for key in keys},
+    )
+
+
+def history_states(
+    before: Optional[dict], after: Optional[dict], extra_data: Optional[dict]
+) -> tuple[dict, dict]:
+    """Get before and after states of a history entry in either storage format.
+
+    Diff-only UPDATE entries keep changed columns in extra_data only, so they
+    are merged back into the states. Full snapshots are returned unchanged.
+    :param before: Stored before_state
+    :param after: Stored after_state
+    :param extra_data: Stored extra_data
+    :return: Tuple of before and after states.
+    """
+    before, after = dict(before or {}), dict(after or {})
+    for field, change in (extra_data or {}).items():
+        if isinstance(change, dict):
+            before.setdefault(field, change.get("old"))
+            after.setdefault(field, change.get("new"))
+    return before, after
+
+
+INTERNAL_KEYS = {
+    "id",
+    "version_id",
+    "user_id",
+    "team_id",
+    "hashed_password",
+    "is_active",
+    "is_verified",
+    "is_superuser",
+    "force_password_change",
+    "timestamp",
+    "metadata_id",
+    "item_id",
+    "layout_id",
+    "localization_id",
+    "room_id",
+    "rental_id",
+    "category_id",
+    "machine_id",
+    "entity_id",
+}
+
+
+def get_state_diff(
+    before: Dict[str, Any],
+    after: Dict[str, Any],
+    extra_data: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Compares two states and returns only the keys that changed.
+
+    Excluding internal/system keys. Works with full snapshots and with
+    diff-only UPDATE entries, whose changes are stored in extra_data.
+    :param before: Before action state
+    :param after: After action state
+    :param extra_data: Changed fields of the entry
+    :return Diff between passed states
+    """
+    before, after = history_states(before, after, extra_data)
+
+    b_clean = {k: v for k, v in before.items() if k not in INTERNAL_KEYS}
+    a_clean = {k: v for k, v in after.items() if k not in INTERNAL_KEYS}
+
+    if not b_clean or not a_clean:
+        return b_clean, a_clean
+
+    diff_before = {}
+    diff_after = {}
+
+    all_keys = set(b_clean.keys()) | set(a_clean.keys())
+
+    for key in all_keys:
+        val_b = b_clean.get(key)
+        val_a = a_clean.get(key)
+
+        if val_b != val_a:
+            diff_before[key] = val_b
+            diff_after[key] = val_a
+
+    return diff_before, diff_after
+
+
+def history_diff_columns(
+    before: Optional[dict], after: Optional[dict], extra_data: Optional[dict]
+) -> dict:
+    """Compute cleaned diff columns shown by the history subpage.
+
+    Empty diffs are stored as empty objects, NULL marks rows not computed yet.
+    :param before: Stored before_state
+    :param after: Stored after_state
+    :param extra_data: Stored extra_data
+    :return: Dictionary with before_diff and after_diff values.
+    """
+    before_diff, after_diff = get_state_diff(before, after, extra_data)
+    return {"before_diff": before_diff, "after_diff": after_diff}
+
+
 # pylint: disable=unused-argument
 @event.listens_for(Session, "before_flush")
 def receive_before_flush(
@@ -92,7 +225,8 @@ def receive_before_flush(
     before the database transaction commits the changes.
 
     - **UPDATE** logs: Compares current and previous values to record specific
-        field changes.
+        field changes. With HISTORY_UPDATE_FORMAT=diff the states keep only
+        version_id and changed relationships, see compact_update_states.
     - **DELETE** logs: Captures the full state of the object *before* deletion.
     - **CREATE** (preparatory): Stores new objects in `session.info` for later
       processing in `after_flush`, where the `entity_id` will be available.
@@ -159,6 +293,10 @@ def receive_before_flush(
                 }
 
         if has_changes:
+            if HISTORY_UPDATE_FORMAT == "diff":
+                before_dict, after_dict = compact_update_states(
+                    before_dict, after_dict, changes
+                )
 
             before_json = json.loads(json.dumps(before_dict, default=json_serializer))
             after_json = json.loads(json.dumps(after_dict, default=json_serializer))
@@ -229,3 +367,128 @@ def receive_after_flush(session: Session, flush_context: UOWTransaction):
                     after_state=get_entity_state(obj),
                 )
             )
+
+
+# pylint: disable=unused-argument
+@event.listens_for(History, "before_insert")
+def receive_history_before_insert(mapper, connection, target: History):
+    """Store cleaned diff of a history entry when it is written.
+
+    :param mapper: History mapper
+    :param connection: Database connection
+    :param target: Inserted history entry
+    :return: None
+    """
+    if target.before_diff is None and target.after_diff is None:
+        diff = history_diff_columns(
+            target.before_state, target.after_state, target.extra_data
+        )
+        target.before_diff = diff["before_diff"]
+        target.after_diff = diff["after_diff"]
+
+
+def mark_cache_tags(session: Session, table_names: Iterable[str]):
+    """Remember changed tables whose cache tag is used by a cached function.
+
+    :param session: Current SQLAlchemy Session object
+    :param table_names: Names of changed tables
+    """
+    tags = registered_tags.intersection(table_names)
+    if tags:
+        session.info.setdefault("cache_tags", set()).update(tags)
+
+
+def _table_name(obj: Any):
+    """Get mapped table name of an ORM instance.
+
+    :param obj: SQLAlchemy model instance
+    :return: Table name or None
+    """
+    try:
+        return inspect(obj).mapper.persist_selectable.name
+    except NoInspectionAvailable:
+        return None
+
+
+# pylint: disable=unused-argument
+@event.listens_for(Session, "after_flush")
+def collect_flushed_cache_tags(session: Session, flush_context: UOWTransaction):
+    """Collect cache tags of tables changed by the flush.
+
+    :param session: Current SQLAlchemy Session object
+    :param flush_context: Unit of work transaction context
+    :return: None
+    """
+    if not registered_tags:
+        return
+    changed = {*session.new, *session.dirty, *session.deleted}
+    mark_cache_tags(session, {_table_name(obj) for obj in changed})
+
+
+@event.listens_for(Session, "do_orm_execute")
+def collect_executed_cache_tags(orm_execute_state: ORMExecuteState):
+    """Collect cache tags of tables changed by bulk INSERT/UPDATE/DELETE statements.
+
+    Raw text() statements are scanned for written table names, so they are
+    tracked as long as they run through the session. Writes on a bare
+    connection still have to call mark_cache_tags.
+    :param orm_execute_state: State of the executed ORM statement
+    :return: None
+    """
+    if not registered_tags:
+        return
+    if isinstance(orm_execute_state.statement, TextClause):
+        written = TEXT_WRITE_PATTERN.findall(orm_execute_state.statement.text)
+        mark_cache_tags(orm_execute_state.session, {name.lower() for name in written})
+        return
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None:
+        mark_cache_tags(orm_execute_state.session, {table.name})
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_cache_tags(session: Session):
+    """Bump cache tags of tables changed by the committed transaction.
+
+    Commits cannot await in this hook, so the bump runs as a task. Requests
+    wait for it before responding (see awaited_invalidations).
+    :param session: Current SQLAlchemy Session object
+    :return: None
+    """
+    tags = session.info.pop("cache_tags", None)
+    if not tags:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(invalidate(*tags))
+    _invalidation_tasks.add(task)
+    task.add_done_callback(_finish_invalidation)
+    track_invalidation(task)
+
+
+def _finish_invalidation(task: asyncio.Task):
+    """Drop reference to finished invalidation task and log its failure.
+
+    :param task: Finished invalidation task
+    """
+    _invalidation_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Cache invalidation failed: {task.exception()}")
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_cache_tags(session: Session):
+    """Forget cache tags collected by a rolled back transaction.
+
+    :param session: Current SQLAlchemy Session object
+    :return: None
+    """
+    session.info.pop("cache_tags", None)
@@ -12,6 +12,7 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     String,
     UniqueConstraint,
@@ -216,6 +217,7 @@ class Metadata(Base):
 
     id = Column(Integer, primary_key=True)
     last_update = Column(Date, nullable=True)
+    last_refresh_attempt = Column(DateTime, nullable=True)
     agent_prometheus = Column(Boolean, nullable=True, default=False)
     ansible_access = Column(Boolean, nullable=True, default=False)
     ansible_root_access = Column(Boolean, nullable=True, default=False)
@@ -305,7 +307,10 @@ class Rentals(Base):
     end_date = Column(Date, nullable=False)
     user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
     quantity = Column(Integer, nullable=False, default=1)
-    __table_args__ = {"schema": None}
+    __table_args__ = (
+        Index("ix_rentals_item_period", "item_id", "end_date", "start_date"),
+        {"schema": None},
+    )
 
     version_id = Column(Integer, nullable=False, default=1)
 
@@ -384,15 +389,57 @@ class History(Base):
     timestamp = Column(
         DateTime(timezone=True),
         server_default=func.now(),  # pylint: disable=not-callable
+        index=True,
     )
     before_state = Column(JSONB)
     after_state = Column(JSONB)
     can_rollback = Column(Boolean, default=True)
     extra_data = Column(JSONB)
+    before_diff = Column(JSONB)
+    after_diff = Column(JSONB)
+
+    __table_args__ = (Index("ix_history_entity", "entity_type", "entity_id", "id"),)
 
     user = relationship("User", back_populates="history")
 
 
+class HistoryCheckpoint(Base):
+    """HistoryCheckpoint model holding entity state folded up to a history entry."""
+
+    __tablename__ = "history_checkpoints"
+
+    id = Column(Integer, primary_key=True)
+    entity_type = Column(
+        Enum(EntityType, name="entity_type_enum", create_type=True), nullable=False
+    )
+    entity_id = Column(Integer, nullable=False)
+    history_id = Column(
+        Integer, ForeignKey("history.id", ondelete="CASCADE"), nullable=False
+    )
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    state = Column(JSONB, nullable=True)
+    complete = Column(Boolean, nullable=False, server_default="true")
+
+    __table_args__ = (
+        UniqueConstraint(
+            "entity_type", "entity_id", "history_id", name="_history_checkpoint_uc"
+        ),
+    )
+
+
+class DataMigration(Base):
+    """DataMigration model marking one-off data migrations which already ran."""
+
+    __tablename__ = "data_migrations"
+
+    name = Column(String, primary_key=True)
+    applied_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),  # pylint: disable=not-callable
+        nullable=False,
+    )
+
+
 class Tags(Base):
     """Tags model representing tags in the system."""
 
@@ -445,6 +492,8 @@ class TagsRooms(Base):
     room_id = Column(Integer, ForeignKey("rooms.id"))
     tag_id = Column(Integer, ForeignKey("tags.id"))
 
+    __table_args__ = (UniqueConstraint("room_id", "tag_id", name="_room_tag_uc"),)
+
 
 class TagsDocumentation(Base):
     """TagsDocumentation model representing association between documentation and tags."""
@@ -455,6 +504,10 @@ class TagsDocumentation(Base):
     documentation_id = Column(Integer, ForeignKey("documentation.id"))
     tag_id = Column(Integer, ForeignKey("tags.id"))
 
+    __table_args__ = (
+        UniqueConstraint("documentation_id", "tag_id", name="_documentation_tag_uc"),
+    )
+
 
 class TagsRacks(Base):
     """TagsRacks model representing association between racks and tags."""
@@ -465,6 +518,8 @@ class TagsRacks(Base):
     rack_id = Column(Integer, ForeignKey("racks.id"))
     tag_id = Column(Integer, ForeignKey("tags.id"))
 
+    __table_args__ = (UniqueConstraint("rack_id", "tag_id", name="_rack_tag_uc"),)
+
 
 class TagsMachines(Base):
     """TagsMachines model representing association between machines and tags."""
@@ -474,6 +529,8 @@ class TagsMachines(Base):
     machine_id = Column(Integer, ForeignKey("machines.id"))
     tag_id = Column(Integer, ForeignKey("tags.id"))
 
+    __table_args__ = (UniqueConstraint("machine_id", "tag_id", name="_machine_tag_uc"),)
+
 
 class UsersTeams(Base):
     """UsersTeams model representing association between users and teams for many-to-many relationship."""
@@ -2,7 +2,7 @@
 
 from datetime import date, datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Annotated, Any, Dict, List, Optional
 
 from fastapi_users import schemas
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
@@ -93,6 +93,20 @@ class TagsAssignment(BaseModel):
     entity_type: str
 
 
+class TagsEntityRef(BaseModel):
+    """Reference to an entity that can be tagged."""
+
+    entity_id: int
+    entity_type: str
+
+
+class TagsBulkAssignment(BaseModel):
+    """Used for tag assignment to many entities of any supported type at once."""
+
+    tag_ids: List[int] = Field(..., min_length=1)
+    entities: List[TagsEntityRef] = Field(..., min_length=1)
+
+
 # ==========================
 #          LAYOUT
 # ==========================
@@ -179,13 +193,15 @@ class RoomsResponse(RoomsBase):
 class RoomDashboardResponse(BaseModel):
     """Schema for displaying room information on the dashboard.
 
-    Including rack count and map link.
+    Including rack, machine and online machine counts and map link.
     """
 
     id: int
     name: str
     team_name: str
     rack_count: int
+    machine_count: int = 0
+    online_count: int = 0
     map_link: Optional[str] = None
 
 
@@ -680,6 +696,32 @@ class CPUResponse(CPUBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CPUBulkEntry(BaseModel):
+    """Schema for one CPU of a machine CPU list."""
+
+    name: str = Field(..., max_length=100, description="CPU naming")
+
+
+class CPUBulkCreate(CPUBulkEntry):
+    """Schema for creating one CPU within a batch."""
+
+    machine_id: int
+
+
+class CPUBulkUpdate(BaseModel):
+    """Schema for updating one CPU within a batch."""
+
+    id: int
+    name: Optional[str] = Field(None, max_length=100, description="CPU naming")
+
+
+class MachineCPUsReplace(BaseModel):
+    """Schema for the new CPU list of one machine."""
+
+    machine_id: int
+    cpus: List[CPUBulkEntry] = Field(default_factory=list)
+
+
 class DisksBase(BaseModel):
     """Base model for Disks."""
 
@@ -711,6 +753,40 @@ class DiskResponse(DisksBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class DiskBulkEntry(BaseModel):
+    """Schema for one disk of a machine disk list."""
+
+    name: str = Field(..., max_length=100, description="Disk naming")
+    capacity: Optional[str] = Field(None, max_length=50, description="Disk capacity")
+
+
+class DiskBulkCreate(DiskBulkEntry):
+    """Schema for creating one disk within a batch."""
+
+    machine_id: int
+
+
+class DiskBulkUpdate(BaseModel):
+    """Schema for updating one disk within a batch."""
+
+    id: int
+    name: Optional[str] = Field(None, max_length=100, description="Disk naming")
+    capacity: Optional[str] = Field(None, max_length=50, description="Disk capacity")
+
+
+class MachineDisksReplace(BaseModel):
+    """Schema for the new disk list of one machine."""
+
+    machine_id: int
+    disks: List[DiskBulkEntry] = Field(default_factory=list)
+
+
+class BulkDelete(BaseModel):
+    """Schema for deleting many objects of one type at once."""
+
+    ids: List[int] = Field(..., min_length=1)
+
+
 # ==========================
 #          MACHINES
 # ==========================
@@ -758,6 +834,35 @@ class MachinesCreate(MachinesBase):
     )
 
 
+class MachineImportDisk(BaseModel):
+    """Disk of a machine in bulk import files."""
+
+    name: str = Field(..., max_length=100)
+    capacity: Optional[str] = Field(None, max_length=50)
+
+
+class MachineImportRow(BaseModel):
+    """Single machine record of a bulk import file.
+
+    Machines are matched by name and room. CPUs and disks replace the current
+    ones when present and are kept when omitted.
+    """
+
+    name: str = Field(..., min_length=1, max_length=100)
+    localization_id: int
+    team_id: Optional[int] = None
+    mac_address: Optional[str] = Field(None, max_length=17)
+    ip_address: Optional[str] = Field(None, max_length=15)
+    pdu_port: Optional[int] = None
+    os: Optional[str] = Field(None, max_length=30)
+    serial_number: Optional[str] = Field(None, max_length=50)
+    note: Optional[str] = Field(None, max_length=500)
+    ram: Optional[str] = Field(None, max_length=100)
+    shelf_id: Optional[int] = None
+    cpus: Optional[List[Annotated[str, Field(max_length=100)]]] = None
+    disks: Optional[List[MachineImportDisk]] = None
+
+
 class MachinesUpdate(BaseModel):
     """Schema for updating a Machine."""
 
@@ -898,6 +1003,21 @@ class RentalInfo(BaseModel):
     end_date: date
 
 
+class RentalAvailabilityResponse(BaseModel):
+    """Schema for reading free quantity of an item within a date range."""
+
+    item_id: int
+    total_quantity: int
+    reserved_quantity: int = Field(
+        ..., description="Highest quantity rented on any day of the range"
+    )
+    available_quantity: int = Field(
+        ..., description="Quantity free for the whole range"
+    )
+    start_date: date
+    end_date: date
+
+
 class RentalReturn(BaseModel):
     """Schema for returning rental."""
 
@@ -908,6 +1028,12 @@ class RentalReturn(BaseModel):
     )
 
 
+class RentalBulkReturn(RentalReturn):
+    """Schema for returning one rental within a batch."""
+
+    rental_id: int = Field(..., description="ID of the rental being returned")
+
+
 # ==========================
 #          INVENTORY
 # ==========================
@@ -1078,6 +1204,68 @@ class HistoryEnhancedResponse(HistoryResponse):
     )
 
 
+class HistoryStateResponse(BaseModel):
+    """Schema for entity state reconstructed from history."""
+
+    entity_type: EntityTypeEnum
+    entity_id: int
+    at: Optional[datetime] = Field(
+        None, description="Point in time, latest state if not provided"
+    )
+    exists: bool = Field(..., description="Whether the entity existed at that time")
+    complete: bool = Field(
+        ...,
+        description="Whether the state starts from a CREATE entry or checkpoint",
+    )
+    state: Optional[Dict[str, Any]] = Field(
+        None, description="Entity columns at that time"
+    )
+    history_id: Optional[int] = Field(
+        None, description="Last history entry included in the state"
+    )
+    checkpoint_history_id: Optional[int] = Field(
+        None, description="History entry of the checkpoint used as starting point"
+    )
+    replayed_entries: int = Field(
+        ..., description="Number of history entries folded after the checkpoint"
+    )
+
+
+class HistoryBatchRollback(BaseModel):
+    """Schema selecting history entries rolled back in one transaction.
+
+    Entries are selected by IDs or by a time range, optionally narrowed to
+    one entity type and one user.
+    """
+
+    history_ids: Optional[List[int]] = Field(None, min_length=1)
+    since: Optional[datetime] = Field(None, description="Entries from this time on")
+    until: Optional[datetime] = Field(None, description="Entries up to this time")
+    entity_type: Optional[EntityTypeEnum] = None
+    user_id: Optional[int] = Field(None, description="Entries made by this user")
+    dry_run: bool = Field(False, description="Only return planned changes")
+
+
+class HistoryRollbackChange(BaseModel):
+    """Schema for net change of one entity planned by a batch rollback."""
+
+    entity_type: EntityTypeEnum
+    entity_id: int
+    operation: str = Field(..., description="update, restore or delete")
+    history_ids: List[int] = Field(..., description="Rolled back history entries")
+    changes: Dict[str, Any] = Field(
+        default_factory=dict, description="Changed fields with old and new values"
+    )
+
+
+class HistoryBatchRollbackResponse(BaseModel):
+    """Schema for result of a batch rollback."""
+
+    dry_run: bool
+    entries: int = Field(..., description="Number of rolled back history entries")
+    changes: List[HistoryRollbackChange]
+
+
 # ==========================
 #       AUTH SCHEMAS
 # ==========================
@@ -1170,6 +1358,14 @@ class ShelfUpdate(BaseModel):
     rack_id: Optional[int] = None
 
 
+class ShelfBulkUpdate(BaseModel):
+    """Schema for updating one shelf within a batch."""
+
+    id: int
+    name: Optional[str] = Field(None, max_length=100)
+    order: Optional[int] = None
+
+
 class ShelfResponse(BaseModel):
     """Schema for reading Shelf data (Response).
 
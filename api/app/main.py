@@ -5,7 +5,7 @@ import os
 from contextlib import asynccontextmanager
 
 import fastapi_users
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from app.core.handlers import setup_exception_handlers
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -13,7 +13,7 @@ from fastapi.staticfiles import StaticFiles
 # pylint: disable=unused-import
 import app.db.listeners
 from app.auth.auth_config import auth_backend, fastapi_users
-from app.database import AsyncSessionLocal
+from app.database import AsyncSessionLocal, async_engine
 from app.db.schemas import UserRead, UserUpdate
 from app.routers import (
     ansible_router,
@@ -36,18 +36,41 @@ from app.routers import (
     database_tags_router,
     database_team_router,
     database_user_router,
+    health_router,
     prometheus_router,
     subpage_history_router,
 )
-from app.routers.prometheus_router import metrics_worker, status_worker
-from app.utils.database_service import init_document, init_super_user, init_virtual_lab
+from app.routers.prometheus_router import (
+    TARGETS_SYNC_INTERVAL,
+    metrics_worker,
+    status_worker,
+    targets_sync_worker,
+)
+from app.utils.cache_service import awaited_invalidations
+from app.utils.database_service import (
+    init_document,
+    init_super_user,
+    init_virtual_lab,
+    run_history_migrations,
+)
+from app.utils.hardware_refresh_service import (
+    HARDWARE_REFRESH_INTERVAL,
+    hardware_refresh_worker,
+)
+from app.utils.history_service import (
+    HISTORY_CHECKPOINT_INTERVAL,
+    history_checkpoint_worker,
+)
+from app.utils.redis_service import redis_manager
 
 
 @asynccontextmanager
 async def lifespan(fast_api_app: FastAPI):  # pylint: disable=unused-argument
     """Application lifespan context manager.
 
-    Starts background tasks for fetching Prometheus metrics.
+    Starts background tasks for fetching Prometheus metrics, reconciling
+    Prometheus targets, refreshing outdated machine hardware and storing
+    history checkpoints.
     :param app: FastAPI application instance
     :return: None
     """
@@ -58,15 +81,26 @@ async def lifespan(fast_api_app: FastAPI):  # pylint: disable=unused-argument
         await init_document(db)
     finally:
         await db.close()
-    status_task = asyncio.create_task(status_worker())
-    metrics_task = asyncio.create_task(metrics_worker())
+    async with async_engine.connect() as connection:
+        await run_history_migrations(connection)
+    tasks = [
+        asyncio.create_task(status_worker()),
+        asyncio.create_task(metrics_worker()),
+    ]
+    if HARDWARE_REFRESH_INTERVAL > 0:
+        tasks.append(asyncio.create_task(hardware_refresh_worker()))
+    if TARGETS_SYNC_INTERVAL > 0:
+        tasks.append(asyncio.create_task(targets_sync_worker()))
+    if HISTORY_CHECKPOINT_INTERVAL > 0:
+        tasks.append(asyncio.create_task(history_checkpoint_worker()))
     try:
         yield
     finally:
         await db.close()
-        status_task.cancel()
-        metrics_task.cancel()
-        await asyncio.gather(status_task, metrics_task, return_exceptions=True)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await redis_manager.close()
 
 
 app = FastAPI(title="Labbyn API", lifespan=lifespan)
@@ -95,6 +129,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def await_cache_invalidations(request: Request, call_next):
+    """Send responses only after cache tags changed by their commits are bumped.
+
+    :param request: Incoming request
+    :param call_next: Next handler of the request
+    :return: Response of the request.
+    """
+    async with awaited_invalidations():
+        return await call_next(request)
+
+
 # FastAPI Users routers
 app.include_router(
     fastapi_users.get_auth_router(auth_backend), prefix="/auth", tags=["auth"]
@@ -129,3 +176,4 @@ app.include_router(database_shelf_router.router)
 app.include_router(database_cpus_router.router)
 app.include_router(database_disks_router.router)
 app.include_router(database_search_router.router)
+app.include_router(health_router.router)
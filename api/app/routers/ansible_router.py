@@ -6,20 +6,25 @@ Creating Ansible user, gathering platform information and deploying Node Exporte
 from datetime import datetime
 
 from fastapi import APIRouter, Depends
-from sqlalchemy import delete, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.dependencies import RequestContext
 from app.core.exceptions import ExternalServiceError, ValidationError
 from app.database import get_async_db
-from app.db.models import CPUs, Disks, Machines, Metadata, Rooms
+from app.db.models import Machines, Metadata, Rooms
 from app.db.schemas import AnsiblePlaybook, DiscoveryRequest, HostRequest
-from app.utils.ansible_service import parse_platform_report, run_playbook_task
+from app.utils.ansible_service import (
+    apply_platform_specs,
+    collect_platform_reports,
+    parse_platform_report,
+    run_playbook_task,
+)
+from app.utils.hardware_refresh_service import get_refresh_progress
 from app.utils.redis_service import acquire_lock
 
 router = APIRouter(tags=["Ansible"])
 
-REPORTS_DIR = "./platform_reports"
 PLAYBOOK_DIR = "/code/ansible"
 
 PLAYBOOK_MAP = {
@@ -153,7 +158,7 @@ async def discover_hosts(
     await ctx.validate_team_access(target_team_id)
 
     try:
-        await run_playbook_task(
+        reports = await collect_platform_reports(
             PLAYBOOK_MAP[AnsiblePlaybook.scan_platform],
             request.hosts,
             request.extra_vars,
@@ -164,7 +169,6 @@ async def discover_hosts(
             f"Ansible Discovery Scan for hosts [{hosts_str}] failed", str(e)
         ) from e
 
-    results = []
     res_room = await db.execute(
         select(Rooms).filter(Rooms.name == "virtual", Rooms.team_id == target_team_id)
     )
@@ -178,87 +182,49 @@ async def discover_hosts(
         await db.commit()
         await db.refresh(default_room)
 
-    for host in request.hosts:
+    hosts = list(dict.fromkeys(request.hosts))
+    errors = {}
+    specs_by_host = {}
+    for host in hosts:
         try:
-            specs = parse_platform_report(host)
-            stmt = select(Machines).filter(Machines.name == host)
-            stmt = ctx.team_filter(stmt, Machines)
-            m_res = await db.execute(stmt)
-            machine = m_res.scalar_one_or_none()
-
-            if machine:
-                for field in ["os", "ram", "mac_address", "ip_address"]:
-                    setattr(machine, field, specs.get(field))
-
-                await db.execute(delete(CPUs).where(CPUs.machine_id == machine.id))
-                for cpu_data in specs.get("cpus", []):
-                    db.add(CPUs(name=cpu_data["name"], machine_id=machine.id))
-
-                await db.execute(delete(Disks).where(Disks.machine_id == machine.id))
-                for disk_data in specs.get("disks", []):
-                    db.add(
-                        Disks(
-                            name=disk_data["name"],
-                            capacity=disk_data.get("capacity"),
-                            machine_id=machine.id,
-                        )
-                    )
-
-                meta_res = await db.execute(
-                    select(Metadata).where(Metadata.id == machine.metadata_id)
-                )
-                meta = meta_res.scalar_one_or_none()
-                if meta:
-                    meta.ansible_access = True
-                    meta.agent_prometheus = specs["agent_prometheus"]
-                    meta.last_update = datetime.now()
-                results.append({"host": host, "status": "updated"})
-            else:
-                new_meta = Metadata(
-                    last_update=datetime.now(),
-                    agent_prometheus=specs["agent_prometheus"],
-                    ansible_access=True,
-                    ansible_root_access=True,
-                )
-                db.add(new_meta)
-                await db.flush()
-
-                new_machine = Machines(
-                    name=host,
-                    team_id=target_team_id,
-                    metadata_id=new_meta.id,
-                    localization_id=default_room.id,
-                    os=specs["os"],
-                    ram=specs["ram"],
-                    mac_address=specs["mac_address"],
-                    ip_address=host,
-                    added_on=datetime.now(),
-                )
-                db.add(new_machine)
-                await db.flush()
-
-                for cpu_data in specs.get("cpus", []):
-                    db.add(CPUs(name=cpu_data["name"], machine_id=new_machine.id))
-                for disk_data in specs.get("disks", []):
-                    db.add(
-                        Disks(
-                            name=disk_data["name"],
-                            capacity=disk_data.get("capacity"),
-                            machine_id=new_machine.id,
-                        )
-                    )
-                results.append({"host": host, "status": "created"})
-
+            specs_by_host[host] = parse_platform_report(reports, host)
         except Exception as e:
+            errors[host] = str(e)
+
+    machines_by_host = {}
+    if specs_by_host:
+        stmt = select(Machines).filter(Machines.name.in_(specs_by_host.keys()))
+        stmt = ctx.team_filter(stmt, Machines)
+        for machine in (await db.execute(stmt)).scalars():
+            if machine.name in machines_by_host:
+                errors[machine.name] = "Multiple machines share this name"
+            machines_by_host[machine.name] = machine
+        for host in errors:
+            specs_by_host.pop(host, None)
+
+    statuses = {}
+    try:
+        statuses = await apply_platform_specs(
+            db, specs_by_host, machines_by_host, target_team_id, default_room.id
+        )
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        errors.update({host: str(e) for host in specs_by_host})
+
+    results = []
+    for host in hosts:
+        if host in errors:
             results.append(
                 {
                     "host": host,
                     "status": "error",
-                    "detail": f"Data processing for {host} failed: {str(e)}",
+                    "detail": f"Data processing for {host} failed: {errors[host]}",
                 }
             )
+        else:
+            results.append({"host": host, "status": statuses[host]})
 
-    await db.commit()
     return {"summary": results}
 
 
@@ -281,37 +247,15 @@ async def refresh_machine_hardware(
     machine = (await db.execute(ctx.team_filter(stmt, Machines))).scalar_one_or_none()
 
     try:
-        await run_playbook_task(
+        reports = await collect_platform_reports(
             PLAYBOOK_MAP[AnsiblePlaybook.scan_platform],
             [machine.name],
             request.extra_vars,
         )
-        specs = parse_platform_report(machine.name)
-        for field in ["os", "ram", "mac_address", "ip_address", "name"]:
-            setattr(machine, field, specs.get(field))
-
-        await db.execute(delete(CPUs).where(CPUs.machine_id == machine.id))
-        for cpu_data in specs.get("cpus", []):
-            db.add(CPUs(name=cpu_data["name"], machine_id=machine.id))
-
-        await db.execute(delete(Disks).where(Disks.machine_id == machine.id))
-        for disk_data in specs.get("disks", []):
-            db.add(
-                Disks(
-                    name=disk_data["name"],
-                    capacity=disk_data.get("capacity"),
-                    machine_id=machine.id,
-                )
-            )
-
-        meta_res = await db.execute(
-            select(Metadata).where(Metadata.id == machine.metadata_id)
+        specs = parse_platform_report(reports, machine.name)
+        await apply_platform_specs(
+            db, {machine.name: specs}, {machine.name: machine}, update_name=True
         )
-        meta = meta_res.scalar_one_or_none()
-        if meta:
-            meta.ansible_access = True
-            meta.agent_prometheus = specs["agent_prometheus"]
-            meta.last_update = datetime.now()
 
         await db.commit()
         return {
@@ -325,6 +269,19 @@ async def refresh_machine_hardware(
         ) from e
 
 
+@router.get("/ansible/refresh/status")
+async def get_hardware_refresh_status(
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Fetch progress of the scheduled fleet-wide hardware refresh.
+
+    :param ctx: Request context for user and team info
+    :return: Progress of the current or last run with per-batch timing.
+    """
+    ctx.require_user()
+    return await get_refresh_progress()
+
+
 @router.post("/ansible/machine/{machine_id}/cleanup")
 async def cleanup_machine(
     machine_id: int,
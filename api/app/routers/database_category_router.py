@@ -1,18 +1,28 @@
 """Router for Category Database API CRUD."""
 
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, Response, status
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.auth.dependencies import RequestContext
-from app.core.exceptions import ObjectNotFoundError, ValidationError, ConflictError
+from app.core.exceptions import (
+    ConflictError,
+    ObjectNotFoundError,
+    ValidationError,
+)
 from app.database import get_async_db
 from app.db.models import Categories
 from app.db.schemas import CategoriesCreate, CategoriesResponse, CategoriesUpdate
-from app.utils.redis_service import acquire_lock
+from app.utils.concurrency_service import (
+    check_version,
+    get_if_match_version,
+    set_entity_etag,
+    write_guard,
+)
 
 router = APIRouter(prefix="/db", tags=["Categories"])
 
@@ -81,12 +91,14 @@ async def get_categories(
 @router.get("/categories/{cat_id}", response_model=CategoriesResponse)
 async def get_category_by_id(
     cat_id: int,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
     """Fetch specific category by ID.
 
     :param cat_id: Category ID
+    :param response: Response used to expose the ETag header
     :param db: Async database session
     :param ctx: Request context for user and team info
     :return: Category object.
@@ -98,6 +110,7 @@ async def get_category_by_id(
 
     if not cat:
         raise ObjectNotFoundError("Category")
+    set_entity_etag(response, cat)
     return cat
 
 
@@ -105,25 +118,30 @@ async def get_category_by_id(
 async def update_category(
     cat_id: int,
     cat_data: CategoriesUpdate,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
+    if_match: Optional[int] = Depends(get_if_match_version),
 ):
     """Update Category.
 
     :param cat_id: Category ID
     :param cat_data: Category data schema
+    :param response: Response used to expose the ETag header
     :param db: Async database session
     :param ctx: Request context for user and team info
+    :param if_match: Expected version, skips the Redis lock when given
     :return: Updated Category.
     """
     ctx.require_admin()
 
-    async with acquire_lock(f"category_lock:{cat_id}"):
+    async with write_guard(f"category_lock:{cat_id}", if_match):
         result = await db.execute(select(Categories).where(Categories.id == cat_id))
         cat = result.scalar_one_or_none()
 
         if not cat:
             raise ObjectNotFoundError("Category")
+        check_version(cat, if_match, "Category")
 
         old_name = cat.name
 
@@ -136,7 +154,9 @@ async def update_category(
             await db.commit()
 
             res = await db.execute(select(Categories).where(Categories.id == cat_id))
-            return res.scalar_one()
+            cat = res.scalar_one()
+            set_entity_etag(response, cat)
+            return cat
 
         except IntegrityError:
             await db.rollback()
@@ -146,7 +166,7 @@ async def update_category(
             )
         except Exception as e:
             await db.rollback()
-            if isinstance(e, ConflictError):
+            if isinstance(e, (ConflictError, StaleDataError)):
                 raise e
             raise ValidationError(f"Failed to update category '{old_name}'") from e
 
@@ -159,22 +179,25 @@ async def delete_category(
     cat_id: int,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
+    if_match: Optional[int] = Depends(get_if_match_version),
 ):
     """Delete category.
 
     :param cat_id: Category ID
     :param db: Async database session
     :param ctx: Request context for user and team info
+    :param if_match: Expected version, skips the Redis lock when given
     :return: 204 No Content as success
     """
     ctx.require_admin()
 
-    async with acquire_lock(f"category_lock:{cat_id}"):
+    async with write_guard(f"category_lock:{cat_id}", if_match):
         result = await db.execute(select(Categories).where(Categories.id == cat_id))
         cat = result.scalar_one_or_none()
 
         if not cat:
             raise ObjectNotFoundError("Category")
+        check_version(cat, if_match, "Category")
 
         try:
             await db.delete(cat)
@@ -182,4 +205,6 @@ async def delete_category(
             return Response(status_code=status.HTTP_204_NO_CONTENT)
         except Exception as e:
             await db.rollback()
+            if isinstance(e, StaleDataError):
+                raise
             raise ValidationError(f"Could not delete category '{cat.name}'") from e
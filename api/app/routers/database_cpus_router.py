@@ -3,7 +3,8 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, Response, status
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -11,8 +12,16 @@ from app.auth.dependencies import RequestContext
 from app.core.exceptions import AccessDeniedError, ObjectNotFoundError, ValidationError
 from app.database import get_async_db
 from app.db.models import CPUs, Machines
-from app.db.schemas import CPUCreate, CPUResponse, CPUUpdate
-from app.utils.redis_service import acquire_lock
+from app.db.schemas import (
+    BulkDelete,
+    CPUBulkCreate,
+    CPUBulkUpdate,
+    CPUCreate,
+    CPUResponse,
+    CPUUpdate,
+    MachineCPUsReplace,
+)
+from app.utils.bulk_service import bulk_update_rows, check_visible_ids
 
 router = APIRouter(prefix="/db", tags=["CPUs"])
 
@@ -43,6 +52,7 @@ async def create_cpu(
             )
 
     stmt = select(Machines).where(Machines.id == cpu_data.machine_id)
+    stmt = stmt.with_for_update()
     stmt = ctx.team_filter(stmt, Machines)
     result = await db.execute(stmt)
     machine = result.scalar_one_or_none()
@@ -63,6 +73,145 @@ async def create_cpu(
         ) from e
 
 
+@router.post(
+    "/cpus/bulk",
+    response_model=List[CPUResponse],
+    status_code=status.HTTP_201_CREATED,
+)
+async def bulk_create_cpus(
+    cpus_data: List[CPUBulkCreate],
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Create many CPUs with a single INSERT.
+
+    Access to all machines is validated with one IN query.
+    :param cpus_data: List of CPU data
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Created CPUs.
+    """
+    ctx.require_user()
+    if not cpus_data:
+        return []
+    machine_ids = sorted({cpu.machine_id for cpu in cpus_data})
+    await check_visible_ids(
+        db, ctx, Machines, machine_ids, "Machine for this CPU", lock=Machines
+    )
+
+    try:
+        cpus = await db.scalars(
+            insert(CPUs).returning(CPUs, sort_by_parameter_order=True),
+            [cpu.model_dump() for cpu in cpus_data],
+        )
+        cpus = cpus.all()
+        await db.commit()
+        return cpus
+    except IntegrityError as e:
+        await db.rollback()
+        raise ValidationError("Bulk CPU creation failed") from e
+
+
+@router.put("/cpus/bulk", response_model=List[CPUResponse])
+async def bulk_replace_cpus(
+    machines_data: List[MachineCPUsReplace],
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Replace the CPU lists of many machines.
+
+    Old CPUs are removed with one DELETE and new ones added with one INSERT.
+    :param machines_data: New CPU list of every machine
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: New CPUs of all listed machines.
+    """
+    ctx.require_user()
+    if not machines_data:
+        return []
+    machine_ids = sorted({machine.machine_id for machine in machines_data})
+    if len(machine_ids) != len(machines_data):
+        raise ValidationError("Every machine may be listed only once")
+    await check_visible_ids(
+        db, ctx, Machines, machine_ids, "Machine for this CPU", lock=Machines
+    )
+
+    rows = [
+        {"machine_id": machine.machine_id, **cpu.model_dump()}
+        for machine in machines_data
+        for cpu in machine.cpus
+    ]
+    try:
+        await db.execute(delete(CPUs).where(CPUs.machine_id.in_(machine_ids)))
+        cpus = []
+        if rows:
+            result = await db.scalars(
+                insert(CPUs).returning(CPUs, sort_by_parameter_order=True), rows
+            )
+            cpus = result.all()
+        await db.commit()
+        return cpus
+    except IntegrityError as e:
+        await db.rollback()
+        raise ValidationError("Bulk CPU replacement failed") from e
+
+
+@router.patch("/cpus/bulk", status_code=status.HTTP_200_OK)
+async def bulk_update_cpus(
+    cpus_data: List[CPUBulkUpdate],
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Update many CPUs with one statement per set of changed fields.
+
+    :param cpus_data: CPU IDs with changed fields
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Number of updated CPUs.
+    """
+    ctx.require_user()
+    cpu_ids = sorted({cpu.id for cpu in cpus_data})
+    if not cpu_ids:
+        return {"message": "Updated 0 CPUs", "updated": 0}
+    await check_visible_ids(
+        db, ctx, CPUs, cpu_ids, "CPU", owner=Machines, lock=Machines
+    )
+
+    try:
+        updated = await bulk_update_rows(
+            db, CPUs, [cpu.model_dump(exclude_unset=True) for cpu in cpus_data]
+        )
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise ValidationError("Bulk CPU update failed") from e
+    return {"message": f"Updated {updated} CPUs", "updated": updated}
+
+
+@router.post("/cpus/bulk/delete", status_code=status.HTTP_200_OK)
+async def bulk_delete_cpus(
+    data: BulkDelete,
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Delete many CPUs with a single DELETE.
+
+    :param data: CPU IDs
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Number of deleted CPUs.
+    """
+    ctx.require_user()
+    cpu_ids = sorted(set(data.ids))
+    await check_visible_ids(
+        db, ctx, CPUs, cpu_ids, "CPU", owner=Machines, lock=Machines
+    )
+
+    deleted = (await db.execute(delete(CPUs).where(CPUs.id.in_(cpu_ids)))).rowcount
+    await db.commit()
+    return {"message": f"Deleted {deleted} CPUs", "deleted": deleted}
+
+
 @router.get("/cpus", response_model=List[CPUResponse])
 async def get_cpus(
     db: AsyncSession = Depends(get_async_db),
@@ -123,31 +272,31 @@ async def update_cpu(
     """
     ctx.require_user()
 
-    async with acquire_lock(f"cpu_lock:{cpu_id}"):
-        stmt = (
-            select(CPUs)
-            .options(selectinload(CPUs.machine))
-            .join(Machines)
-            .filter(CPUs.id == cpu_id)
-        )
-        stmt = ctx.team_filter(stmt, Machines)
-        result = await db.execute(stmt)
-        cpu = result.scalar_one_or_none()
-
-        if not cpu:
-            raise ObjectNotFoundError("CPU")
-
-        try:
-            for k, v in cpu_data.model_dump(exclude_unset=True).items():
-                setattr(cpu, k, v)
-            await db.commit()
-            await db.refresh(cpu)
-            return cpu
-        except Exception as e:
-            await db.rollback()
-            raise ValidationError(
-                f"Update failed for CPU '{cpu.name}' on machine '{cpu.machine.name}'"
-            ) from e
+    stmt = (
+        select(CPUs)
+        .options(selectinload(CPUs.machine))
+        .join(Machines)
+        .filter(CPUs.id == cpu_id)
+        .with_for_update(of=Machines)
+    )
+    stmt = ctx.team_filter(stmt, Machines)
+    result = await db.execute(stmt)
+    cpu = result.scalar_one_or_none()
+
+    if not cpu:
+        raise ObjectNotFoundError("CPU")
+
+    try:
+        for k, v in cpu_data.model_dump(exclude_unset=True).items():
+            setattr(cpu, k, v)
+        await db.commit()
+        await db.refresh(cpu)
+        return cpu
+    except Exception as e:
+        await db.rollback()
+        raise ValidationError(
+            f"Update failed for CPU '{cpu.name}' on machine '{cpu.machine.name}'"
+        ) from e
 
 
 @router.delete(
@@ -168,26 +317,26 @@ async def delete_cpu(
     """
     ctx.require_user()
 
-    async with acquire_lock(f"cpu_lock:{cpu_id}"):
-        stmt = (
-            select(CPUs)
-            .options(selectinload(CPUs.machine))
-            .join(Machines)
-            .filter(CPUs.id == cpu_id)
-        )
-        stmt = ctx.team_filter(stmt, Machines)
-        result = await db.execute(stmt)
-        cpu = result.scalar_one_or_none()
-
-        if not cpu:
-            raise ObjectNotFoundError("CPU")
-
-        try:
-            await db.delete(cpu)
-            await db.commit()
-            return Response(status_code=status.HTTP_204_NO_CONTENT)
-        except Exception as e:
-            await db.rollback()
-            raise ValidationError(
-                f"Could not delete CPU '{cpu.name}' from {cpu.machine.name}"
-            ) from e
+    stmt = (
+        select(CPUs)
+        .options(selectinload(CPUs.machine))
+        .join(Machines)
+        .filter(CPUs.id == cpu_id)
+        .with_for_update(of=Machines)
+    )
+    stmt = ctx.team_filter(stmt, Machines)
+    result = await db.execute(stmt)
+    cpu = result.scalar_one_or_none()
+
+    if not cpu:
+        raise ObjectNotFoundError("CPU")
+
+    try:
+        await db.delete(cpu)
+        await db.commit()
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    except Exception as e:
+        await db.rollback()
+        raise ValidationError(
+            f"Could not delete CPU '{cpu.name}' from {cpu.machine.name}"
+        ) from e
@@ -3,7 +3,8 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, Response, status
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -11,8 +12,16 @@ from app.auth.dependencies import RequestContext
 from app.core.exceptions import AccessDeniedError, ObjectNotFoundError, ValidationError
 from app.database import get_async_db
 from app.db.models import Disks, Machines
-from app.db.schemas import DiskCreate, DiskResponse, DiskUpdate
-from app.utils.redis_service import acquire_lock
+from app.db.schemas import (
+    BulkDelete,
+    DiskBulkCreate,
+    DiskBulkUpdate,
+    DiskCreate,
+    DiskResponse,
+    DiskUpdate,
+    MachineDisksReplace,
+)
+from app.utils.bulk_service import bulk_update_rows, check_visible_ids
 
 router = APIRouter(prefix="/db", tags=["Disks"])
 
@@ -43,6 +52,7 @@ async def create_disk(
             )
 
     stmt = select(Machines).where(Machines.id == disk_data.machine_id)
+    stmt = stmt.with_for_update()
     stmt = ctx.team_filter(stmt, Machines)
     result = await db.execute(stmt)
     machine = result.scalar_one_or_none()
@@ -63,6 +73,141 @@ async def create_disk(
         ) from e
 
 
+@router.post(
+    "/disks/bulk",
+    response_model=List[DiskResponse],
+    status_code=status.HTTP_201_CREATED,
+)
+async def bulk_create_disks(
+    disks_data: List[DiskBulkCreate],
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Create many disks with a single INSERT.
+
+    Access to all machines is validated with one IN query.
+    :param disks_data: List of disk data
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Created disks.
+    """
+    ctx.require_user()
+    if not disks_data:
+        return []
+    machine_ids = sorted({disk.machine_id for disk in disks_data})
+    await check_visible_ids(db, ctx, Machines, machine_ids, "Machine for this disk")
+
+    try:
+        disks = await db.scalars(
+            insert(Disks).returning(Disks, sort_by_parameter_order=True),
+            [disk.model_dump() for disk in disks_data],
+        )
+        disks = disks.all()
+        await db.commit()
+        return disks
+    except IntegrityError as e:
+        await db.rollback()
+        raise ValidationError("Bulk disk creation failed") from e
+
+
+@router.put("/disks/bulk", response_model=List[DiskResponse])
+async def bulk_replace_disks(
+    machines_data: List[MachineDisksReplace],
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Replace the disk lists of many machines.
+
+    Old disks are removed with one DELETE and new ones added with one INSERT.
+    :param machines_data: New disk list of every machine
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: New disks of all listed machines.
+    """
+    ctx.require_user()
+    if not machines_data:
+        return []
+    machine_ids = sorted({machine.machine_id for machine in machines_data})
+    if len(machine_ids) != len(machines_data):
+        raise ValidationError("Every machine may be listed only once")
+    await check_visible_ids(db, ctx, Machines, machine_ids, "Machine for this disk")
+
+    rows = [
+        {"machine_id": machine.machine_id, **disk.model_dump()}
+        for machine in machines_data
+        for disk in machine.disks
+    ]
+    try:
+        await db.execute(delete(Disks).where(Disks.machine_id.in_(machine_ids)))
+        disks = []
+        if rows:
+            result = await db.scalars(
+                insert(Disks).returning(Disks, sort_by_parameter_order=True), rows
+            )
+            disks = result.all()
+        await db.commit()
+        return disks
+    except IntegrityError as e:
+        await db.rollback()
+        raise ValidationError("Bulk disk replacement failed") from e
+
+
+@router.patch("/disks/bulk", status_code=status.HTTP_200_OK)
+async def bulk_update_disks(
+    disks_data: List[DiskBulkUpdate],
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Update many disks with one statement per set of changed fields.
+
+    :param disks_data: Disk IDs with changed fields
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Number of updated disks.
+    """
+    ctx.require_user()
+    disk_ids = sorted({disk.id for disk in disks_data})
+    if not disk_ids:
+        return {"message": "Updated 0 disks", "updated": 0}
+    await check_visible_ids(
+        db, ctx, Disks, disk_ids, "Disk", owner=Machines, lock=Machines
+    )
+
+    try:
+        updated = await bulk_update_rows(
+            db, Disks, [disk.model_dump(exclude_unset=True) for disk in disks_data]
+        )
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise ValidationError("Bulk disk update failed") from e
+    return {"message": f"Updated {updated} disks", "updated": updated}
+
+
+@router.post("/disks/bulk/delete", status_code=status.HTTP_200_OK)
+async def bulk_delete_disks(
+    data: BulkDelete,
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Delete many disks with a single DELETE.
+
+    :param data: Disk IDs
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Number of deleted disks.
+    """
+    ctx.require_user()
+    disk_ids = sorted(set(data.ids))
+    await check_visible_ids(
+        db, ctx, Disks, disk_ids, "Disk", owner=Machines, lock=Machines
+    )
+
+    deleted = (await db.execute(delete(Disks).where(Disks.id.in_(disk_ids)))).rowcount
+    await db.commit()
+    return {"message": f"Deleted {deleted} disks", "deleted": deleted}
+
+
 @router.get("/disks/", response_model=List[DiskResponse])
 async def get_disks(
     db: AsyncSession = Depends(get_async_db),
@@ -121,31 +266,31 @@ async def update_disk(
     :return: Updated disk.
     """
     ctx.require_user()
-    async with acquire_lock(f"disk_lock:{disk_id}"):
-        stmt = (
-            select(Disks)
-            .options(selectinload(Disks.machine))
-            .join(Machines)
-            .filter(Disks.id == disk_id)
-        )
-        stmt = ctx.team_filter(stmt, Machines)
-        result = await db.execute(stmt)
-        disk = result.scalar_one_or_none()
-
-        if not disk:
-            raise ObjectNotFoundError("Disk")
-
-        try:
-            for k, v in disk_data.model_dump(exclude_unset=True).items():
-                setattr(disk, k, v)
-            await db.commit()
-            await db.refresh(disk)
-            return disk
-        except Exception as e:
-            await db.rollback()
-            raise ValidationError(
-                f"Update failed for disk '{disk.name}' on {disk.machine.name}"
-            ) from e
+    stmt = (
+        select(Disks)
+        .options(selectinload(Disks.machine))
+        .join(Machines)
+        .filter(Disks.id == disk_id)
+        .with_for_update(of=Machines)
+    )
+    stmt = ctx.team_filter(stmt, Machines)
+    result = await db.execute(stmt)
+    disk = result.scalar_one_or_none()
+
+    if not disk:
+        raise ObjectNotFoundError("Disk")
+
+    try:
+        for k, v in disk_data.model_dump(exclude_unset=True).items():
+            setattr(disk, k, v)
+        await db.commit()
+        await db.refresh(disk)
+        return disk
+    except Exception as e:
+        await db.rollback()
+        raise ValidationError(
+            f"Update failed for disk '{disk.name}' on {disk.machine.name}"
+        ) from e
 
 
 @router.delete(
@@ -165,26 +310,26 @@ async def delete_disk(
     :return: 204 No Content as success
     """
     ctx.require_user()
-    async with acquire_lock(f"disk_lock:{disk_id}"):
-        stmt = (
-            select(Disks)
-            .options(selectinload(Disks.machine))
-            .join(Machines)
-            .filter(Disks.id == disk_id)
-        )
-        stmt = ctx.team_filter(stmt, Machines)
-        result = await db.execute(stmt)
-        disk = result.scalar_one_or_none()
-
-        if not disk:
-            raise ObjectNotFoundError("Disk")
-
-        try:
-            await db.delete(disk)
-            await db.commit()
-            return Response(status_code=status.HTTP_204_NO_CONTENT)
-        except Exception as e:
-            await db.rollback()
-            raise ValidationError(
-                f"Could not delete disk '{disk.name}' from {disk.machine.name}"
-            ) from e
+    stmt = (
+        select(Disks)
+        .options(selectinload(Disks.machine))
+        .join(Machines)
+        .filter(Disks.id == disk_id)
+        .with_for_update(of=Machines)
+    )
+    stmt = ctx.team_filter(stmt, Machines)
+    result = await db.execute(stmt)
+    disk = result.scalar_one_or_none()
+
+    if not disk:
+        raise ObjectNotFoundError("Disk")
+
+    try:
+        await db.delete(disk)
+        await db.commit()
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    except Exception as e:
+        await db.rollback()
+        raise ValidationError(
+            f"Could not delete disk '{disk.name}' from {disk.machine.name}"
+        ) from e
@@ -1,15 +1,21 @@
 """Router for History Database API CRUD."""
 
-from typing import List
+from collections import defaultdict
+from datetime import date, datetime
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import Enum, delete, insert, select, tuple_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
 from app.auth.dependencies import RequestContext
-from app.core.exceptions import ObjectNotFoundError, ValidationError
+from app.core.exceptions import (
+    ObjectNotFoundError,
+    ValidationError,
+    VersionConflictError,
+)
 from app.database import get_async_db
 from app.db.models import (
     ActionType,
@@ -21,7 +27,21 @@ from app.db.models import (
     Rooms,
     User,
 )
-from app.db.schemas import HistoryEnhancedResponse
+from app.db.listeners import (
+    HISTORY_UPDATE_FORMAT,
+    compact_update_states,
+    get_entity_state,
+    history_diff_columns,
+    history_states,
+)
+from app.db.schemas import (
+    HistoryBatchRollback,
+    HistoryBatchRollbackResponse,
+    HistoryEnhancedResponse,
+    HistoryStateResponse,
+)
+from app.utils.bulk_service import bulk_update_rows
+from app.utils.history_service import reconstruct_entity_state
 
 router = APIRouter(prefix="/db", tags=["History"])
 
@@ -49,7 +69,8 @@ async def resolve_entity_name(log: History, db: AsyncSession):
     :param db: Active database session
     :return: Readable name of the entity.
     """
-    state = log.after_state or log.before_state
+    before, after = history_states(log.before_state, log.after_state, log.extra_data)
+    state = after or before
     if state:
         if "name" in state:
             return state["name"]
@@ -143,6 +164,236 @@ async def _rollback_update(model_class, log_entry: History, db: AsyncSession) ->
     )
 
 
+def _column_values(model_class, state: dict) -> dict:
+    """Convert JSON history state back to column values.
+
+    :param model_class: SQLAlchemy model class
+    :param state: Entity state stored in history
+    :return: Dictionary of column values.
+    """
+    columns = model_class.__mapper__.columns
+    values = {}
+    for key, value in state.items():
+        if key not in columns:
+            continue
+        column_type = columns[key].type
+        if value is not None and isinstance(column_type, Enum):
+            value = column_type.enum_class(value) if column_type.enum_class else value
+        elif isinstance(value, str):
+            try:
+                python_type = column_type.python_type
+            except NotImplementedError:
+                python_type = str
+            if issubclass(python_type, datetime):
+                value = datetime.fromisoformat(value)
+            elif issubclass(python_type, date):
+                value = date.fromisoformat(value)
+        values[key] = value
+    return values
+
+
+def _plan_entity_rollback(entries: List[History], current: Optional[dict]):
+    """Compute net reversion of one entity.
+
+    Entries are walked newest-first: UPDATE reverts changed fields to their
+    old values, DELETE restores the state from before the deletion and
+    CREATE removes the entity.
+    :param entries: History entries of one entity ordered newest-first
+    :param current: Current entity state or None if it does not exist
+    :return: Tuple of operation and changed fields, operation is None if the
+        entity already is in the target state.
+    """
+    exists, base, overrides = None, None, {}
+    for entry in entries:
+        if entry.action == ActionType.UPDATE:
+            for field, change in (entry.extra_data or {}).items():
+                overrides[field] = change.get("old")
+        elif entry.action == ActionType.DELETE:
+            if not entry.before_state:
+                raise ValidationError(f"No before state saved in history {entry.id}")
+            exists, base, overrides = True, dict(entry.before_state), {}
+        else:
+            exists, base, overrides = False, None, {}
+
+    if exists is False:
+        return ("delete", {}) if current is not None else (None, {})
+
+    if base is None:
+        if current is None:
+            raise ValidationError(
+                f"Rollback failed: {entries[0].entity_type.value}, "
+                f"ID: {entries[0].entity_id} not found"
+            )
+        base = current
+    target = {**base, **overrides}
+    if current is None:
+        return "restore", {"state": target}
+
+    changes = {
+        field: {"old": current.get(field), "new": value}
+        for field, value in target.items()
+        if field != "version_id" and current.get(field) != value
+    }
+    return ("update", changes) if changes else (None, {})
+
+
+async def _plan_rollback(entries: List[History], db: AsyncSession) -> list[dict]:
+    """Plan net reversions of all entities touched by history entries.
+
+    Current rows are loaded with one IN query per entity type.
+    :param entries: History entries ordered newest-first
+    :param db: Active database session
+    :return: List of planned changes.
+    """
+    grouped = defaultdict(list)
+    for entry in entries:
+        grouped[(entry.entity_type, entry.entity_id)].append(entry)
+
+    ids_by_type = defaultdict(set)
+    for entity_type, entity_id in grouped:
+        ids_by_type[entity_type].add(entity_id)
+
+    current = {}
+    for entity_type, ids in ids_by_type.items():
+        model_class = get_model_class(entity_type)
+        if not model_class:
+            raise ObjectNotFoundError("Entity model")
+        rows = await db.scalars(select(model_class).where(model_class.id.in_(ids)))
+        for row in rows:
+            current[(entity_type, row.id)] = get_entity_state(row)
+
+    plan = []
+    for key, entity_entries in grouped.items():
+        operation, changes = _plan_entity_rollback(entity_entries, current.get(key))
+        if operation:
+            plan.append(
+                {
+                    "entity_type": key[0],
+                    "entity_id": key[1],
+                    "operation": operation,
+                    "history_ids": [entry.id for entry in entity_entries],
+                    "changes": changes,
+                    "current": current.get(key),
+                }
+            )
+    return plan
+
+
+async def _apply_rollback_plan(plan: list[dict], db: AsyncSession, user_id: int):
+    """Apply planned reversions with set-based statements.
+
+    Rows are deleted, restored and updated with one statement per entity
+    type (and per set of updated fields). Bulk statements bypass flush
+    listeners, so history entries of the reversion and their diffs are
+    inserted here. Deleted and updated rows must still have the version_id
+    seen while planning.
+    :param plan: Planned changes from _plan_rollback
+    :param db: Active database session
+    :param user_id: ID of the user performing the rollback
+    :raise VersionConflictError: If a planned row changed in the meantime
+    """
+    deletes, restores, updates = defaultdict(dict), defaultdict(list), {}
+    logs = []
+    for change in plan:
+        entity_type, entity_id = change["entity_type"], change["entity_id"]
+        model_class = get_model_class(entity_type)
+        log = {
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "user_id": user_id,
+            "before_state": None,
+            "after_state": None,
+            "extra_data": None,
+            "can_rollback": True,
+        }
+        if change["operation"] == "delete":
+            deletes[model_class][entity_id] = change["current"]["version_id"]
+            log.update(action=ActionType.DELETE, before_state=change["current"])
+        elif change["operation"] == "restore":
+            state = change["changes"]["state"]
+            restores[model_class].append(_column_values(model_class, state))
+            log.update(action=ActionType.CREATE, after_state=state)
+        else:
+            fields = change["changes"]
+            values = _column_values(
+                model_class, {field: val["new"] for field, val in fields.items()}
+            )
+            rows, versions = updates.setdefault(model_class, ([], {}))
+            rows.append({"id": entity_id, **values})
+            versions[entity_id] = change["current"]["version_id"]
+            after_state = {
+                **change["current"],
+                **{field: val["new"] for field, val in fields.items()},
+            }
+            if "version_id" in after_state:
+                after_state["version_id"] += 1
+            before_state = change["current"]
+            if HISTORY_UPDATE_FORMAT == "diff":
+                before_state, after_state = compact_update_states(
+                    before_state, after_state, fields
+                )
+            log.update(
+                action=ActionType.UPDATE,
+                before_state=before_state,
+                after_state=after_state,
+                extra_data=fields,
+            )
+        log.update(
+            history_diff_columns(
+                log["before_state"], log["after_state"], log["extra_data"]
+            )
+        )
+        logs.append(log)
+
+    for model_class, versions in deletes.items():
+        table = model_class.__table__
+        result = await db.execute(
+            delete(table).where(
+                tuple_(table.c.id, table.c.version_id).in_(list(versions.items()))
+            )
+        )
+        if result.rowcount != len(versions):
+            raise VersionConflictError(model_class.__name__)
+    for model_class, rows in restores.items():
+        await db.execute(insert(model_class.__table__), rows)
+    for model_class, (rows, versions) in updates.items():
+        await bulk_update_rows(db, model_class, rows, versions)
+    if logs:
+        await db.execute(insert(History), logs)
+
+
+async def _enhanced_history(log: History, db: AsyncSession) -> dict:
+    """Build enhanced history response with full before and after states.
+
+    :param log: History entry with loaded user
+    :param db: Active database session
+    :return: Response dict for HistoryEnhancedResponse.
+    """
+    before_state, after_state = history_states(
+        log.before_state, log.after_state, log.extra_data
+    )
+    action_val = log.action.value if hasattr(log.action, "value") else str(log.action)
+    type_val = (
+        log.entity_type.value
+        if hasattr(log.entity_type, "value")
+        else str(log.entity_type)
+    )
+    return {
+        "id": log.id,
+        "timestamp": log.timestamp,
+        "action": action_val,
+        "entity_type": type_val,
+        "entity_id": log.entity_id,
+        "entity_name": await resolve_entity_name(log, db),
+        "user": log.user,
+        "user_id": log.user_id,
+        "before_state": before_state,
+        "after_state": after_state,
+        "extra_data": log.extra_data,
+        "can_rollback": log.can_rollback,
+    }
+
+
 @router.get("/history/", response_model=List[HistoryEnhancedResponse], tags=["History"])
 async def get_history_logs(
     limit=200,
@@ -167,35 +418,94 @@ async def get_history_logs(
 
     result = await db.execute(stmt)
     logs = result.unique().scalars().all()
-    results = []
+    return [await _enhanced_history(log, db) for log in logs]
 
-    for log in logs:
-        readable_name = await resolve_entity_name(log, db)
-        action_val = (
-            log.action.value if hasattr(log.action, "value") else str(log.action)
-        )
-        type_val = (
-            log.entity_type.value
-            if hasattr(log.entity_type, "value")
-            else str(log.entity_type)
-        )
-        results.append(
-            {
-                "id": log.id,
-                "timestamp": log.timestamp,
-                "action": action_val,
-                "entity_type": type_val,
-                "entity_id": log.entity_id,
-                "entity_name": readable_name,
-                "user": log.user,
-                "user_id": log.user_id,
-                "before_state": log.before_state,
-                "after_state": log.after_state,
-                "can_rollback": log.can_rollback,
-            }
-        )
 
-    return results
+@router.post("/history/rollback", response_model=HistoryBatchRollbackResponse)
+async def rollback_history_batch(
+    rollback: HistoryBatchRollback,
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Rollback many history entries in one transaction.
+
+    Entries are grouped by entity and only the net reversion of every entity
+    is applied. With dry_run the planned changes are returned without
+    modifying any data.
+    :param rollback: IDs or filter of rolled back entries
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Planned or applied changes.
+    """
+    ctx.require_group_admin()
+    if not rollback.history_ids and not rollback.since:
+        raise ValidationError("Provide history_ids or since to select entries")
+
+    stmt = select(History).join(User, History.user_id == User.id)
+    if rollback.history_ids:
+        stmt = stmt.where(History.id.in_(rollback.history_ids))
+    if rollback.since:
+        stmt = stmt.where(History.timestamp >= rollback.since)
+    if rollback.until:
+        stmt = stmt.where(History.timestamp <= rollback.until)
+    if rollback.entity_type:
+        stmt = stmt.where(History.entity_type == EntityType(rollback.entity_type))
+    if rollback.user_id:
+        stmt = stmt.where(History.user_id == rollback.user_id)
+    stmt = ctx.team_filter(stmt, User).order_by(History.id.desc())
+    entries = (await db.scalars(stmt)).all()
+
+    if rollback.history_ids and len(entries) != len(set(rollback.history_ids)):
+        raise ObjectNotFoundError("History")
+    blocked = [entry.id for entry in entries if not entry.can_rollback]
+    if blocked:
+        raise ValidationError(f"History entries {blocked} cannot be rolled back")
+
+    plan = await _plan_rollback(entries, db)
+    if not rollback.dry_run:
+        try:
+            await _apply_rollback_plan(plan, db, ctx.current_user.id)
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            raise ValidationError("Rollback failed: Conflict with existing data") from e
+
+    return {"dry_run": rollback.dry_run, "entries": len(entries), "changes": plan}
+
+
+@router.get(
+    "/history/state/{entity_type}/{entity_id}", response_model=HistoryStateResponse
+)
+async def get_entity_state_at(
+    entity_type: EntityType,
+    entity_id: int,
+    at: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Reconstruct entity state at a point in time from history.
+
+    Folding starts at the newest stored checkpoint, so only entries recorded
+    after it are read.
+    :param entity_type: Entity type
+    :param entity_id: Entity ID
+    :param at: Point in time, latest state if not provided
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Reconstructed entity state.
+    """
+    ctx.require_group_admin()
+    stmt = (
+        select(History.id)
+        .join(User, History.user_id == User.id)
+        .filter(History.entity_type == entity_type, History.entity_id == entity_id)
+        .limit(1)
+    )
+    stmt = ctx.team_filter(stmt, User)
+    if (await db.execute(stmt)).scalar_one_or_none() is None:
+        raise ObjectNotFoundError("History")
+
+    return await reconstruct_entity_state(db, entity_type, entity_id, at)
 
 
 @router.get("/history/{history_id}", response_model=HistoryEnhancedResponse)
@@ -224,7 +534,7 @@ async def get_history_by_id(
     if not history:
         raise ObjectNotFoundError("History")
 
-    return history
+    return await _enhanced_history(history, db)
 
 
 @router.post(
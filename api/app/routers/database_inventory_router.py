@@ -1,24 +1,36 @@
 """Router for Inventory Database API CRUD."""
 
-from datetime import datetime
-from typing import List
+from datetime import date, datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Response, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Query, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
 from app.auth.dependencies import RequestContext
 from app.core.exceptions import AccessDeniedError, ObjectNotFoundError, ValidationError
 from app.database import get_async_db
-from app.db.models import Inventory, Rentals, User, UsersTeams
+from app.db.models import (
+    Categories,
+    Inventory,
+    Machines,
+    Rentals,
+    Rooms,
+    Teams,
+    User,
+    UsersTeams,
+)
 from app.db.schemas import (
     InventoryCreate,
     InventoryDetailResponse,
     InventoryResponse,
     InventoryUpdate,
+    RentalAvailabilityResponse,
 )
 from app.utils.redis_service import acquire_lock
+from app.utils.rental_service import get_availability
 
 router = APIRouter(prefix="/db", tags=["Inventory"])
 
@@ -76,73 +88,139 @@ async def get_inventory(
     return result.scalars().all()
 
 
+def active_rentals_stmt(item_ids: List[int], today: date):
+    """Build query for rentals of given items that did not end yet.
+
+    Borrower teams are aggregated per user with string_agg in a correlated
+    subquery, so rentals are not multiplied by team memberships.
+    :param item_ids: Inventory item IDs
+    :param today: Current date, rentals ending earlier are skipped
+    :return: SQLAlchemy select statement.
+    """
+    borrower_teams = (
+        select(func.string_agg(Teams.name, aggregate_order_by(", ", Teams.name)))
+        .join(UsersTeams, UsersTeams.team_id == Teams.id)
+        .where(UsersTeams.user_id == Rentals.user_id)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            Rentals.id,
+            Rentals.item_id,
+            Rentals.quantity,
+            Rentals.end_date,
+            User.name,
+            User.surname,
+            func.coalesce(borrower_teams, "N/A"),
+        )
+        .join(User, Rentals.user_id == User.id)
+        .where(Rentals.item_id.in_(item_ids), Rentals.end_date >= today)
+        .order_by(Rentals.item_id, Rentals.end_date, Rentals.id)
+    )
+
+
 @router.get(
     "/inventory/details",
     response_model=List[InventoryDetailResponse],
 )
 async def get_inventory_details(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
     """Fetch all inventory items with detailed information.
 
-    Related tables (team, room, machine, category).
+    Related tables (team, room, machine, category) and active rentals.
+    With limit set, one page is returned and X-Total-Count holds the number
+    of all visible items.
 
+    :param response: Response used to expose the X-Total-Count header
+    :param limit: Optional page size, all items are returned without it
+    :param offset: Number of items to skip
     :param db: Active database session
     :param ctx: Request context for user and team info
     :return: List of inventory items.
     """
     ctx.require_user()
-    stmt = select(Inventory).options(
-        joinedload(Inventory.team),
-        joinedload(Inventory.room),
-        joinedload(Inventory.machine),
-        joinedload(Inventory.category),
-        joinedload(Inventory.rental_history)
-        .joinedload(Rentals.user)
-        .joinedload(User.teams)
-        .joinedload(UsersTeams.team),
+    stmt = (
+        select(
+            Inventory.id,
+            Inventory.name,
+            Inventory.quantity,
+            Inventory.team_id,
+            Inventory.category_id,
+            Inventory.localization_id,
+            Teams.name,
+            Rooms.id,
+            Rooms.name,
+            Machines.name,
+            Categories.name,
+        )
+        .outerjoin(Teams, Inventory.team_id == Teams.id)
+        .outerjoin(Rooms, Inventory.localization_id == Rooms.id)
+        .outerjoin(Machines, Inventory.machine_id == Machines.id)
+        .outerjoin(Categories, Inventory.category_id == Categories.id)
+        .order_by(Inventory.id)
     )
-
     stmt = ctx.team_filter(stmt, Inventory)
-    result = await db.execute(stmt)
-    items = result.unique().scalars().all()
-    today = datetime.now().date()
+    if limit is not None:
+        total = await db.scalar(
+            select(func.count()).select_from(
+                stmt.with_only_columns(Inventory.id).order_by(None).subquery()
+            )
+        )
+        response.headers["X-Total-Count"] = str(total)
+        stmt = stmt.offset(offset).limit(limit)
+
+    items = (await db.execute(stmt)).all()
+    rentals_by_item = {}
+    if items:
+        rentals = await db.execute(
+            active_rentals_stmt([item[0] for item in items], datetime.now().date())
+        )
+        for rental_id, item_id, quantity, end_date, name, surname, teams in rentals:
+            rentals_by_item.setdefault(item_id, []).append(
+                {
+                    "id": rental_id,
+                    "borrower_name": f"{name} {surname}",
+                    "borrower_team": teams,
+                    "quantity": quantity,
+                    "end_date": end_date,
+                }
+            )
 
     results = []
-    for item in items:
-        active_rentals_list = [
-            {
-                "id": r.id,
-                "borrower_name": f"{r.user.name} {r.user.surname}",
-                "borrower_team": (
-                    ", ".join([ut.team.name for ut in r.user.teams])
-                    if r.user.teams
-                    else "N/A"
-                ),
-                "quantity": r.quantity,
-                "end_date": r.end_date,
-            }
-            for r in item.rental_history
-            if r.end_date >= today
-        ]
-
+    for (
+        item_id,
+        name,
+        quantity,
+        team_id,
+        category_id,
+        localization_id,
+        team_name,
+        room_id,
+        room_name,
+        machine_name,
+        category_name,
+    ) in items:
+        active_rentals_list = rentals_by_item.get(item_id, [])
         total_rented = sum(r["quantity"] for r in active_rentals_list)
-
         results.append(
             {
-                "id": item.id,
-                "name": item.name,
-                "total_quantity": item.quantity,
-                "in_stock_quantity": item.quantity - total_rented,
-                "team_id": item.team_id,
-                "team_name": item.team.name if item.team else "N/A",
-                "room_name": item.room.name if item.room else "N/A",
-                "room_id": item.room.id if item.room else 1,
-                "machine_info": item.machine.name if item.machine else "None",
-                "category_id": item.category_id,
-                "category_name": item.category.name if item.category else "N/A",
-                "location_link": f"/labs/{item.localization_id}",
+                "id": item_id,
+                "name": name,
+                "total_quantity": quantity,
+                "in_stock_quantity": quantity - total_rented,
+                "team_id": team_id,
+                "team_name": team_name or "N/A",
+                "room_name": room_name or "N/A",
+                "room_id": room_id or 1,
+                "machine_info": machine_name or "None",
+                "category_id": category_id,
+                "category_name": category_name or "N/A",
+                "location_link": f"/labs/{localization_id}",
                 "active_rentals": active_rentals_list,
             }
         )
@@ -150,6 +228,38 @@ async def get_inventory_details(
     return results
 
 
+@router.get(
+    "/inventory/availability",
+    response_model=List[RentalAvailabilityResponse],
+)
+async def get_inventory_availability(
+    start_date: date,
+    end_date: date,
+    item_ids: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Fetch free quantity of inventory items for a date range.
+
+    All visible items are checked with a single query, so the inventory page
+    can show availability without a request per item.
+
+    :param start_date: First day of the range
+    :param end_date: Last day of the range
+    :param item_ids: Optional list of item IDs, all visible items without it
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: List of item availabilities.
+    """
+    ctx.require_user()
+    stmt = select(Inventory).order_by(Inventory.id)
+    if item_ids:
+        stmt = stmt.where(Inventory.id.in_(item_ids))
+    stmt = ctx.team_filter(stmt, Inventory)
+    items = (await db.execute(stmt)).scalars().all()
+    return await get_availability(db, items, start_date, end_date)
+
+
 @router.post(
     "/inventory/bulk",
     response_model=List[InventoryResponse],
@@ -1,28 +1,96 @@
 """Router for Machine Database API CRUD."""
 
 import json, os
-from typing import List
-
-from fastapi import APIRouter, Depends, Response, status
+from typing import List, Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy import delete, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.auth.dependencies import RequestContext
-from app.core.exceptions import ObjectNotFoundError, ValidationError, ConflictError
+from app.core.exceptions import (
+    ConflictError,
+    ObjectNotFoundError,
+    ValidationError,
+)
 from app.database import get_async_db
-from app.db.models import CPUs, Disks, Machines, Metadata, Shelf
+from app.db.models import (
+    CPUs,
+    Disks,
+    Machines,
+    Metadata,
+    Rack,
+    Rooms,
+    Shelf,
+    Tags,
+    TagsMachines,
+    Teams,
+)
 from app.db.schemas import (
     MachineFullDetailResponse,
     MachinesCreate,
     MachinesResponse,
     MachinesUpdate,
 )
-from app.utils.redis_service import acquire_lock, get_cache
+from app.utils.concurrency_service import (
+    check_version,
+    get_if_match_version,
+    set_entity_etag,
+    write_guard,
+)
+from app.utils.etag_service import check_not_modified, fingerprint
+from app.utils.machine_import_service import (
+    export_machines,
+    machine_export_stmt,
+    machine_import_report,
+    parse_machine_rows,
+    resolve_format,
+)
+from app.utils.redis_service import acquire_lock, get_cache_many
 
 router = APIRouter(prefix="/db", tags=["Machines"])
 
+
+def machine_detail_fingerprints(machine_id: int) -> list:
+    """Build fingerprints of the rows shown in machine details.
+
+    :param machine_id: Machine ID
+    :return: List of fingerprint queries scoped to the machine.
+    """
+    machine = select(Machines).where(Machines.id == machine_id).subquery()
+    tag_ids = select(TagsMachines.tag_id).where(TagsMachines.machine_id == machine_id)
+    return [
+        fingerprint(Machines, Machines.id == machine_id),
+        fingerprint(CPUs, CPUs.machine_id == machine_id),
+        fingerprint(Disks, Disks.machine_id == machine_id),
+        fingerprint(TagsMachines, TagsMachines.machine_id == machine_id),
+        fingerprint(Tags, Tags.id.in_(tag_ids)),
+        fingerprint(Teams, Teams.id.in_(select(machine.c.team_id))),
+        fingerprint(Rooms, Rooms.id.in_(select(machine.c.localization_id))),
+        fingerprint(Metadata, Metadata.id.in_(select(machine.c.metadata_id))),
+        fingerprint(Shelf, Shelf.id.in_(select(machine.c.shelf_id))),
+        fingerprint(
+            Rack,
+            Rack.id.in_(
+                select(Shelf.rack_id).where(Shelf.id.in_(select(machine.c.shelf_id)))
+            ),
+        ),
+    ]
+
+
 if os.environ.get("ENV") == "development":
     GRAFANA_URL = "http://localhost:3001"
 else:
@@ -86,6 +154,62 @@ async def create_machine(
         raise ValidationError(f"Failed to create machine '{machine_data.name}'") from e
 
 
+@router.post("/machines/import")
+async def import_machines_file(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(None, alias="format"),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Create or update many machines with CPUs and disks from a file.
+
+    Accepts NDJSON (one machine per line) or CSV in the format produced by
+    /machines/export. Machines are matched by name and room. The response is
+    an NDJSON report with progress events, one error event per rejected row
+    and a final summary.
+
+    :param file: Uploaded CSV or NDJSON file
+    :param file_format: "csv" or "ndjson", detected from file name if omitted
+    :param ctx: Request context for user and team info
+    :return: Streaming NDJSON import report.
+    """
+    ctx.require_user()
+    resolved_format = resolve_format(file.filename, file_format)
+    rows, errors = parse_machine_rows(await file.read(), resolved_format)
+    return StreamingResponse(
+        machine_import_report(
+            rows,
+            errors,
+            None if ctx.is_admin else ctx.team_ids,
+            ctx.current_user.id,
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/machines/export")
+async def export_machines_file(
+    file_format: str = Query("ndjson", alias="format"),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Stream all visible machines with CPUs and disks as a file.
+
+    :param file_format: "csv" or "ndjson"
+    :param ctx: Request context for user and team info
+    :return: Streaming CSV or NDJSON file.
+    """
+    ctx.require_user()
+    resolved_format = resolve_format(None, file_format)
+    stmt = ctx.team_filter(machine_export_stmt(), Machines)
+    media_type = "text/csv" if resolved_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_machines(stmt, resolved_format),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename=machines.{resolved_format}"
+        },
+    )
+
+
 @router.get("/machines/", response_model=List[MachinesResponse])
 async def get_machines(
     db: AsyncSession = Depends(get_async_db),
@@ -112,12 +236,14 @@ async def get_machines(
 @router.get("/machines/{machine_id}", response_model=MachinesResponse)
 async def get_machine_by_id(
     machine_id: int,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
     """Fetch specific machine by ID.
 
     :param machine_id: Machine ID
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for user and team info
     :return: Machine object.
@@ -139,6 +265,7 @@ async def get_machine_by_id(
 
     if not machine:
         raise ObjectNotFoundError("Machine")
+    set_entity_etag(response, machine)
     return machine
 
 
@@ -148,17 +275,37 @@ async def get_machine_by_id(
 )
 async def get_machine_full_detail(
     machine_id: int,
+    request: Request,
+    response: Response,
+    live: bool = True,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
     """Fetch specific machine by ID.
 
+    Live Prometheus stats change every few seconds, so only the response
+    without them (live=false) supports conditional GET.
     :param machine_id: Machine ID
+    :param request: Incoming request with optional If-None-Match header
+    :param response: Response used to expose the ETag header
+    :param live: Include network status and live Prometheus stats
     :param db: Active database session
     :param ctx: Request context for user and team info
     :return: Machine object.
     """
     ctx.require_user()
+    status_data, metrics_data = None, None
+    if live:
+        status_data, metrics_data = await get_cache_many(
+            "prometheus_metrics_cache", "prometheus_other_metrics_cache"
+        )
+    else:
+        not_modified = await check_not_modified(
+            request, response, db, ctx, machine_detail_fingerprints(machine_id)
+        )
+        if not_modified:
+            return not_modified
+
     stmt = select(Machines).filter(Machines.id == machine_id)
     stmt = ctx.team_filter(stmt, Machines)
 
@@ -178,14 +325,11 @@ async def get_machine_full_detail(
     if not machine:
         raise ObjectNotFoundError("Machine")
 
-    status_data = await get_cache("prometheus_metrics_cache")
-    metrics_data = await get_cache("prometheus_other_metrics_cache")
-
     status_parsed = json.loads(status_data) if status_data else {}
     metrics_parsed = json.loads(metrics_data) if metrics_data else {}
 
     target_ip = machine.ip_address if machine.ip_address else machine.name
-    net_status = "Offline"
+    net_status = "Offline" if live else "Unknown"
     live_payload = {"cpu_usage": None, "ram_usage": None}
 
     if status_parsed:
@@ -269,19 +413,27 @@ async def get_machine_full_detail(
 async def update_machine(
     machine_id: int,
     machine_data: MachinesUpdate,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
+    if_match: Optional[int] = Depends(get_if_match_version),
 ):
     """Update machine data.
 
     :param machine_id: Machine ID
     :param machine_data: Machine data schema
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for user and team info
+    :param if_match: Expected version, skips the Redis lock when given
     :return: Updated Machine.
     """
     ctx.require_user()
-    async with acquire_lock(f"machine_lock:{machine_id}"):
+    update_data = machine_data.model_dump(exclude_unset=True)
+    # CPUs and disks are rewritten with bulk statements that version_id
+    # does not cover, so such updates keep the Redis lock.
+    lock_free_version = None if {"cpus", "disks"} & update_data.keys() else if_match
+    async with write_guard(f"machine_lock:{machine_id}", lock_free_version):
         stmt = select(Machines).filter(Machines.id == machine_id)
         stmt = ctx.team_filter(stmt, Machines)
         result = await db.execute(stmt)
@@ -289,8 +441,8 @@ async def update_machine(
 
         if not machine:
             raise ObjectNotFoundError("Machine")
+        check_version(machine, if_match, "Machine")
 
-        update_data = machine_data.model_dump(exclude_unset=True)
         if "shelf_id" in update_data and (
             update_data["shelf_id"] == 0 or update_data["shelf_id"] == ""
         ):
@@ -356,12 +508,15 @@ async def update_machine(
 
         except Exception as e:
             await db.rollback()
+            if isinstance(e, StaleDataError):
+                raise
             raise ValidationError(f"Failed to update machine '{machine.name}'") from e
 
         await db.refresh(
             machine,
             attribute_names=["team", "machine_metadata", "shelf", "cpus", "disks"],
         )
+        set_entity_etag(response, machine)
         return machine
 
 
@@ -373,16 +528,18 @@ async def delete_machine(
     machine_id: int,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
+    if_match: Optional[int] = Depends(get_if_match_version),
 ):
     """Delete Machine.
 
     :param machine_id: Machine ID
     :param db: Active database session
     :param ctx: Request context for user and team info
+    :param if_match: Expected version, skips the Redis lock when given
     :return: None.
     """
     ctx.require_user()
-    async with acquire_lock(f"machine_lock:{machine_id}"):
+    async with write_guard(f"machine_lock:{machine_id}", if_match):
         stmt = select(Machines).filter(Machines.id == machine_id)
         stmt = ctx.team_filter(stmt, Machines)
         result = await db.execute(stmt)
@@ -390,12 +547,15 @@ async def delete_machine(
 
         if not machine:
             raise ObjectNotFoundError("Machine")
+        check_version(machine, if_match, "Machine")
         try:
             await db.delete(machine)
             await db.commit()
             return Response(status_code=status.HTTP_204_NO_CONTENT)
         except Exception as e:
             await db.rollback()
+            if isinstance(e, StaleDataError):
+                raise
             raise ValidationError(f"Could not delete machine '{machine.name}'") from e
 
 
@@ -1,11 +1,12 @@
 """Router for Metadata Database API CRUD."""
 
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.auth.dependencies import RequestContext
 from app.core.exceptions import (
@@ -15,6 +16,12 @@ from app.core.exceptions import (
 from app.database import get_async_db
 from app.db.models import Machines, Metadata
 from app.db.schemas import MetadataCreate, MetadataResponse, MetadataUpdate
+from app.utils.concurrency_service import (
+    check_version,
+    get_if_match_version,
+    set_entity_etag,
+    write_guard,
+)
 from app.utils.redis_service import acquire_lock
 
 router = APIRouter(prefix="/db", tags=["Machines Metadata"])
@@ -70,12 +77,14 @@ async def get_all_metadata(
 @router.get("/metadata/{meta_id}", response_model=MetadataResponse)
 async def get_metadata(
     meta_id: int,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
     """Fetch metadata by ID.
 
     :param meta_id: Metadata ID
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for user and team info
     :return: Metadata object.
@@ -86,6 +95,7 @@ async def get_metadata(
 
     if not obj:
         raise ObjectNotFoundError("Metadata")
+    set_entity_etag(response, obj)
     return obj
 
 
@@ -93,19 +103,23 @@ async def get_metadata(
 async def update_metadata(
     meta_id: int,
     data: MetadataUpdate,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
+    if_match: Optional[int] = Depends(get_if_match_version),
 ):
     """Update Metadata.
 
     :param meta_id: Metadata ID
     :param data: Metadata data schema
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for user and team info
+    :param if_match: Expected version, skips the Redis lock when given
     :return: Updated Metadata.
     """
     ctx.require_user()
-    async with acquire_lock(f"meta_lock:{meta_id}"):
+    async with write_guard(f"meta_lock:{meta_id}", if_match):
         stmt = (
             select(Metadata)
             .filter(Metadata.id == meta_id)
@@ -115,6 +129,7 @@ async def update_metadata(
         obj = (await db.execute(ctx.team_filter(stmt, Machines))).scalar_one_or_none()
         if not obj:
             raise ObjectNotFoundError("Metadata")
+        check_version(obj, if_match, "Metadata")
 
         m_name = obj.machines[0].name if obj.machines else f"ID {meta_id}"
 
@@ -123,9 +138,12 @@ async def update_metadata(
                 setattr(obj, k, v)
 
             await db.commit()
+            set_entity_etag(response, obj)
             return obj
         except Exception as e:
             await db.rollback()
+            if isinstance(e, StaleDataError):
+                raise
             raise ValidationError(
                 f"Failed to update metadata for machine '{m_name}'"
             ) from e
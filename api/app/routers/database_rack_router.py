@@ -2,10 +2,11 @@
 
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query, Response, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.auth.dependencies import RequestContext
 from app.core.exceptions import (
@@ -16,16 +17,34 @@ from app.core.exceptions import (
     ConflictError,
 )
 from app.database import get_async_db
-from app.db.models import Machines, Rack, Rooms, Shelf, Tags
+from app.db.models import Machines, Rack, Rooms, Shelf, Tags, TagsRacks, Teams
 from app.db.schemas import (
     RackCreate,
     RackResponse,
     RackUpdate,
     RackWithOrderedMachinesResponse,
 )
+from app.utils.cache_service import cached
+from app.utils.concurrency_service import (
+    check_version,
+    get_if_match_version,
+    set_entity_etag,
+    write_guard,
+)
+from app.utils.etag_service import check_not_modified
 from sqlalchemy.exc import IntegrityError
 
 router = APIRouter(prefix="/db", tags=["Racks"])
+RACKS_ETAG_MODELS = (Rack, Rooms, Teams, Tags, TagsRacks, Shelf, Machines)
+RACKS_CACHE_TAGS = tuple(model.__tablename__ for model in RACKS_ETAG_MODELS)
+RACK_MACHINE_COLUMNS = (
+    Machines.id,
+    Machines.name,
+    Machines.ip_address,
+    Machines.mac_address,
+    Machines.team_id,
+    Machines.shelf_id,
+)
 
 
 def format_rack_output(rack: Rack):
@@ -56,44 +75,116 @@ def format_rack_output(rack: Rack):
     }
 
 
+def racks_overview_stmt(
+    room_ids: Optional[List[int]] = None, team_ids: Optional[List[int]] = None
+):
+    """Build rack listing query without joined collections.
+
+    Room and team names come from many-to-one joins, which keep one row per
+    rack. Tags and shelves are loaded by separate IN queries (selectinload)
+    and machines only with the columns the listing shows, so the result is
+    not a tags x shelves x machines product per rack.
+    :param room_ids: Optional list of room IDs to filter by
+    :param team_ids: Optional list of team IDs to filter by
+    :return: Select of (Rack, room name, team name) rows.
+    """
+    stmt = (
+        select(Rack, Rooms.name, Teams.name)
+        .outerjoin(Rooms, Rack.room_id == Rooms.id)
+        .outerjoin(Teams, Rack.team_id == Teams.id)
+        .options(
+            selectinload(Rack.tags),
+            selectinload(Rack.shelves)
+            .selectinload(Shelf.machines)
+            .load_only(*RACK_MACHINE_COLUMNS, raiseload=True),
+        )
+        .order_by(Rack.id)
+    )
+    if room_ids:
+        stmt = stmt.where(Rack.room_id.in_(room_ids))
+    if team_ids:
+        stmt = stmt.where(Rack.team_id.in_(team_ids))
+    return stmt
+
+
+@cached(
+    namespace="racks_overview",
+    tags=RACKS_CACHE_TAGS,
+    key_builder=lambda db, ctx, *args: (ctx.visibility_key(), *args),
+)
+async def racks_overview(
+    db: AsyncSession,
+    ctx: RequestContext,
+    room_ids: Optional[List[int]],
+    team_ids: Optional[List[int]],
+    limit: Optional[int],
+    offset: int,
+) -> dict:
+    """Load the rack listing serialized for the response.
+
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :param room_ids: Optional list of room IDs to filter by
+    :param team_ids: Optional list of team IDs to filter by
+    :param limit: Optional page size, all racks are returned without it
+    :param offset: Number of racks to skip
+    :return: Dictionary with racks and number of all matching racks when paged.
+    """
+    stmt = ctx.team_filter(racks_overview_stmt(room_ids, team_ids), Rack)
+    total = None
+    if limit is not None:
+        total = await db.scalar(
+            select(func.count()).select_from(
+                stmt.with_only_columns(Rack.id).order_by(None).subquery()
+            )
+        )
+        stmt = stmt.offset(offset).limit(limit)
+
+    result = await db.execute(stmt)
+    racks = []
+    for rack, room_name, team_name in result.all():
+        rack.room_name = room_name or "N/A"
+        rack.team_name = team_name or "N/A"
+        racks.append(RackResponse.model_validate(rack).model_dump(mode="json"))
+    return {"total": total, "racks": racks}
+
+
 @router.get("/racks", response_model=List[RackResponse])
 async def get_racks(
+    request: Request,
+    response: Response,
     room_ids: Optional[List[int]] = Query(None),
     team_ids: Optional[List[int]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
-    """Returns ALL racks with their shelves and machines nested inside.
+    """Returns racks with their shelves and machines nested inside.
 
+    Supports conditional GET, unchanged data is answered with 304.
+    With limit set, one page is returned and X-Total-Count holds the number
+    of all matching racks. Listings are cached until a listed table changes.
+    :param request: Incoming request with optional If-None-Match header
+    :param response: Response used to expose the ETag header
     :param room_ids: Optional list of room IDs to filter by
     :param team_ids: Optional list of team IDs to filter by
+    :param limit: Optional page size, all racks are returned without it
+    :param offset: Number of racks to skip
     :param ctx: Request context for database and user info
     :return: List of racks with nested structures.
     """
     ctx.require_user()
-    stmt = select(Rack)
-    stmt = ctx.team_filter(stmt, Rack)
-
-    if room_ids:
-        stmt = stmt.where(Rack.room_id.in_(room_ids))
-    if team_ids:
-        stmt = stmt.where(Rack.team_id.in_(team_ids))
-
-    stmt = stmt.options(
-        joinedload(Rack.room),
-        joinedload(Rack.team),
-        joinedload(Rack.tags),
-        joinedload(Rack.shelves).joinedload(Shelf.machines),
+    not_modified = await check_not_modified(
+        request, response, db, ctx, RACKS_ETAG_MODELS
     )
+    if not_modified:
+        return not_modified
 
-    result = await db.execute(stmt)
-    racks = result.unique().scalars().all()
-
-    for r in racks:
-        r.room_name = r.room.name if r.room else "N/A"
-        r.team_name = r.team.name if r.team else "N/A"
-
-    return racks
+    overview = await racks_overview(db, ctx, room_ids, team_ids, limit, offset)
+    if overview["total"] is not None:
+        response.headers["X-Total-Count"] = str(overview["total"])
+    return overview["racks"]
 
 
 @router.get("/racks-list")
@@ -120,12 +211,14 @@ async def get_racks_list(
 @router.get("/racks/{rack_id}", response_model=RackResponse)
 async def get_rack_detail(
     rack_id: int,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
     """Fetch specific rack by ID with its nested shelves and machines.
 
     :param rack_id: ID of the rack
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for user and team info
     :return: Detailed rack object.
@@ -147,6 +240,7 @@ async def get_rack_detail(
     rack.room_name = rack.room.name if rack.room else "N/A"
     rack.team_name = rack.team.name if rack.team else "N/A"
 
+    set_entity_etag(response, rack)
     return rack
 
 
@@ -236,78 +330,90 @@ async def create_rack(
 async def update_rack(
     rack_id: int,
     rack_data: RackUpdate,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
+    if_match: Optional[int] = Depends(get_if_match_version),
 ):
     """Update an existing rack including team or room changes.
 
     :param rack_id: ID of the rack to update
     :param rack_data: Data fields to update
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for permissions
+    :param if_match: Expected version, skips the Redis lock when given
     :return: Updated rack object.
     """
     ctx.require_user()
 
-    stmt = select(Rack).where(Rack.id == rack_id)
-    stmt = ctx.team_filter(stmt, Rack)
-    result = await db.execute(stmt)
-    db_rack = result.scalar_one_or_none()
-
-    if not db_rack:
-        raise ObjectNotFoundError("Rack")
-
     update_dict = rack_data.model_dump(exclude_unset=True)
-
-    # TO DO: Handle ordering of machines
-    update_dict.pop("machines", None)
-    try:
-        if "tag_ids" in update_dict:
-            tag_ids = update_dict.pop("tag_ids")
-            if tag_ids is not None:
-                tag_stmt = select(Tags).where(Tags.id.in_(tag_ids))
-                tag_res = await db.execute(tag_stmt)
-                db_rack.tags = tag_res.scalars().all()
-
-        if "team_id" in update_dict:
-            await ctx.validate_team_access(update_dict["team_id"])
-
-        if "room_id" in update_dict:
-            new_room_id = update_dict["room_id"]
-            room_stmt = select(Rooms).where(Rooms.id == new_room_id)
-            room_res = await db.execute(room_stmt)
-            room = room_res.scalar_one_or_none()
-            if not room:
-                raise ObjectNotFoundError("New room")
-
-            if not ctx.is_admin and room.team_id not in ctx.team_ids:
-                raise AccessDeniedError(f"Room '{room.name}' is owned by another team")
-
-        for key, value in update_dict.items():
-            setattr(db_rack, key, value)
-
-        final_stmt = (
-            select(Rack)
-            .where(Rack.id == rack_id)
-            .options(
-                selectinload(Rack.room),
-                selectinload(Rack.team),
-                selectinload(Rack.tags),
-                selectinload(Rack.shelves).selectinload(Shelf.machines),
+    # Tag links live in an association table that version_id does not cover.
+    lock_free_version = None if "tag_ids" in update_dict else if_match
+    async with write_guard(f"rack_lock:{rack_id}", lock_free_version):
+        stmt = select(Rack).where(Rack.id == rack_id)
+        stmt = ctx.team_filter(stmt, Rack)
+        result = await db.execute(stmt)
+        db_rack = result.scalar_one_or_none()
+
+        if not db_rack:
+            raise ObjectNotFoundError("Rack")
+        check_version(db_rack, if_match, "Rack")
+        rack_name = db_rack.name
+
+        # TO DO: Handle ordering of machines
+        update_dict.pop("machines", None)
+        try:
+            if "tag_ids" in update_dict:
+                tag_ids = update_dict.pop("tag_ids")
+                if tag_ids is not None:
+                    tag_stmt = select(Tags).where(Tags.id.in_(tag_ids))
+                    tag_res = await db.execute(tag_stmt)
+                    db_rack.tags = tag_res.scalars().all()
+
+            if "team_id" in update_dict:
+                await ctx.validate_team_access(update_dict["team_id"])
+
+            if "room_id" in update_dict:
+                new_room_id = update_dict["room_id"]
+                room_stmt = select(Rooms).where(Rooms.id == new_room_id)
+                room_res = await db.execute(room_stmt)
+                room = room_res.scalar_one_or_none()
+                if not room:
+                    raise ObjectNotFoundError("New room")
+
+                if not ctx.is_admin and room.team_id not in ctx.team_ids:
+                    raise AccessDeniedError(
+                        f"Room '{room.name}' is owned by another team"
+                    )
+
+            for key, value in update_dict.items():
+                setattr(db_rack, key, value)
+            await db.commit()
+
+            final_stmt = (
+                select(Rack)
+                .where(Rack.id == rack_id)
+                .options(
+                    selectinload(Rack.room),
+                    selectinload(Rack.team),
+                    selectinload(Rack.tags),
+                    selectinload(Rack.shelves).selectinload(Shelf.machines),
+                )
             )
-        )
-        result = await db.execute(final_stmt)
-        db_rack = result.unique().scalar_one()
-
-        db_rack.room_name = db_rack.room.name if db_rack.room else "N/A"
-        db_rack.team_name = db_rack.team.name if db_rack.team else "N/A"
-
-        return db_rack
-    except Exception as e:
-        await db.rollback()
-        if isinstance(e, (ObjectNotFoundError, AccessDeniedError)):
-            raise e
-        raise ValidationError(f"Failed to update rack '{db_rack.name}'") from e
+            result = await db.execute(final_stmt)
+            db_rack = result.unique().scalar_one()
+
+            db_rack.room_name = db_rack.room.name if db_rack.room else "N/A"
+            db_rack.team_name = db_rack.team.name if db_rack.team else "N/A"
+
+            set_entity_etag(response, db_rack)
+            return db_rack
+        except Exception as e:
+            await db.rollback()
+            if isinstance(e, (ObjectNotFoundError, AccessDeniedError, StaleDataError)):
+                raise e
+            raise ValidationError(f"Failed to update rack '{rack_name}'") from e
 
 
 @router.delete("/racks/{rack_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -4,7 +4,7 @@ from datetime import date
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, Response, status
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
@@ -16,12 +16,43 @@ from app.core.exceptions import (
 )
 from app.database import get_async_db
 from app.db.models import Inventory, Rentals
-from app.db.schemas import RentalReturn, RentalsCreate, RentalsResponse
-from app.utils.redis_service import acquire_lock
+from app.db.schemas import (
+    RentalBulkReturn,
+    RentalReturn,
+    RentalsCreate,
+    RentalsResponse,
+)
+from app.utils.redis_service import acquire_lock, acquire_locks
+from app.utils.rental_service import get_reserved_quantities
 
 router = APIRouter(prefix="/db", tags=["Inventory-Rentals"])
 
 
+def apply_return(rental: Rentals, item: Inventory, quantity: Optional[int]) -> str:
+    """Return whole rental or part of its quantity.
+
+    :param rental: Rental being returned
+    :param item: Rented inventory item
+    :param quantity: Returned quantity, whole rental if not provided
+    :return: Message describing the return.
+    """
+    qty_to_return = quantity or rental.quantity
+    if qty_to_return > rental.quantity:
+        raise InsufficientAmountError(
+            requested=qty_to_return, available=rental.quantity
+        )
+
+    item.rental_status = False
+    if qty_to_return == rental.quantity:
+        rental.end_date = date.today()
+        return f"Fully returned '{item.name}'"
+    rental.quantity -= qty_to_return
+    return (
+        f"Partially returned {qty_to_return}x "
+        f"'{item.name}'. Remaining: {rental.quantity}"
+    )
+
+
 @router.post(
     "/rentals",
     response_model=RentalsResponse,
@@ -53,15 +84,10 @@ async def create_rental(
         if not item:
             raise ObjectNotFoundError("Item for this rental")
 
-        sum_stmt = select(func.coalesce(func.sum(Rentals.quantity), 0)).filter(
-            Rentals.item_id == item.id,
-            Rentals.start_date <= rent_data.end_date,
-            Rentals.end_date >= rent_data.start_date,
+        reserved = await get_reserved_quantities(
+            db, [item.id], rent_data.start_date, rent_data.end_date
         )
-        sum_result = await db.execute(sum_stmt)
-        active_rentals_sum = sum_result.scalar()
-
-        in_stock = item.quantity - active_rentals_sum
+        in_stock = item.quantity - reserved.get(item.id, 0)
 
         if rent_data.quantity > in_stock:
             raise InsufficientAmountError(
@@ -90,6 +116,159 @@ async def create_rental(
             raise ValidationError(f"Failed to create rental for '{item.name}'") from e
 
 
+@router.post(
+    "/rentals/bulk",
+    response_model=List[RentalsResponse],
+    status_code=status.HTTP_201_CREATED,
+)
+async def bulk_create_rentals(
+    rentals_data: List[RentalsCreate],
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Rent many items at once, either all of them or none.
+
+    Item locks are taken in ID order, availability is checked once per
+    distinct date range after all rentals are inserted and everything is
+    committed together.
+
+    :param rentals_data: List of rentals to create
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: New Rental objects.
+    """
+    ctx.require_user()
+    if not rentals_data:
+        return []
+    if any(r.start_date > r.end_date for r in rentals_data):
+        raise ValidationError("Start date must not be after end date")
+    item_ids = sorted({r.item_id for r in rentals_data})
+
+    async with acquire_locks(f"inventory_lock:{item_id}" for item_id in item_ids):
+        stmt = (
+            select(Inventory)
+            .filter(Inventory.id.in_(item_ids))
+            .order_by(Inventory.id)
+            .with_for_update(nowait=True)
+        )
+        items = {item.id: item for item in (await db.execute(stmt)).scalars()}
+        if len(items) != len(item_ids):
+            raise ObjectNotFoundError("Item for this rental")
+
+        rentals = [
+            Rentals(**rent_data.model_dump(), user_id=ctx.current_user.id)
+            for rent_data in rentals_data
+        ]
+        try:
+            db.add_all(rentals)
+            await db.flush()
+
+            ranges = {}
+            for rental in rentals:
+                ranges.setdefault((rental.start_date, rental.end_date), set()).add(
+                    rental.item_id
+                )
+            for (start_date, end_date), range_item_ids in ranges.items():
+                reserved = await get_reserved_quantities(
+                    db, range_item_ids, start_date, end_date
+                )
+                for item_id in range_item_ids:
+                    item = items[item_id]
+                    if reserved.get(item_id, 0) > item.quantity:
+                        requested = sum(
+                            r.quantity
+                            for r in rentals_data
+                            if r.item_id == item_id
+                            and r.start_date == start_date
+                            and r.end_date == end_date
+                        )
+                        raise InsufficientAmountError(
+                            requested=requested,
+                            available=item.quantity - (reserved[item_id] - requested),
+                        )
+                    if reserved.get(item_id, 0) == item.quantity:
+                        item.rental_status = True
+
+            await db.commit()
+            return rentals
+        except InsufficientAmountError:
+            await db.rollback()
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise ValidationError("Failed to create rentals") from e
+
+
+@router.post("/rentals/bulk/return")
+async def bulk_return_rentals(
+    returns_data: List[RentalBulkReturn],
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """End many rentals at once, either all of them or none.
+
+    :param returns_data: List of rentals and returned quantities
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Success message with individual return messages.
+    """
+    ctx.require_user()
+    rental_ids = [r.rental_id for r in returns_data]
+    if len(set(rental_ids)) != len(rental_ids):
+        raise ValidationError("Each rental can be returned only once per batch")
+    if not rental_ids:
+        return {"message": "Returned 0 rentals", "details": []}
+
+    item_stmt = (
+        select(Rentals.id, Rentals.item_id)
+        .join(Inventory, Rentals.item_id == Inventory.id)
+        .filter(Rentals.id.in_(rental_ids))
+    )
+    item_by_rental = dict(
+        (await db.execute(ctx.team_filter(item_stmt, Inventory))).all()
+    )
+    if len(item_by_rental) != len(rental_ids):
+        raise ObjectNotFoundError("Rental for this item")
+
+    item_ids = sorted(set(item_by_rental.values()))
+    async with acquire_locks(f"inventory_lock:{item_id}" for item_id in item_ids):
+        items_stmt = (
+            select(Inventory)
+            .filter(Inventory.id.in_(item_ids))
+            .order_by(Inventory.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        items = {item.id: item for item in (await db.execute(items_stmt)).scalars()}
+        rentals_stmt = (
+            select(Rentals)
+            .filter(Rentals.id.in_(rental_ids))
+            .order_by(Rentals.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        rentals = {r.id: r for r in (await db.execute(rentals_stmt)).scalars()}
+
+        try:
+            messages = [
+                apply_return(
+                    rentals[r.rental_id],
+                    items[rentals[r.rental_id].item_id],
+                    r.quantity,
+                )
+                for r in returns_data
+            ]
+            await db.commit()
+        except InsufficientAmountError:
+            await db.rollback()
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise ValidationError("Bulk return failed") from e
+
+    return {"message": f"Returned {len(messages)} rentals", "details": messages}
+
+
 @router.post("/rentals/{rental_id}/return")
 async def return_rental(
     rental_id: int,
@@ -110,7 +289,7 @@ async def return_rental(
         select(Rentals)
         .join(Inventory, Rentals.item_id == Inventory.id)
         .filter(Rentals.id == rental_id)
-        .options(joinedload(Rentals.item))
+        .options(joinedload(Rentals.inventory))
     )
     rental = (
         await db.execute(ctx.team_filter(check_stmt, Inventory))
@@ -119,34 +298,13 @@ async def return_rental(
     if not rental:
         raise ObjectNotFoundError("Rental for this item")
 
-    item = rental.item
+    item = rental.inventory
     async with acquire_lock(f"inventory_lock:{item.id}"):
         await db.refresh(rental)
         await db.refresh(item)
 
-        qty_to_return = (
-            return_data.quantity
-            if return_data and return_data.quantity
-            else rental.quantity
-        )
-
-        if qty_to_return > rental.quantity:
-            raise InsufficientAmountError(
-                requested=qty_to_return, available=rental.quantity
-            )
-
+        msg = apply_return(rental, item, return_data.quantity if return_data else None)
         try:
-            if qty_to_return == rental.quantity:
-                rental.end_date = date.today()
-                msg = f"Fully returned '{item.name}'"
-            else:
-                rental.quantity -= qty_to_return
-                msg = (
-                    f"Partially returned {qty_to_return}x "
-                    f"'{item.name}'. Remaining: {rental.quantity}"
-                )
-
-            item.rental_status = False
             await db.commit()
             return {"message": msg}
         except Exception as e:
@@ -218,7 +376,7 @@ async def delete_rental(
         select(Rentals)
         .join(Inventory, Rentals.item_id == Inventory.id)
         .filter(Rentals.id == rental_id)
-        .options(joinedload(Rentals.item))
+        .options(joinedload(Rentals.inventory))
     )
     stmt = ctx.team_filter(stmt, Inventory)
     result = await db.execute(stmt)
@@ -1,17 +1,35 @@
 """Router for Room Database API CRUD."""
 
-from typing import List
-
-from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import select
+import json
+import os
+from typing import AsyncIterator, List, Optional
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, or_, select, union
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.auth.dependencies import RequestContext
-from app.core.exceptions import ObjectNotFoundError, ValidationError, ConflictError
-from app.database import get_async_db
-from app.db.models import Rack, Rooms, Shelf, Tags
+from app.core.exceptions import (
+    ConflictError,
+    ObjectNotFoundError,
+    ValidationError,
+)
+from app.database import AsyncSessionLocal, get_async_db
+from app.db.models import (
+    Machines,
+    Rack,
+    Rooms,
+    Shelf,
+    Tags,
+    TagsRacks,
+    TagsRooms,
+    Teams,
+)
 from app.db.schemas import (
     RoomDashboardResponse,
     RoomDetailsResponse,
@@ -19,9 +37,89 @@ from app.db.schemas import (
     RoomsResponse,
     RoomsUpdate,
 )
-from app.utils.redis_service import acquire_lock
+from app.utils.cache_service import cached
+from app.utils.concurrency_service import (
+    check_version,
+    get_if_match_version,
+    set_entity_etag,
+    write_guard,
+)
+from app.utils.etag_service import check_not_modified, fingerprint
+from app.utils.prometheus_service import get_online_hosts
+from app.utils.redis_service import acquire_lock, get_cache
+
+load_dotenv(".env/api.env")
+ROOM_STREAM_BATCH_SIZE = int(os.getenv("ROOM_STREAM_BATCH_SIZE", "50"))
 
 router = APIRouter(prefix="/db", tags=["Rooms"])
+ROOM_DETAILS_CACHE_TAGS = tuple(
+    model.__tablename__
+    for model in (Rooms, TagsRooms, Rack, TagsRacks, Tags, Shelf, Machines)
+)
+ROOM_MACHINE_COLUMNS = (
+    Machines.id,
+    Machines.name,
+    Machines.ip_address,
+    Machines.mac_address,
+    Machines.shelf_id,
+)
+
+
+def serialize_lab_rack(rack: Rack) -> dict:
+    """Build rack section of the lab details view.
+
+    :param rack: Rack with loaded tags, shelves and machines
+    :return: Rack dictionary matching LabRackSection.
+    """
+    return {
+        "id": rack.id,
+        "name": rack.name,
+        "tags": [
+            {
+                "name": getattr(t, "name", "Unnamed"),
+                "color": getattr(t, "color", "red"),
+            }
+            for t in (rack.tags or [])
+        ],
+        "machines": [
+            {
+                "id": str(m.id),
+                "hostname": m.name,
+                "ip_address": m.ip_address,
+                "mac_address": m.mac_address,
+            }
+            for shelf in rack.shelves
+            for m in shelf.machines
+        ],
+    }
+
+
+async def stream_room_racks(room_id: int) -> AsyncIterator[str]:
+    """Yield NDJSON lines with racks of a room read from a server-side cursor.
+
+    The generator uses its own session, because the request session is closed
+    before the response body is sent. Tags, shelves and machines are loaded
+    with selectinload once per fetched batch, so memory stays bounded by
+    ROOM_STREAM_BATCH_SIZE racks.
+    :param room_id: Room ID
+    :return: Async iterator of JSON lines.
+    """
+    stmt = (
+        select(Rack)
+        .where(Rack.room_id == room_id)
+        .options(
+            selectinload(Rack.tags),
+            selectinload(Rack.shelves)
+            .selectinload(Shelf.machines)
+            .load_only(*ROOM_MACHINE_COLUMNS, raiseload=True),
+        )
+        .order_by(Rack.id)
+        .execution_options(yield_per=ROOM_STREAM_BATCH_SIZE)
+    )
+    async with AsyncSessionLocal() as db:
+        racks = await db.stream_scalars(stmt)
+        async for rack in racks:
+            yield json.dumps({"type": "rack", **serialize_lab_rack(rack)}) + "\n"
 
 
 @router.post(
@@ -105,51 +203,110 @@ async def get_rooms_dashboard(
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
-    """Fetch all rooms with rack count and map link for dashboard.
+    """Fetch all rooms with rack, machine and online counts for dashboard.
 
+    Counts are computed by GROUP BY subqueries, so one row is read per room.
+    Online machines are matched by name or IP against the cached Prometheus
+    status snapshot.
     :param db: Active database session
     :param ctx: Request context for user and team info
     :return: Room object.
     """
     ctx.require_user()
-    stmt = select(Rooms).options(
-        joinedload(Rooms.racks), joinedload(Rooms.layouts), joinedload(Rooms.team)
+    online_hosts = list(get_online_hosts(await get_cache("prometheus_metrics_cache")))
+
+    rack_counts = (
+        select(Rack.room_id, func.count().label("rack_count"))
+        .group_by(Rack.room_id)
+        .subquery()
+    )
+    machine_counts = (
+        select(
+            Machines.localization_id.label("room_id"),
+            func.count().label("machine_count"),
+            func.count()
+            .filter(
+                or_(
+                    Machines.name.in_(online_hosts),
+                    Machines.ip_address.in_(online_hosts),
+                )
+            )
+            .label("online_count"),
+        )
+        .group_by(Machines.localization_id)
+        .subquery()
+    )
+    stmt = (
+        select(
+            Rooms.id,
+            Rooms.name,
+            Teams.name.label("team_name"),
+            func.coalesce(rack_counts.c.rack_count, 0),
+            func.coalesce(machine_counts.c.machine_count, 0),
+            func.coalesce(machine_counts.c.online_count, 0),
+        )
+        .outerjoin(Teams, Rooms.team_id == Teams.id)
+        .outerjoin(rack_counts, rack_counts.c.room_id == Rooms.id)
+        .outerjoin(machine_counts, machine_counts.c.room_id == Rooms.id)
+        .order_by(Rooms.id)
     )
     stmt = ctx.team_filter(stmt, Rooms)
 
     result = await db.execute(stmt)
-    rooms = result.unique().scalars().all()
-
-    results = []
-    for r in rooms:
-        results.append(
-            {
-                "id": r.id,
-                "name": r.name,
-                "team_name": r.team.name if r.team else "N/A",
-                "rack_count": len(r.racks),
-                "map_link": f"/map/room/{r.id}",
-            }
+    return [
+        {
+            "id": room_id,
+            "name": name,
+            "team_name": team_name or "N/A",
+            "rack_count": rack_count,
+            "machine_count": machine_count,
+            "online_count": online_count,
+            "map_link": f"/map/room/{room_id}",
+        }
+        for room_id, name, team_name, rack_count, machine_count, online_count in (
+            result.all()
         )
-    return results
+    ]
 
 
-@router.get("/rooms/{room_id}/details", response_model=RoomDetailsResponse)
-async def get_room_details(
-    room_id: int,
-    db: AsyncSession = Depends(get_async_db),
-    ctx: RequestContext = Depends(RequestContext.create),
-):
-    """Fetch specific room by ID with nested racks, shelves and machines.
-
-    For dashboard details
+def room_details_fingerprints(room_id: int) -> list:
+    """Build fingerprints of the rows shown in room details.
 
     :param room_id: Room ID
+    :return: List of fingerprint queries scoped to the room.
+    """
+    rack_ids = select(Rack.id).where(Rack.room_id == room_id)
+    tag_ids = union(
+        select(TagsRooms.tag_id).where(TagsRooms.room_id == room_id),
+        select(TagsRacks.tag_id).where(TagsRacks.rack_id.in_(rack_ids)),
+    )
+    return [
+        fingerprint(Rooms, Rooms.id == room_id),
+        fingerprint(TagsRooms, TagsRooms.room_id == room_id),
+        fingerprint(Rack, Rack.room_id == room_id),
+        fingerprint(TagsRacks, TagsRacks.rack_id.in_(rack_ids)),
+        fingerprint(Tags, Tags.id.in_(tag_ids)),
+        fingerprint(Shelf, Shelf.rack_id.in_(rack_ids)),
+        fingerprint(
+            Machines,
+            Machines.shelf_id.in_(select(Shelf.id).where(Shelf.rack_id.in_(rack_ids))),
+        ),
+    ]
+
+
+@cached(
+    namespace="room_details",
+    tags=ROOM_DETAILS_CACHE_TAGS,
+    key_builder=lambda db, ctx, room_id: (ctx.visibility_key(), room_id),
+)
+async def room_details(db: AsyncSession, ctx: RequestContext, room_id: int) -> dict:
+    """Load room with nested racks, shelves and machines for the details view.
+
     :param db: Active database session
     :param ctx: Request context for user and team info
-    :return: Room object.
+    :param room_id: Room ID
+    :return: Room dictionary matching RoomDetailsResponse.
     """
-    ctx.require_user()
     stmt = (
         select(Rooms)
         .options(
@@ -168,53 +325,95 @@ async def get_room_details(
     if not room:
         raise HTTPException(status_code=404, detail="Lab not found")
 
-    racks_list = []
-    for rack in room.racks:
-        machines_in_rack = []
-        for shelf in rack.shelves:
-            for m in shelf.machines:
-                machines_in_rack.append(
-                    {
-                        "id": str(m.id),
-                        "hostname": m.name,
-                        "ip_address": m.ip_address,
-                        "mac_address": m.mac_address,
-                    }
-                )
+    return {
+        "id": room.id,
+        "name": room.name,
+        "tags": [t.name for t in room.tags],
+        "map_link": f"/map/room/{room.id}",
+        "racks": [serialize_lab_rack(rack) for rack in room.racks],
+    }
 
-        racks_list.append(
-            {
-                "id": rack.id,
-                "name": rack.name,
-                "tags": [
-                    {
-                        "name": getattr(t, "name", "Unnamed"),
-                        "color": getattr(t, "color", "red"),
-                    }
-                    for t in (rack.tags or [])
-                ],
-                "machines": machines_in_rack,
-            }
-        )
 
-    return {
+@router.get("/rooms/{room_id}/details", response_model=RoomDetailsResponse)
+async def get_room_details(
+    room_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Fetch specific room by ID with nested racks, shelves and machines.
+
+    For dashboard details, supports conditional GET with If-None-Match.
+    Details are cached until a shown table changes.
+
+    :param room_id: Room ID
+    :param request: Incoming request with optional If-None-Match header
+    :param response: Response used to expose the ETag header
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Room object.
+    """
+    ctx.require_user()
+    not_modified = await check_not_modified(
+        request, response, db, ctx, room_details_fingerprints(room_id)
+    )
+    if not_modified:
+        return not_modified
+    return await room_details(db, ctx, room_id)
+
+
+@router.get("/rooms/{room_id}/details/stream")
+async def stream_room_details(
+    room_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Stream room details as NDJSON, one rack per line.
+
+    The first line describes the room itself ("type": "room"), every following
+    line holds one rack ("type": "rack") in the same shape as the racks of
+    /rooms/{room_id}/details. Suited for rooms with thousands of machines.
+
+    :param room_id: Room ID
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Streaming NDJSON response.
+    """
+    ctx.require_user()
+    stmt = select(Rooms).options(selectinload(Rooms.tags)).filter(Rooms.id == room_id)
+    stmt = ctx.team_filter(stmt, Rooms)
+    room = (await db.execute(stmt)).scalar_one_or_none()
+    if not room:
+        raise ObjectNotFoundError("Room")
+
+    header = {
+        "type": "room",
         "id": room.id,
         "name": room.name,
         "tags": [t.name for t in room.tags],
         "map_link": f"/map/room/{room.id}",
-        "racks": racks_list,
     }
 
+    async def body():
+        yield json.dumps(header) + "\n"
+        async for line in stream_room_racks(room_id):
+            yield line
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
 
 @router.get("/rooms/{room_id}", response_model=RoomsResponse)
 async def get_room_by_id(
     room_id: int,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
     """Fetch specific room by ID.
 
     :param room_id: Room ID
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for user and team info
     :return: Room object.
@@ -228,6 +427,7 @@ async def get_room_by_id(
 
     if not room:
         raise ObjectNotFoundError("Room")
+    set_entity_etag(response, room)
     return room
 
 
@@ -235,20 +435,27 @@ async def get_room_by_id(
 async def update_room(
     room_id: int,
     room_data: RoomsUpdate,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
+    if_match: Optional[int] = Depends(get_if_match_version),
 ):
     """Update room.
 
     :param room_id: Room ID
     :param room_data: Room data schema
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for user and team info
+    :param if_match: Expected version, skips the Redis lock when given
     :return: Updated Room.
     """
     ctx.require_group_admin()
 
-    async with acquire_lock(f"room_lock:{room_id}"):
+    update_data = room_data.model_dump(exclude_unset=True)
+    # Tag links live in an association table that version_id does not cover.
+    lock_free_version = None if "tag_ids" in update_data else if_match
+    async with write_guard(f"room_lock:{room_id}", lock_free_version):
         stmt = select(Rooms).filter(Rooms.id == room_id)
         stmt = ctx.team_filter(stmt, Rooms)
 
@@ -257,8 +464,8 @@ async def update_room(
 
         if not room:
             raise ObjectNotFoundError("Room", id=room_id)
+        check_version(room, if_match, "Room")
 
-        update_data = room_data.model_dump(exclude_unset=True)
         try:
             if "tag_ids" in update_data:
                 tag_ids = update_data.pop("tag_ids")
@@ -275,6 +482,7 @@ async def update_room(
 
             await db.commit()
             await db.refresh(room, attribute_names=["team", "racks"])
+            set_entity_etag(response, room)
             return room
         except IntegrityError:
             await db.rollback()
@@ -282,6 +490,8 @@ async def update_room(
                 message=f"Conflict: Room name '{room.name}' is already taken in this team."
             )
         except Exception as e:
+            if isinstance(e, StaleDataError):
+                raise
             raise ValidationError(f"Failed to update room '{room.name}'") from e
 
 
@@ -1,11 +1,13 @@
 """Router for Shelf Database API CRUD."""
 
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.auth.dependencies import RequestContext
 from app.core.exceptions import (
@@ -14,9 +16,20 @@ from app.core.exceptions import (
     ValidationError,
 )
 from app.database import get_async_db
-from app.db.models import Rack, Shelf
-from app.db.schemas import ShelfCreate, ShelfResponse, ShelfUpdate
-from app.utils.redis_service import acquire_lock
+from app.db.models import Machines, Rack, Shelf
+from app.db.schemas import (
+    BulkDelete,
+    ShelfBulkUpdate,
+    ShelfCreate,
+    ShelfResponse,
+    ShelfUpdate,
+)
+from app.utils.bulk_service import bulk_update_rows, check_visible_ids
+from app.utils.concurrency_service import (
+    check_version,
+    get_if_match_version,
+    set_entity_etag,
+)
 
 router = APIRouter(prefix="/db", tags=["Shelves"])
 
@@ -109,73 +122,195 @@ async def create_shelf(
     :return: Created shelf object with rack context.
     """
     ctx.require_user()
-    async with acquire_lock(f"rack_lock:{rack_id}"):
-        rack_stmt = select(Rack).filter(Rack.id == rack_id)
-        rack_stmt = ctx.team_filter(rack_stmt, Rack)
-        rack_res = await db.execute(rack_stmt)
-        rack = rack_res.scalar_one_or_none()
-
-        if not rack:
-            raise ObjectNotFoundError("Rack")
-
-        try:
-            db_shelf = Shelf(**shelf_data.model_dump(), rack_id=rack_id)
-            db.add(db_shelf)
-            await db.commit()
-
-            await db.refresh(db_shelf, attribute_names=["rack", "machines"])
-            db_shelf.rack_name = rack.name
-            return db_shelf
-        except Exception as e:
-            await db.rollback()
-            raise ValidationError(
-                f"Failed to create shelf {db_shelf.name} in rack '{rack.name}'"
-            ) from e
+    rack_stmt = select(Rack).filter(Rack.id == rack_id).with_for_update()
+    rack_stmt = ctx.team_filter(rack_stmt, Rack)
+    rack_res = await db.execute(rack_stmt)
+    rack = rack_res.scalar_one_or_none()
+
+    if not rack:
+        raise ObjectNotFoundError("Rack")
+
+    try:
+        db_shelf = Shelf(**shelf_data.model_dump(), rack_id=rack_id)
+        db.add(db_shelf)
+        await db.commit()
+
+        await db.refresh(db_shelf, attribute_names=["rack", "machines"])
+        db_shelf.rack_name = rack.name
+        return db_shelf
+    except Exception as e:
+        await db.rollback()
+        raise ValidationError(
+            f"Failed to create shelf {db_shelf.name} in rack '{rack.name}'"
+        ) from e
+
+
+@router.post(
+    "/shelf/{rack_id}/bulk",
+    response_model=List[ShelfResponse],
+    status_code=status.HTTP_201_CREATED,
+)
+async def bulk_create_shelves(
+    rack_id: int,
+    shelves_data: List[ShelfCreate],
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Create many shelves in a specific rack with a single INSERT.
+
+    :param rack_id: ID of the parent rack
+    :param shelves_data: Data for the new shelves
+    :param db: Active database session
+    :param ctx: Request context for authorization
+    :return: Created shelves with rack context.
+    """
+    ctx.require_user()
+    rack_stmt = select(Rack).filter(Rack.id == rack_id).with_for_update()
+    rack_stmt = ctx.team_filter(rack_stmt, Rack)
+    rack = (await db.execute(rack_stmt)).scalar_one_or_none()
+
+    if not rack:
+        raise ObjectNotFoundError("Rack")
+    if not shelves_data:
+        return []
+
+    try:
+        result = await db.execute(
+            insert(Shelf).returning(
+                Shelf.id, Shelf.name, Shelf.order, sort_by_parameter_order=True
+            ),
+            [{**shelf.model_dump(), "rack_id": rack_id} for shelf in shelves_data],
+        )
+        shelves = [
+            {
+                "id": shelf.id,
+                "name": shelf.name,
+                "order": shelf.order,
+                "rack_id": rack_id,
+                "rack_name": rack.name,
+                "machines": [],
+            }
+            for shelf in result.all()
+        ]
+        await db.commit()
+        return shelves
+    except IntegrityError as e:
+        await db.rollback()
+        raise ValidationError(f"Failed to create shelves in rack '{rack.name}'") from e
+
+
+@router.patch("/shelf/bulk", status_code=status.HTTP_200_OK)
+async def bulk_update_shelves(
+    shelves_data: List[ShelfBulkUpdate],
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Rename or reorder many shelves with one statement per set of fields.
+
+    :param shelves_data: Shelf IDs with changed fields
+    :param db: Active database session
+    :param ctx: Request context for permissions
+    :return: Number of updated shelves.
+    """
+    ctx.require_user()
+    shelf_ids = sorted({shelf.id for shelf in shelves_data})
+    if not shelf_ids:
+        return {"message": "Updated 0 shelves", "updated": 0}
+    await check_visible_ids(db, ctx, Shelf, shelf_ids, "Shelf", owner=Rack, lock=Shelf)
+
+    try:
+        updated = await bulk_update_rows(
+            db,
+            Shelf,
+            [shelf.model_dump(exclude_unset=True) for shelf in shelves_data],
+        )
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise ValidationError("Bulk shelf update failed") from e
+    return {"message": f"Updated {updated} shelves", "updated": updated}
+
+
+@router.post("/shelf/bulk/delete", status_code=status.HTTP_200_OK)
+async def bulk_delete_shelves(
+    data: BulkDelete,
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Delete many empty shelves with a single DELETE.
+
+    :param data: Shelf IDs
+    :param db: Active database session
+    :param ctx: Request context for authorization
+    :return: Number of deleted shelves.
+    """
+    ctx.require_user()
+    shelf_ids = sorted(set(data.ids))
+    await check_visible_ids(db, ctx, Shelf, shelf_ids, "Shelf", owner=Rack, lock=Shelf)
+
+    occupied = await db.scalar(
+        select(func.count(Machines.id)).where(Machines.shelf_id.in_(shelf_ids))
+    )
+    if occupied:
+        raise ValidationError(
+            f"Shelves are not empty (contain {occupied} machines). "
+            "Move or delete machines first."
+        )
+    deleted = (await db.execute(delete(Shelf).where(Shelf.id.in_(shelf_ids)))).rowcount
+    await db.commit()
+    return {"message": f"Deleted {deleted} shelves", "deleted": deleted}
 
 
 @router.patch("/shelf/{shelf_id}", response_model=ShelfResponse)
 async def update_shelf(
     shelf_id: int,
     shelf_data: ShelfUpdate,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
+    if_match: Optional[int] = Depends(get_if_match_version),
 ):
     """Update shelf details like name or order.
 
     :param shelf_id: ID of the shelf to update
     :param shelf_data: Fields to update
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for permissions
+    :param if_match: Expected version of the shelf
     :return: Updated shelf object.
     """
     ctx.require_user()
 
-    async with acquire_lock(f"shelf_lock:{shelf_id}"):
-        stmt = select(Shelf).filter(Shelf.id == shelf_id)
-        result = await db.execute(stmt)
-        db_shelf = result.scalar_one_or_none()
+    stmt = select(Shelf).filter(Shelf.id == shelf_id).with_for_update()
+    result = await db.execute(stmt)
+    db_shelf = result.scalar_one_or_none()
 
-        if not db_shelf:
-            raise HTTPException(status_code=404, detail="Shelf does not exist.")
+    if not db_shelf:
+        raise HTTPException(status_code=404, detail="Shelf does not exist.")
 
-        rack_stmt = select(Rack).filter(Rack.id == db_shelf.rack_id)
-        rack_stmt = ctx.team_filter(rack_stmt, Rack)
-        rack_res = await db.execute(rack_stmt)
+    rack_stmt = select(Rack).filter(Rack.id == db_shelf.rack_id)
+    rack_stmt = ctx.team_filter(rack_stmt, Rack)
+    rack_res = await db.execute(rack_stmt)
 
-        if not rack_res.scalar_one_or_none():
-            raise AccessDeniedError("You do not have permission to manage this shelf")
+    if not rack_res.scalar_one_or_none():
+        raise AccessDeniedError("You do not have permission to manage this shelf")
+    check_version(db_shelf, if_match, "Shelf")
 
-        try:
-            update_dict = shelf_data.model_dump(exclude_unset=True)
-            for key, value in update_dict.items():
-                setattr(db_shelf, key, value)
+    try:
+        update_dict = shelf_data.model_dump(exclude_unset=True)
+        for key, value in update_dict.items():
+            setattr(db_shelf, key, value)
 
-            await db.commit()
-            await db.refresh(db_shelf, attribute_names=["rack", "machines"])
-            return db_shelf
-        except Exception as e:
-            await db.rollback()
-            raise ValidationError(f"Failed to update shelf '{db_shelf.name}'") from e
+        await db.commit()
+        await db.refresh(db_shelf, attribute_names=["rack", "machines"])
+        set_entity_etag(response, db_shelf)
+        return db_shelf
+    except Exception as e:
+        await db.rollback()
+        if isinstance(e, StaleDataError):
+            raise
+        raise ValidationError(f"Failed to update shelf '{db_shelf.name}'") from e
 
 
 @router.delete("/shelf/{shelf_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -183,46 +318,51 @@ async def delete_shelf(
     shelf_id: int,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
+    if_match: Optional[int] = Depends(get_if_match_version),
 ):
     """Delete a specific shelf if it is empty.
 
     :param shelf_id: ID of the shelf to delete
     :param db: Active database session
     :param ctx: Request context for authorization
+    :param if_match: Expected version of the shelf
     :return: No content response.
     """
     ctx.require_user()
 
-    async with acquire_lock(f"shelf_lock:{shelf_id}"):
-        stmt = (
-            select(Shelf)
-            .options(joinedload(Shelf.machines))
-            .filter(Shelf.id == shelf_id)
+    stmt = (
+        select(Shelf)
+        .options(joinedload(Shelf.machines))
+        .filter(Shelf.id == shelf_id)
+        .with_for_update(of=Shelf)
+    )
+    result = await db.execute(stmt)
+    db_shelf = result.unique().scalar_one_or_none()
+
+    if not db_shelf:
+        raise ObjectNotFoundError("Shelf")
+
+    rack_stmt = select(Rack).filter(Rack.id == db_shelf.rack_id)
+    rack_stmt = ctx.team_filter(rack_stmt, Rack)
+    rack_res = await db.execute(rack_stmt)
+
+    if not rack_res.scalar_one_or_none():
+        raise AccessDeniedError("You do not have permission to delete this shelf")
+    check_version(db_shelf, if_match, "Shelf")
+
+    if db_shelf.machines:
+        count = len(db_shelf.machines)
+        raise ValidationError(
+            f"Shelf '{db_shelf.name}' is not empty (contains {count} machines). "
+            "Move or delete machines first."
         )
-        result = await db.execute(stmt)
-        db_shelf = result.unique().scalar_one_or_none()
-
-        if not db_shelf:
-            raise ObjectNotFoundError("Shelf")
-
-        rack_stmt = select(Rack).filter(Rack.id == db_shelf.rack_id)
-        rack_stmt = ctx.team_filter(rack_stmt, Rack)
-        rack_res = await db.execute(rack_stmt)
-
-        if not rack_res.scalar_one_or_none():
-            raise AccessDeniedError("You do not have permission to delete this shelf")
-
-        if db_shelf.machines:
-            count = len(db_shelf.machines)
-            raise ValidationError(
-                f"Shelf '{db_shelf.name}' is not empty (contains {count} machines). "
-                "Move or delete machines first."
-            )
-        try:
-            shelf_name = db_shelf.name
-            await db.delete(db_shelf)
-            await db.commit()
-            return Response(status_code=status.HTTP_204_NO_CONTENT)
-        except Exception as e:
-            await db.rollback()
-            raise ValidationError(f"Could not delete shelf '{shelf_name}'") from e
+    try:
+        shelf_name = db_shelf.name
+        await db.delete(db_shelf)
+        await db.commit()
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    except Exception as e:
+        await db.rollback()
+        if isinstance(e, StaleDataError):
+            raise
+        raise ValidationError(f"Could not delete shelf '{shelf_name}'") from e
@@ -1,17 +1,45 @@
 """Router for Tags Database API CRUD."""
 
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import select
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.auth.dependencies import RequestContext
-from app.core.exceptions import ObjectNotFoundError, ValidationError, ConflictError
+from app.core.exceptions import (
+    ConflictError,
+    ObjectNotFoundError,
+    ValidationError,
+)
 from app.database import get_async_db
-from app.db.models import Documentation, Machines, Rack, Rooms, Tags
-from app.db.schemas import TagsAssignment, TagsCreate, TagsResponse, TagsUpdate
+from app.db.models import (
+    Documentation,
+    Machines,
+    Rack,
+    Rooms,
+    Tags,
+    TagsDocumentation,
+    TagsMachines,
+    TagsRacks,
+    TagsRooms,
+)
+from app.db.schemas import (
+    TagsAssignment,
+    TagsBulkAssignment,
+    TagsCreate,
+    TagsResponse,
+    TagsUpdate,
+)
+from app.utils.concurrency_service import (
+    check_version,
+    get_if_match_version,
+    set_entity_etag,
+    write_guard,
+)
 from app.utils.redis_service import acquire_lock
 
 router = APIRouter(prefix="/db", tags=["Tags"])
@@ -22,6 +50,46 @@ ENTITY_MAP = {
     "room": Rooms,
     "documentation": Documentation,
 }
+ASSOCIATION_MAP = {
+    "machine": TagsMachines.machine_id,
+    "rack": TagsRacks.rack_id,
+    "room": TagsRooms.room_id,
+    "documentation": TagsDocumentation.documentation_id,
+}
+
+
+async def resolve_bulk_targets(
+    db: AsyncSession, ctx: RequestContext, data: TagsBulkAssignment
+) -> dict[str, list[int]]:
+    """Validate tags and entities of a bulk tag request.
+
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :param data: Bulk assignment data
+    :return: Dictionary of entity type to list of entity IDs.
+    """
+    tag_ids = set(data.tag_ids)
+    found_tags = await db.scalar(
+        select(func.count()).select_from(Tags).where(Tags.id.in_(tag_ids))
+    )
+    if found_tags != len(tag_ids):
+        raise ObjectNotFoundError("Tag")
+
+    targets = {}
+    for entity in data.entities:
+        entity_type = entity.entity_type.lower()
+        if entity_type not in ENTITY_MAP:
+            raise ValidationError(f"Invalid entity type: {entity.entity_type}")
+        targets.setdefault(entity_type, set()).add(entity.entity_id)
+
+    for entity_type, entity_ids in targets.items():
+        model = ENTITY_MAP[entity_type]
+        stmt = select(func.count()).select_from(model).where(model.id.in_(entity_ids))
+        if entity_type != "documentation":
+            stmt = ctx.team_filter(stmt, model)
+        if await db.scalar(stmt) != len(entity_ids):
+            raise ObjectNotFoundError(entity_type.capitalize())
+    return {entity_type: sorted(ids) for entity_type, ids in targets.items()}
 
 
 @router.get(
@@ -103,6 +171,74 @@ async def assign_tag(
         return {"message": f"Tags already assigned to '{entity_name}'"}
 
 
+@router.post("/tags/bulk/assign", status_code=status.HTTP_200_OK)
+async def bulk_assign_tags(
+    data: TagsBulkAssignment,
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Assign tags to many objects at once.
+
+    Each entity type is handled by a single INSERT ... ON CONFLICT DO NOTHING,
+    so links that already exist are skipped without reading them first.
+
+    :param data: Tags and entities to link
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Number of created links.
+    """
+    ctx.require_user()
+    targets = await resolve_bulk_targets(db, ctx, data)
+    tag_ids = sorted(set(data.tag_ids))
+
+    assigned = 0
+    for entity_type, entity_ids in targets.items():
+        fk_column = ASSOCIATION_MAP[entity_type]
+        association = fk_column.class_
+        stmt = (
+            pg_insert(association)
+            .values(
+                [
+                    {fk_column.key: entity_id, "tag_id": tag_id}
+                    for entity_id in entity_ids
+                    for tag_id in tag_ids
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[fk_column.key, "tag_id"])
+            .returning(association.id)
+        )
+        assigned += len((await db.execute(stmt)).all())
+    await db.commit()
+    return {"message": f"Assigned {assigned} tag links", "assigned": assigned}
+
+
+@router.post("/tags/bulk/detach", status_code=status.HTTP_200_OK)
+async def bulk_detach_tags(
+    data: TagsBulkAssignment,
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Detach tags from many objects at once.
+
+    :param data: Tags and entities to unlink
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Number of removed links.
+    """
+    ctx.require_user()
+    targets = await resolve_bulk_targets(db, ctx, data)
+
+    detached = 0
+    for entity_type, entity_ids in targets.items():
+        fk_column = ASSOCIATION_MAP[entity_type]
+        stmt = delete(fk_column.class_).where(
+            fk_column.in_(entity_ids), fk_column.class_.tag_id.in_(data.tag_ids)
+        )
+        detached += (await db.execute(stmt)).rowcount
+    await db.commit()
+    return {"message": f"Detached {detached} tag links", "detached": detached}
+
+
 @router.post("/tags/detach", status_code=status.HTTP_200_OK)
 async def detach_tag(
     data: TagsAssignment,
@@ -201,12 +337,14 @@ async def create_tag(
 )
 async def get_tag_by_id(
     tag_id: int,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
     """Get specific tag by ID.
 
     :param tag_id: Tag ID
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for user and team info
     :return: Tag object.
@@ -219,6 +357,7 @@ async def get_tag_by_id(
     if not tag:
         raise ObjectNotFoundError("Tag")
 
+    set_entity_etag(response, tag)
     return tag
 
 
@@ -229,25 +368,30 @@ async def get_tag_by_id(
 async def update_tag(
     tag_id: int,
     tag_data: TagsUpdate,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
+    if_match: Optional[int] = Depends(get_if_match_version),
 ):
     """Update tag data.
 
     :param tag_id: Tag ID
     :param tag_data: Tag data schema
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for user and team info
+    :param if_match: Expected version, skips the Redis lock when given
     :return: Updated tag.
     """
     ctx.require_group_admin()
-    async with acquire_lock(f"tag_lock:{tag_id}"):
+    async with write_guard(f"tag_lock:{tag_id}", if_match):
         stmt = select(Tags).filter(Tags.id == tag_id)
         result = await db.execute(stmt)
         tag = result.scalar_one_or_none()
 
         if not tag:
             raise ObjectNotFoundError("Tag")
+        check_version(tag, if_match, "Tag")
 
         old_name = tag.name
 
@@ -261,7 +405,9 @@ async def update_tag(
             await db.commit()
 
             res = await db.execute(select(Tags).where(Tags.id == tag_id))
-            return res.scalar_one()
+            tag = res.scalar_one()
+            set_entity_etag(response, tag)
+            return tag
 
         except IntegrityError:
             await db.rollback()
@@ -271,7 +417,7 @@ async def update_tag(
             )
         except Exception as e:
             await db.rollback()
-            if isinstance(e, ConflictError):
+            if isinstance(e, (ConflictError, StaleDataError)):
                 raise e
             raise ValidationError(f"Failed to update tag '{old_name}'") from e
 
@@ -284,22 +430,25 @@ async def delete_tag(
     tag_id: int,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
+    if_match: Optional[int] = Depends(get_if_match_version),
 ):
     """Delete tag.
 
     :param tag_id: Tag ID
     :param db: Active database session
     :param ctx: Request context for user and team info
+    :param if_match: Expected version, skips the Redis lock when given
     :return: None.
     """
     ctx.require_group_admin()
-    async with acquire_lock(f"tag_lock:{tag_id}"):
+    async with write_guard(f"tag_lock:{tag_id}", if_match):
         stmt = select(Tags).filter(Tags.id == tag_id)
         result = await db.execute(stmt)
         tag = result.scalar_one_or_none()
 
         if not tag:
             raise ObjectNotFoundError("Tag")
+        check_version(tag, if_match, "Tag")
 
         try:
             tag_name = tag.name
@@ -308,4 +457,6 @@ async def delete_tag(
             return Response(status_code=status.HTTP_204_NO_CONTENT)
         except Exception as e:
             await db.rollback()
+            if isinstance(e, StaleDataError):
+                raise
             raise ValidationError(f"Could not delete tag '{tag_name}'") from e
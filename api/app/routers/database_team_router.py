@@ -2,10 +2,10 @@
 
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func, literal, or_, select, union
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.auth.dependencies import RequestContext
 from app.core.exceptions import (
@@ -14,7 +14,20 @@ from app.core.exceptions import (
     ValidationError,
 )
 from app.database import get_async_db
-from app.db.models import Inventory, Machines, Rack, Rooms, Shelf, Teams, UsersTeams
+from app.db.models import (
+    Categories,
+    Inventory,
+    Machines,
+    Rack,
+    Rooms,
+    Shelf,
+    Tags,
+    TagsMachines,
+    TagsRacks,
+    Teams,
+    User,
+    UsersTeams,
+)
 from app.db.schemas import (
     TeamDetailResponse,
     TeamFullDetailResponse,
@@ -22,9 +35,67 @@ from app.db.schemas import (
     TeamsResponse,
     TeamsUpdate,
 )
+from app.utils.cache_service import cached
+from app.utils.etag_service import check_not_modified, fingerprint
 from app.utils.redis_service import acquire_lock
 
 router = APIRouter(prefix="/db", tags=["Teams"])
+TEAMS_INFO_ETAG_MODELS = (Teams, UsersTeams, User)
+TEAMS_INFO_CACHE_TAGS = tuple(model.__tablename__ for model in TEAMS_INFO_ETAG_MODELS)
+TEAM_DETAIL_CACHE_TAGS = TEAMS_INFO_CACHE_TAGS + tuple(
+    model.__tablename__
+    for model in (
+        Rack,
+        TagsRacks,
+        Shelf,
+        Machines,
+        TagsMachines,
+        Tags,
+        Inventory,
+        Rooms,
+        Categories,
+    )
+)
+
+
+def team_detail_fingerprints(team_id: int) -> list:
+    """Build fingerprints of the rows shown in team details.
+
+    :param team_id: Team ID
+    :return: List of fingerprint queries scoped to the team.
+    """
+    rack_ids = select(Rack.id).where(Rack.team_id == team_id)
+    shelf_ids = select(Shelf.id).where(Shelf.rack_id.in_(rack_ids))
+    inventory = select(Inventory).where(Inventory.team_id == team_id).subquery()
+    machines = or_(
+        Machines.team_id == team_id,
+        Machines.shelf_id.in_(shelf_ids),
+        Machines.id.in_(select(inventory.c.machine_id)),
+    )
+    machine_ids = select(Machines.id).where(machines)
+    tag_ids = union(
+        select(TagsRacks.tag_id).where(TagsRacks.rack_id.in_(rack_ids)),
+        select(TagsMachines.tag_id).where(TagsMachines.machine_id.in_(machine_ids)),
+    )
+    return [
+        fingerprint(Teams, Teams.id == team_id),
+        fingerprint(UsersTeams, UsersTeams.team_id == team_id),
+        fingerprint(
+            User,
+            User.id.in_(
+                select(UsersTeams.user_id).where(UsersTeams.team_id == team_id)
+            ),
+        ),
+        fingerprint(Rack, Rack.team_id == team_id),
+        fingerprint(TagsRacks, TagsRacks.rack_id.in_(rack_ids)),
+        fingerprint(Shelf, Shelf.rack_id.in_(rack_ids)),
+        fingerprint(Machines, machines),
+        fingerprint(TagsMachines, TagsMachines.machine_id.in_(machine_ids)),
+        fingerprint(Tags, Tags.id.in_(tag_ids)),
+        fingerprint(Inventory, Inventory.team_id == team_id),
+        fingerprint(Rooms, Rooms.id.in_(select(inventory.c.localization_id))),
+        fingerprint(Categories, Categories.id.in_(select(inventory.c.category_id))),
+    ]
 
 
 def format_team_output(team: Teams):
@@ -67,70 +138,204 @@ def format_team_output(team: Teams):
     }
 
 
-def format_team_full_detail(team: Teams):
-    """Format team output to include detailed information.
+def format_tags(tags) -> list[dict]:
+    """Format tag rows for team detail output.
+
+    :param tags: Iterable of (name, color) pairs
+    :return: List of tag dictionaries.
+    """
+    return [
+        {"name": name or "Unnamed", "color": color or "red"} for name, color in tags
+    ]
 
-    Includes entries about admins, members, racks, machines, and inventory.
 
-    :param team: team object to format
-    :return: formatted team dictionary with detailed information
+async def get_team_machine_tags(db: AsyncSession, team_id: int) -> dict:
+    """Fetch tags of all machines shown on the team page with one query.
+
+    :param db: Active database session
+    :param team_id: Team ID
+    :return: Dictionary of machine ID to list of (name, color) pairs.
     """
-    group_admins = [m.user for m in team.users if m.is_group_admin]
+    team_shelves = select(Shelf.id).join(Rack, Shelf.rack_id == Rack.id)
+    team_shelves = team_shelves.where(Rack.team_id == team_id)
+    stmt = (
+        select(TagsMachines.machine_id, Tags.name, Tags.color)
+        .join(Tags, TagsMachines.tag_id == Tags.id)
+        .join(Machines, TagsMachines.machine_id == Machines.id)
+        .where(or_(Machines.team_id == team_id, Machines.shelf_id.in_(team_shelves)))
+        .order_by(TagsMachines.machine_id, Tags.id)
+    )
+    tags_by_machine = {}
+    for machine_id, name, color in (await db.execute(stmt)).all():
+        tags_by_machine.setdefault(machine_id, []).append((name, color))
+    return tags_by_machine
 
-    admins_info = [
-        {
-            "full_name": f"{a.name} {a.surname}",
-            "login": a.login,
-            "email": a.email,
-        }
-        for a in group_admins
-    ]
 
-    sorted_machines = []
-    for rack in team.racks:
-        for shelf in sorted(rack.shelves, key=lambda s: s.order or 0):
-            for machine in shelf.machines:
-                sorted_machines.append(
-                    {
-                        "id": machine.id,
-                        "name": machine.name,
-                        "ip_address": machine.ip_address,
-                        "mac_address": machine.mac_address,
-                        "team_name": team.name,
-                        "rack_name": rack.name,
-                        "shelf_order": shelf.order,
-                        "tags": [
-                            {
-                                "name": getattr(t, "name", "Unnamed"),
-                                "color": getattr(t, "color", "red"),
-                            }
-                            for t in (machine.tags or [])
-                        ],
-                    }
-                )
-
-    placed_machine_names = {m["name"] for m in sorted_machines}
-    for machine in team.machines:
-        if machine.name not in placed_machine_names:
-            sorted_machines.append(
+async def get_team_machines(db: AsyncSession, team: Teams) -> list[dict]:
+    """Fetch machines of the team page, placed ones first.
+
+    Placed machines are those on shelves of team racks, ordered by rack and
+    shelf. Team machines outside of team racks follow as "Unplaced".
+    Both queries project only the displayed columns.
+    :param db: Active database session
+    :param team: Team object
+    :return: List of machine dictionaries.
+    """
+    machine_columns = (
+        Machines.id,
+        Machines.name,
+        Machines.ip_address,
+        Machines.mac_address,
+    )
+    shelf_order = func.coalesce(Shelf.order, 0)
+    placed_stmt = (
+        select(*machine_columns, Rack.name, shelf_order)
+        .join(Shelf, Machines.shelf_id == Shelf.id)
+        .join(Rack, Shelf.rack_id == Rack.id)
+        .where(Rack.team_id == team.id)
+        .order_by(Rack.id, shelf_order, Machines.id)
+    )
+    placed_in_team_rack = (
+        select(Shelf.id)
+        .join(Rack, Shelf.rack_id == Rack.id)
+        .where(Shelf.id == Machines.shelf_id, Rack.team_id == team.id)
+        .exists()
+    )
+    unplaced_stmt = (
+        select(*machine_columns, literal("Unplaced"), literal(0))
+        .where(Machines.team_id == team.id, ~placed_in_team_rack)
+        .order_by(Machines.id)
+    )
+
+    tags_by_machine = await get_team_machine_tags(db, team.id)
+    machines = []
+    for stmt in (placed_stmt, unplaced_stmt):
+        for machine_id, name, ip, mac, rack_name, order in (
+            await db.execute(stmt)
+        ).all():
+            machines.append(
                 {
-                    "id": machine.id,
-                    "name": machine.name,
-                    "ip_address": machine.ip_address,
-                    "mac_address": machine.mac_address,
+                    "id": machine_id,
+                    "name": name,
+                    "ip_address": ip,
+                    "mac_address": mac,
                     "team_name": team.name,
-                    "rack_name": "Unplaced",
-                    "shelf_order": 0,
-                    "tags": [
-                        {"name": t.name, "color": t.color} for t in (machine.tags or [])
-                    ],
+                    "rack_name": rack_name,
+                    "shelf_order": order,
+                    "tags": format_tags(tags_by_machine.get(machine_id, [])),
                 }
             )
+    return machines
+
+
+async def get_team_racks(db: AsyncSession, team: Teams) -> list[dict]:
+    """Fetch team racks with tags and machine counts.
+
+    :param db: Active database session
+    :param team: Team object
+    :return: List of rack dictionaries.
+    """
+    machine_counts = (
+        select(Shelf.rack_id, func.count(Machines.id).label("machines_count"))
+        .join(Machines, Machines.shelf_id == Shelf.id)
+        .group_by(Shelf.rack_id)
+        .subquery()
+    )
+    stmt = (
+        select(Rack, func.coalesce(machine_counts.c.machines_count, 0))
+        .outerjoin(machine_counts, machine_counts.c.rack_id == Rack.id)
+        .where(Rack.team_id == team.id)
+        .options(selectinload(Rack.tags))
+        .order_by(Rack.id)
+    )
+    return [
+        {
+            "id": rack.id,
+            "name": rack.name,
+            "team_name": team.name,
+            "map_link": f"/map/room/{rack.room_id}",
+            "tags": format_tags((t.name, t.color) for t in rack.tags),
+            "machines_count": machines_count,
+        }
+        for rack, machines_count in (await db.execute(stmt)).all()
+    ]
+
+
+async def get_team_inventory(db: AsyncSession, team: Teams) -> list[dict]:
+    """Fetch team inventory with room, machine and category names.
+
+    :param db: Active database session
+    :param team: Team object
+    :return: List of inventory dictionaries.
+    """
+    stmt = (
+        select(
+            Inventory.id,
+            Inventory.name,
+            Inventory.quantity,
+            Inventory.rental_status,
+            Inventory.rental_id,
+            Inventory.localization_id,
+            Rooms.name,
+            Machines.name,
+            Categories.name,
+        )
+        .outerjoin(Rooms, Inventory.localization_id == Rooms.id)
+        .outerjoin(Machines, Inventory.machine_id == Machines.id)
+        .outerjoin(Categories, Inventory.category_id == Categories.id)
+        .where(Inventory.team_id == team.id)
+        .order_by(Inventory.id)
+    )
+    return [
+        {
+            "id": item_id,
+            "name": name,
+            "quantity": quantity,
+            "team_name": team.name,
+            "room_name": room_name or "Unknown",
+            "machine_info": machine_name or "N/A",
+            "category_name": category_name or "General",
+            "rental_status": rental_status,
+            "rental_id": rental_id,
+            "location_link": f"/rooms/{localization_id}",
+        }
+        for (
+            item_id,
+            name,
+            quantity,
+            rental_status,
+            rental_id,
+            localization_id,
+            room_name,
+            machine_name,
+            category_name,
+        ) in (await db.execute(stmt)).all()
+    ]
 
+
+async def build_team_full_detail(db: AsyncSession, team: Teams) -> dict:
+    """Build team output with detailed information.
+
+    Includes entries about admins, members, racks, machines, and inventory.
+    Every section is loaded by its own column-projected query, so no part of
+    the team graph is eagerly loaded.
+
+    :param db: Active database session
+    :param team: Team object with loaded users
+    :return: Formatted team dictionary with detailed information.
+    """
     return {
         "id": team.id,
         "name": team.name,
-        "admins": admins_info,
+        "admins": [
+            {
+                "full_name": f"{m.user.name} {m.user.surname}",
+                "login": m.user.login,
+                "email": m.user.email,
+            }
+            for m in team.users
+            if m.is_group_admin
+        ],
         "members": [
             {
                 "id": m.user.id,
@@ -143,39 +348,9 @@ def format_team_full_detail(team: Teams):
             }
             for m in team.users
         ],
-        "racks": [
-            {
-                "id": r.id,
-                "name": r.name,
-                "team_name": team.name,
-                "map_link": f"/map/room/{r.room_id}",
-                "tags": [
-                    {
-                        "name": getattr(t, "name", "Unnamed"),
-                        "color": getattr(t, "color", "red"),
-                    }
-                    for t in (r.tags or [])
-                ],
-                "machines_count": sum(len(shelf.machines) for shelf in r.shelves),
-            }
-            for r in team.racks
-        ],
-        "machines": sorted_machines,
-        "inventory": [
-            {
-                "id": i.id,
-                "name": i.name,
-                "quantity": i.quantity,
-                "team_name": team.name,
-                "room_name": i.room.name if i.room else "Unknown",
-                "machine_info": i.machine.name if i.machine else "N/A",
-                "category_name": i.category.name if i.category else "General",
-                "rental_status": i.rental_status,
-                "rental_id": i.rental_id,
-                "location_link": f"/rooms/{i.localization_id}",
-            }
-            for i in team.inventory
-        ],
+        "racks": await get_team_racks(db, team),
+        "machines": await get_team_machines(db, team),
+        "inventory": await get_team_inventory(db, team),
     }
 
 
@@ -228,25 +403,71 @@ async def get_teams(
     return result.scalars().all()
 
 
+@cached(namespace="teams_info", tags=TEAMS_INFO_CACHE_TAGS, key_builder=lambda db: ())
+async def teams_info(db: AsyncSession) -> list[dict]:
+    """Load all teams with admin names and member details.
+
+    :param db: Active database session
+    :return: List of formatted team dictionaries.
+    """
+    stmt = select(Teams).options(joinedload(Teams.users).joinedload(UsersTeams.user))
+    result = await db.execute(stmt)
+    return [format_team_output(t) for t in result.unique().scalars().all()]
+
+
+@cached(
+    namespace="team_full_detail",
+    tags=TEAM_DETAIL_CACHE_TAGS,
+    key_builder=lambda db, team_id: (team_id,),
+)
+async def team_full_detail(db: AsyncSession, team_id: int) -> dict:
+    """Load team with users, racks, machines and inventory.
+
+    :param db: Active database session
+    :param team_id: Team ID
+    :return: Formatted team dictionary with detailed information.
+    """
+    stmt = (
+        select(Teams)
+        .filter(Teams.id == team_id)
+        .options(selectinload(Teams.users).joinedload(UsersTeams.user))
+    )
+
+    result = await db.execute(stmt)
+    team = result.scalar_one_or_none()
+
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+
+    return await build_team_full_detail(db, team)
+
+
 @router.get("/teams/teams_info", response_model=List[TeamDetailResponse])
 async def get_team_info(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
     """Fetch detailed information about the current user's team.
 
     Including admin names and member details.
+    Supports conditional GET, unchanged data is answered with 304.
+    Results are cached until a shown table changes.
 
+    :param request: Incoming request with optional If-None-Match header
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for user and team info
     :return: Detailed team information with admin names and member details.
     """
     ctx.require_user()
-    stmt = select(Teams).options(joinedload(Teams.users).joinedload(UsersTeams.user))
-    result = await db.execute(stmt)
-    teams = result.unique().scalars().all()
-
-    return [format_team_output(t) for t in teams]
+    not_modified = await check_not_modified(
+        request, response, db, ctx, TEAMS_INFO_ETAG_MODELS
+    )
+    if not_modified:
+        return not_modified
+    return await teams_info(db)
 
 
 @router.get(
@@ -255,44 +476,31 @@ async def get_team_info(
 )
 async def get_team_info_by_id(
     team_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
     """Fetch detailed information about a specific team by ID.
 
     Including in team: users, machines, and inventory details.
+    Supports conditional GET, unchanged data is answered with 304.
+    Results are cached until a shown table changes.
 
     :param team_id: Team ID
+    :param request: Incoming request with optional If-None-Match header
+    :param response: Response used to expose the ETag header
     :param db: Active database session
     :param ctx: Request context for user and team info
     :return: Detailed team information with admin names and member details.
     """
     ctx.require_user()
-
-    stmt = (
-        select(Teams)
-        .filter(Teams.id == team_id)
-        .options(
-            joinedload(Teams.users).joinedload(UsersTeams.user),
-            joinedload(Teams.racks).joinedload(Rack.tags),
-            joinedload(Teams.racks)
-            .joinedload(Rack.shelves)
-            .joinedload(Shelf.machines)
-            .joinedload(Machines.tags),
-            joinedload(Teams.machines).joinedload(Machines.tags),
-            joinedload(Teams.inventory).joinedload(Inventory.room),
-            joinedload(Teams.inventory).joinedload(Inventory.category),
-            joinedload(Teams.inventory).joinedload(Inventory.machine),
-        )
+    not_modified = await check_not_modified(
+        request, response, db, ctx, team_detail_fingerprints(team_id)
     )
-
-    result = await db.execute(stmt)
-    team = result.unique().scalar_one_or_none()
-
-    if not team:
-        raise HTTPException(status_code=404, detail="Team not found")
-
-    return format_team_full_detail(team)
+    if not_modified:
+        return not_modified
+    return await team_full_detail(db, team_id)
 
 
 @router.patch("teams/{team_id}", response_model=TeamsResponse)
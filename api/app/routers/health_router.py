@@ -0,0 +1,19 @@
+"""Health check endpoints router."""
+
+from fastapi import APIRouter, Depends
+
+from app.auth.dependencies import RequestContext
+from app.utils.redis_service import redis_health
+
+router = APIRouter()
+
+
+@router.get("/health/redis", tags=["Health"])
+async def get_redis_health(ctx: RequestContext = Depends(RequestContext.create)):
+    """Check Redis availability, connection pool usage and command latency.
+
+    :param ctx: Request context for user and team info
+    :return: Redis health report
+    """
+    ctx.require_admin()
+    return await redis_health()
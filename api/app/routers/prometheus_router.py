@@ -2,6 +2,7 @@
 
 import asyncio
 import json
+import logging
 import os
 from typing import List, Optional
 from urllib.parse import unquote
@@ -17,7 +18,7 @@ from app.auth.dependencies import RequestContext
 from app.auth.manager import get_user_manager
 from app.core.exceptions import AccessDeniedError, ValidationError
 
-from ..database import get_async_db
+from ..database import AsyncSessionLocal, get_async_db
 from ..db.models import Machines, Teams
 from ..db.schemas import PrometheusBase, PrometheusTarget
 from ..utils.prometheus_service import (
@@ -26,16 +27,20 @@ from ..utils.prometheus_service import (
     add_prometheus_target,
     fetch_prometheus_metrics,
     remove_prometheus_target,
+    sync_machine_targets,
 )
-from ..utils.redis_service import get_cache, set_cache
+from ..utils.redis_service import get_cache_many, set_cache
 
 load_dotenv(".env/api.env")
 HOST_STATUS_INTERVAL = int(os.getenv("HOST_STATUS_INTERVAL"))
 OTHER_METRICS_INTERVAL = int(os.getenv("OTHER_METRICS_INTERVAL"))
 WEBSOCKET_PUSH_INTERVAL = int(os.getenv("WEBSOCKET_PUSH_INTERVAL"))
+TARGETS_SYNC_INTERVAL = int(os.getenv("PROMETHEUS_TARGETS_SYNC_INTERVAL", "300"))
+TARGETS_SYNC_PRUNE = os.getenv("PROMETHEUS_TARGETS_SYNC_PRUNE", "false") == "true"
 PROMETEUS_CACHE_STATUS_KEY = "prometheus_metrics_cache"
 PROMETEUS_CACHE_METRICS_KEY = "prometheus_other_metrics_cache"
 
+logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Prometheus"])
 
 
@@ -90,6 +95,20 @@ async def metrics_worker():
         await asyncio.sleep(OTHER_METRICS_INTERVAL)
 
 
+async def targets_sync_worker():
+    """Periodically reconcile Prometheus targets with the Machines table.
+
+    :return: None.
+    """
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await sync_machine_targets(db, prune=TARGETS_SYNC_PRUNE)
+        except Exception as e:
+            logger.error(f"Prometheus targets sync failed: {e}")
+        await asyncio.sleep(TARGETS_SYNC_INTERVAL)
+
+
 @router.websocket("/ws/metrics")
 async def websocket_endpoint(
     ws: WebSocket,
@@ -124,8 +143,9 @@ async def websocket_endpoint(
         result = await db.execute(query)
         allowed_hosts = {row[0] for row in result.all()}
         while True:
-            status_data = await get_cache(PROMETEUS_CACHE_STATUS_KEY)
-            metrics_data = await get_cache(PROMETEUS_CACHE_METRICS_KEY)
+            status_data, metrics_data = await get_cache_many(
+                PROMETEUS_CACHE_STATUS_KEY, PROMETEUS_CACHE_METRICS_KEY
+            )
 
             status_parsed = json.loads(status_data) if status_data else {}
             metrics_parsed = json.loads(metrics_data) if metrics_data else {}
@@ -387,3 +407,27 @@ async def delete_prometheus_target(
     await remove_prometheus_target(target_to_remove)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/prometheus/targets/sync")
+async def sync_prometheus_targets(
+    prune: bool = Query(
+        False, description="Remove targets of machines without Prometheus agent"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Register targets of all machines with Prometheus agent in one write.
+
+    Group admins synchronize only machines of their teams.
+    :param prune: Remove targets of machines without Prometheus agent
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :return: Summary of added, updated and removed targets.
+    """
+    ctx.require_group_admin()
+    team_ids = None if ctx.is_admin else ctx.team_ids
+    try:
+        return await sync_machine_targets(db, team_ids, prune)
+    except TargetSaveError as e:
+        raise ValidationError("Failed to synchronize Prometheus targets") from e
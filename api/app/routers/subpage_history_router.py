@@ -1,8 +1,15 @@
 """Router for custom History endpoints."""
 
-from typing import Any, Dict, List, Tuple
-
-from fastapi import APIRouter, Depends
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
@@ -10,75 +17,65 @@ from sqlalchemy.orm import joinedload
 from app.auth.dependencies import RequestContext
 from app.core.exceptions import (
     ObjectNotFoundError,
+    ValidationError,
 )
-from app.database import get_async_db
-from app.db.models import History, User
+from app.database import AsyncSessionLocal, get_async_db
+from app.db.listeners import get_state_diff, history_states
+from app.db.models import ActionType, EntityType, History, User
 from app.db.schemas import HistoryResponse
 from app.routers.database_history_router import resolve_entity_name
 
+load_dotenv(".env/api.env")
+HISTORY_EXPORT_BATCH_SIZE = int(os.getenv("HISTORY_EXPORT_BATCH_SIZE", "1000"))
+
 router = APIRouter(prefix="/sub", tags=["History subpage dedicated router"])
 
-INTERNAL_KEYS = {
+HISTORY_EXPORT_FIELDS = (
     "id",
-    "version_id",
-    "user_id",
-    "team_id",
-    "hashed_password",
-    "is_active",
-    "is_verified",
-    "is_superuser",
-    "force_password_change",
     "timestamp",
-    "metadata_id",
-    "item_id",
-    "layout_id",
-    "localization_id",
-    "room_id",
-    "rental_id",
-    "category_id",
-    "machine_id",
+    "action",
+    "entity_type",
     "entity_id",
-}
+    "entity_name",
+    "user_id",
+    "user_login",
+    "before_state",
+    "after_state",
+    "can_rollback",
+)
 
 
-def get_state_diff(
-    before: Dict[str, Any], after: Dict[str, Any]
-) -> Tuple[Dict[str, Any], Dict[str, Any]]:
-    """Compares two states and returns only the keys that changed.
+def blackboxed_history_stmt(ctx: RequestContext, limit: int):
+    """Build projection of newest history rows with precomputed diffs.
 
-    Excluding internal/system keys.
-    :param before: Before action state
-    :param after: After action state
-    :return Diff between passed states
+    Diffs are computed once when an entry is written, so the query reads
+    neither full states nor the changed entities.
+    :param ctx: Request context for user and team info
+    :param limit: Limit of entries
+    :return: SQLAlchemy select statement.
     """
-    before = before if before is not None else {}
-    after = after if after is not None else {}
-
-    b_clean = {k: v for k, v in before.items() if k not in INTERNAL_KEYS}
-    a_clean = {k: v for k, v in after.items() if k not in INTERNAL_KEYS}
-
-    if not b_clean or not a_clean:
-        return b_clean, a_clean
-
-    diff_before = {}
-    diff_after = {}
-
-    all_keys = set(b_clean.keys()) | set(a_clean.keys())
-
-    for key in all_keys:
-        val_b = b_clean.get(key)
-        val_a = a_clean.get(key)
-
-        if val_b != val_a:
-            diff_before[key] = val_b
-            diff_after[key] = val_a
-
-    return diff_before, diff_after
+    visible_users = ctx.team_filter(select(User.id), User)
+    return (
+        select(
+            History.id,
+            History.timestamp,
+            History.action,
+            History.entity_type,
+            History.entity_id,
+            History.user_id,
+            History.before_diff,
+            History.after_diff,
+            History.can_rollback,
+        )
+        .where(History.user_id.in_(visible_users))
+        .order_by(History.timestamp.desc())
+        .limit(limit)
+    )
 
 
 @router.get("/history", response_model=List[HistoryResponse])
 async def get_blackboxed_history_logs(
-    limit=200,
+    limit: int = 200,
     db: AsyncSession = Depends(get_async_db),
     ctx: RequestContext = Depends(RequestContext.create),
 ):
@@ -90,51 +87,202 @@ async def get_blackboxed_history_logs(
     :return: Blackboxed history list.
     """
     ctx.require_user()
+    result = await db.execute(blackboxed_history_stmt(ctx, limit))
+    return [
+        {
+            "id": log.id,
+            "timestamp": log.timestamp,
+            "action": log.action.value,
+            "entity_type": log.entity_type.value,
+            "entity_id": log.entity_id,
+            "user_id": log.user_id,
+            "before_state": log.before_diff or None,
+            "after_state": log.after_diff or None,
+            "can_rollback": log.can_rollback,
+        }
+        for log in result.all()
+    ]
+
+
+def state_entity_name(
+    entity_type: EntityType,
+    entity_id: int,
+    before: Optional[dict],
+    after: Optional[dict],
+) -> str:
+    """Get readable entity name stored in history states.
+
+    Unlike resolve_entity_name it never queries the entity table, so it can be
+    used for every row of an export.
+    :param entity_type: Type of the changed entity
+    :param entity_id: ID of the changed entity
+    :param before: Before action state
+    :param after: After action state
+    :return: Readable name of the entity.
+    """
+    state = after or before or {}
+    return (
+        state.get("name")
+        or state.get("login")
+        or (f"{entity_type.value} (ID: {entity_id})")
+    )
 
+
+def history_export_stmt(
+    ctx: RequestContext,
+    since: Optional[datetime],
+    until: Optional[datetime],
+    entity_type: Optional[EntityType],
+    entity_id: Optional[int],
+    action: Optional[ActionType],
+):
+    """Build filtered query of history rows for export.
+
+    Visibility is checked against a subquery of visible users, so team
+    memberships do not duplicate rows.
+    :param ctx: Request context for user and team info
+    :param since: Include entries from this time on
+    :param until: Include entries before this time
+    :param entity_type: Optional entity type filter
+    :param entity_id: Optional entity ID filter
+    :param action: Optional action filter
+    :return: SQLAlchemy select statement.
+    """
+    visible_users = ctx.team_filter(select(User.id), User)
     stmt = (
-        select(History)
+        select(
+            History.id,
+            History.timestamp,
+            History.action,
+            History.entity_type,
+            History.entity_id,
+            History.user_id,
+            User.login,
+            History.before_state,
+            History.after_state,
+            History.extra_data,
+            History.can_rollback,
+        )
         .join(User, History.user_id == User.id)
-        .options(joinedload(History.user))
+        .where(History.user_id.in_(visible_users))
+        .order_by(History.id)
     )
+    if since:
+        stmt = stmt.where(History.timestamp >= since)
+    if until:
+        stmt = stmt.where(History.timestamp < until)
+    if entity_type:
+        stmt = stmt.where(History.entity_type == entity_type)
+    if entity_id is not None:
+        stmt = stmt.where(History.entity_id == entity_id)
+    if action:
+        stmt = stmt.where(History.action == action)
+    return stmt
+
+
+async def stream_history(stmt, file_format: str) -> AsyncIterator[str]:
+    """Stream history rows with diffs from a server-side cursor.
+
+    :param stmt: History export statement
+    :param file_format: "csv" or "ndjson"
+    :return: Async iterator of file chunks.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if file_format == "csv":
+        writer.writerow(HISTORY_EXPORT_FIELDS)
+
+    stmt = stmt.execution_options(yield_per=HISTORY_EXPORT_BATCH_SIZE)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            for (
+                log_id,
+                timestamp,
+                action,
+                entity_type,
+                entity_id,
+                user_id,
+                user_login,
+                before_state,
+                after_state,
+                extra_data,
+                can_rollback,
+            ) in partition:
+                before_state, after_state = history_states(
+                    before_state, after_state, extra_data
+                )
+                clean_before, clean_after = get_state_diff(before_state, after_state)
+                record = {
+                    "id": log_id,
+                    "timestamp": timestamp.isoformat() if timestamp else None,
+                    "action": action.value,
+                    "entity_type": entity_type.value,
+                    "entity_id": entity_id,
+                    "entity_name": state_entity_name(
+                        entity_type, entity_id, before_state, after_state
+                    ),
+                    "user_id": user_id,
+                    "user_login": user_login,
+                    "before_state": clean_before or None,
+                    "after_state": clean_after or None,
+                    "can_rollback": can_rollback,
+                }
+                if file_format == "csv":
+                    writer.writerow(
+                        [
+                            (
+                                json.dumps(record[field], default=str)
+                                if field in ("before_state", "after_state")
+                                and record[field] is not None
+                                else record[field]
+                            )
+                            for field in HISTORY_EXPORT_FIELDS
+                        ]
+                    )
+                else:
+                    buffer.write(json.dumps(record, default=str) + "\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+@router.get("/history/export")
+async def export_history_logs(
+    file_format: str = Query("ndjson", alias="format"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    entity_type: Optional[EntityType] = None,
+    entity_id: Optional[int] = None,
+    action: Optional[ActionType] = None,
+    ctx: RequestContext = Depends(RequestContext.create),
+):
+    """Stream "blackboxed" history for audits as NDJSON or CSV.
 
-    stmt = ctx.team_filter(stmt, User)
-    stmt = stmt.order_by(History.timestamp.desc()).limit(limit)
-
-    result = await db.execute(stmt)
-    logs = result.unique().scalars().all()
-
-    results = []
-
-    for log in logs:
-        clean_before, clean_after = get_state_diff(log.before_state, log.after_state)
-
-        readable_name = await resolve_entity_name(log, db)
-
-        results.append(
-            {
-                "id": log.id,
-                "timestamp": log.timestamp,
-                "action": (
-                    log.action.value
-                    if hasattr(log.action, "value")
-                    else str(log.action)
-                ),
-                "entity_type": (
-                    log.entity_type.value
-                    if hasattr(log.entity_type, "value")
-                    else str(log.entity_type)
-                ),
-                "entity_id": log.entity_id,
-                "entity_name": readable_name,
-                "user_id": log.user_id,
-                "user": log.user,
-                "before_state": clean_before if clean_before else None,
-                "after_state": clean_after if clean_after else None,
-                "can_rollback": log.can_rollback,
-            }
-        )
+    Rows are read in batches from a server-side cursor and diffs are computed
+    on the fly, so exports of any size use constant memory.
 
-    return results
+    :param file_format: "csv" or "ndjson"
+    :param since: Include entries from this time on
+    :param until: Include entries before this time
+    :param entity_type: Optional entity type filter
+    :param entity_id: Optional entity ID filter
+    :param action: Optional action filter
+    :param ctx: Request context for user and team info
+    :return: Streaming CSV or NDJSON file.
+    """
+    ctx.require_user()
+    if file_format not in ("csv", "ndjson"):
+        raise ValidationError(f"Unsupported export format: {file_format}")
+    stmt = history_export_stmt(ctx, since, until, entity_type, entity_id, action)
+    media_type = "text/csv" if file_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_history(stmt, file_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=history.{file_format}"},
+    )
 
 
 @router.get("/history/{history_id}", response_model=HistoryResponse)
@@ -167,9 +315,13 @@ async def get_blackboxed_history_item(
     if not log_entry:
         raise ObjectNotFoundError("History log")
 
-    clean_before, clean_after = get_state_diff(
-        log_entry.before_state, log_entry.after_state
-    )
+    if log_entry.before_diff is not None and log_entry.after_diff is not None:
+        clean_before, clean_after = log_entry.before_diff, log_entry.after_diff
+    else:
+        before_state, after_state = history_states(
+            log_entry.before_state, log_entry.after_state, log_entry.extra_data
+        )
+        clean_before, clean_after = get_state_diff(before_state, after_state)
 
     readable_name = await resolve_entity_name(log_entry, db)
 
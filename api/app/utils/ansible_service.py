@@ -1,95 +1,88 @@
 """Utility functions for interacting with Ansible to gather platform information."""
 
 import asyncio
-import json
 import os
-import time
+from datetime import datetime
+from typing import Callable, Optional
 
 import ansible_runner
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.exceptions import (
     ObjectNotFoundError,
     ValidationError,
 )
+from app.db.models import CPUs, Disks, Machines, Metadata
 
-REPORTS_DIR = "/code/ansible/platform_reports"
 PLAYBOOK_DIR = "/code/ansible"
+PLATFORM_INFO_FACT = "platform_info"
 
 
-def parse_platform_report(hostname: str) -> dict:
-    """Reads and parses the JSON file generated by Ansible.
+def build_platform_specs(data: dict) -> dict:
+    """Translate a platform report into a dictionary matching the Machines model.
 
-    Returns a dictionary matching the Machines model.
-    :param hostname: Hostname of the machine
+    :param data: Report content keyed by the inventory hostname
     :return: Dictionary with platform information.
     """
-    report_path = os.path.join(REPORTS_DIR, f"{hostname}-platform-info.json")
+    root_key = list(data.keys())[0]
+    info = data[root_key]
 
-    if not os.path.exists(report_path):
-        raise ObjectNotFoundError("Platform report", name=hostname)
+    # TODO: for now ansible provides only one CPU in json - maybe we
+    #  need to change discovery command or test it with platform with 2 CPUs,
+    #  for now i leave it hardcoded
+    cpu_info = info.get("cpu", {})
+    cpu_str = f"{cpu_info.get('name', 'Unknown')} ({cpu_info.get('cores', '?')} cores)"
+    cpu_list = [{"name": cpu_str}]
 
-    time.sleep(1)
-    try:
-        with open(report_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        root_key = list(data.keys())[0]
-        info = data[root_key]
-
-        # TODO: for now ansible provides only one CPU in json - maybe we
-        #  need to change discovery command or test it with platform with 2 CPUs,
-        #  for now i leave it hardcoded
-        cpu_info = info.get("cpu", {})
-        cpu_str = (
-            f"{cpu_info.get('name', 'Unknown')} ({cpu_info.get('cores', '?')} cores)"
+    ram_info = info.get("ram_memory", {})
+    ram_str = f"{ram_info.get('real_gb', '?')} GB"
+
+    drives = info.get("drives", [])
+    disk_list = []
+    for d in drives:
+        disk_list.append(
+            {
+                "name": d.get("mount", "Unknown"),
+                "capacity": f'{d.get("size_gb", "?")} GB',
+            }
         )
-        cpu_list = [{"name": cpu_str}]
-
-        ram_info = info.get("ram_memory", {})
-        ram_str = f"{ram_info.get('real_gb', '?')} GB"
-
-        drives = info.get("drives", [])
-        disk_list = []
-        for d in drives:
-            disk_list.append(
-                {
-                    "name": d.get("mount", "Unknown"),
-                    "capacity": f'{d.get("size_gb", "?")} GB',
-                }
-            )
 
-        dist = info.get("distribution", {})
-        os_str = f"{dist.get('name', 'Linux')} {dist.get('version', '')}"
-
-        net = info.get("network", {})
-        mac_address = net.get("mac")
-        ip_address = net.get("ip")
-
-        meta = info.get("metadata", {})
-        has_node_exporter = meta.get("has_agent", False)
-
-        return {
-            "name": root_key,
-            "os": os_str,
-            "cpus": cpu_list,
-            "ram": ram_str,
-            "disks": disk_list,
-            "mac_address": mac_address,
-            "ip_address": ip_address,
-            "agent_prometheus": has_node_exporter,
-        }
+    dist = info.get("distribution", {})
+    os_str = f"{dist.get('name', 'Linux')} {dist.get('version', '')}"
 
-    except Exception as e:
-        raise ValidationError(
-            f"Error parsing platform report for host '{hostname}'"
-        ) from e
+    net = info.get("network", {})
+    mac_address = net.get("mac")
+    ip_address = net.get("ip")
 
+    meta = info.get("metadata", {})
+    has_node_exporter = meta.get("has_agent", False)
 
-async def run_playbook_task(playbook_path: str, host: str | list, extra_vars: dict):
+    return {
+        "name": root_key,
+        "os": os_str,
+        "cpus": cpu_list,
+        "ram": ram_str,
+        "disks": disk_list,
+        "mac_address": mac_address,
+        "ip_address": ip_address,
+        "agent_prometheus": has_node_exporter,
+    }
+
+
+async def run_playbook_task(
+    playbook_path: str,
+    host: str | list,
+    extra_vars: dict,
+    event_handler: Optional[Callable[[dict], bool]] = None,
+):
     """Helper function to run an Ansible playbook on a single host dynamically.
 
     :param playbook_path: Path to the Ansible playbook
     :param host: Host IP or hostname
     :param extra_vars: Extra variables for the playbook
+    :param event_handler: Optional callback receiving every runner event
     :return: Result of the playbook execution.
     """
     if isinstance(host, str):
@@ -105,6 +98,7 @@ async def run_playbook_task(playbook_path: str, host: str | list, extra_vars: di
             playbook=playbook_path,
             inventory=host_dict,
             extravars=extra_vars,
+            event_handler=event_handler,
         )
 
     try:
@@ -121,3 +115,181 @@ async def run_playbook_task(playbook_path: str, host: str | list, extra_vars: di
             f"Status: {r.status}, Return Code: {r.rc}"
         )
     return {"status": r.status, "rc": r.rc}
+
+
+def parse_platform_report(reports: dict[str, dict], hostname: str) -> dict:
+    """Parses platform information reported by Ansible for a single host.
+
+    Returns a dictionary matching the Machines model.
+    :param reports: Reports collected by collect_platform_reports
+    :param hostname: Hostname of the machine
+    :return: Dictionary with platform information.
+    """
+    if hostname not in reports:
+        raise ObjectNotFoundError("Platform report", name=hostname)
+    try:
+        return build_platform_specs(reports[hostname])
+    except Exception as e:
+        raise ValidationError(
+            f"Error parsing platform report for host '{hostname}'"
+        ) from e
+
+
+async def collect_platform_reports(
+    playbook_path: str,
+    host: str | list,
+    extra_vars: dict,
+    allow_failures: bool = False,
+) -> dict[str, dict]:
+    """Run the scan playbook and collect platform info from the runner events.
+
+    Facts reported by the playbook are captured in memory as the events arrive,
+    so nothing has to be written to or read back from a shared volume.
+    :param playbook_path: Path to the scan playbook
+    :param host: Host IP or hostname
+    :param extra_vars: Extra variables for the playbook
+    :param allow_failures: Return reports of reachable hosts when others fail
+    :return: Raw platform reports keyed by hostname.
+    """
+    reports = {}
+
+    def _collect(event: dict) -> bool:
+        if event.get("event") == "runner_on_ok":
+            event_data = event.get("event_data", {})
+            facts = event_data.get("res", {}).get("ansible_facts", {})
+            if PLATFORM_INFO_FACT in facts:
+                reports[event_data["host"]] = facts[PLATFORM_INFO_FACT]
+        return True
+
+    try:
+        await run_playbook_task(playbook_path, host, extra_vars, event_handler=_collect)
+    except ValidationError:
+        if not allow_failures:
+            raise
+    return reports
+
+
+async def apply_platform_specs(
+    db: AsyncSession,
+    specs_by_host: dict[str, dict],
+    machines_by_host: dict[str, Machines],
+    team_id: int | None = None,
+    room_id: int | None = None,
+    update_name: bool = False,
+) -> dict[str, str]:
+    """Write scanned hardware of many hosts to the database in a few statements.
+
+    Existing machines are updated through the ORM so History keeps logging them,
+    CPUs and Disks are replaced with multi-row DELETE/INSERT and Metadata is
+    upserted with a single INSERT ... ON CONFLICT for machines which have it.
+    Hosts without a machine are created in ``room_id`` for ``team_id``. The
+    caller is responsible for commit.
+
+    :param db: Active database session
+    :param specs_by_host: Parsed platform reports keyed by hostname
+    :param machines_by_host: Already existing machines keyed by hostname
+    :param team_id: Team of newly created machines
+    :param room_id: Room of newly created machines
+    :param update_name: Whether existing machines take the reported hostname
+    :return: Dictionary with "updated" or "created" status per host.
+    """
+    now = datetime.now()
+    statuses = {}
+
+    existing = {h: m for h, m in machines_by_host.items() if h in specs_by_host}
+    new_hosts = [h for h in specs_by_host if h not in existing]
+
+    fields = ["os", "ram", "mac_address", "ip_address"]
+    if update_name:
+        fields.append("name")
+    for host, machine in existing.items():
+        specs = specs_by_host[host]
+        for field in fields:
+            setattr(machine, field, specs.get(field))
+        statuses[host] = "updated"
+
+    created = {}
+    if new_hosts:
+        meta_ids = (
+            await db.scalars(
+                insert(Metadata).returning(Metadata.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "last_update": now,
+                        "agent_prometheus": specs_by_host[h]["agent_prometheus"],
+                        "ansible_access": True,
+                        "ansible_root_access": True,
+                    }
+                    for h in new_hosts
+                ],
+            )
+        ).all()
+
+        for host, meta_id in zip(new_hosts, meta_ids):
+            specs = specs_by_host[host]
+            created[host] = Machines(
+                name=host,
+                team_id=team_id,
+                metadata_id=meta_id,
+                localization_id=room_id,
+                os=specs["os"],
+                ram=specs["ram"],
+                mac_address=specs["mac_address"],
+                ip_address=host,
+                added_on=now,
+            )
+            statuses[host] = "created"
+        db.add_all(created.values())
+
+    await db.flush()
+
+    existing_ids = [m.id for m in existing.values()]
+    if existing_ids:
+        await db.execute(delete(CPUs).where(CPUs.machine_id.in_(existing_ids)))
+        await db.execute(delete(Disks).where(Disks.machine_id.in_(existing_ids)))
+
+    meta_rows = [
+        {
+            "id": m.metadata_id,
+            "last_update": now,
+            "agent_prometheus": specs_by_host[h]["agent_prometheus"],
+            "ansible_access": True,
+        }
+        for h, m in existing.items()
+        if m.metadata_id is not None
+    ]
+    if meta_rows:
+        meta_stmt = pg_insert(Metadata).values(meta_rows)
+        await db.execute(
+            meta_stmt.on_conflict_do_update(
+                index_elements=[Metadata.id],
+                set_={
+                    "last_update": meta_stmt.excluded.last_update,
+                    "agent_prometheus": meta_stmt.excluded.agent_prometheus,
+                    "ansible_access": meta_stmt.excluded.ansible_access,
+                    "version_id": Metadata.version_id + 1,
+                },
+            )
+        )
+
+    all_machines = {**existing, **created}
+    cpu_rows = [
+        {"name": cpu["name"], "machine_id": machine.id}
+        for host, machine in all_machines.items()
+        for cpu in specs_by_host[host].get("cpus", [])
+    ]
+    disk_rows = [
+        {
+            "name": disk["name"],
+            "capacity": disk.get("capacity"),
+            "machine_id": machine.id,
+        }
+        for host, machine in all_machines.items()
+        for disk in specs_by_host[host].get("disks", [])
+    ]
+    if cpu_rows:
+        await db.execute(insert(CPUs), cpu_rows)
+    if disk_rows:
+        await db.execute(insert(Disks), disk_rows)
+
+    return statuses
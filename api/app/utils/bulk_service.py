@@ -0,0 +1,105 @@
+"""Set-based helpers shared by bulk CRUD endpoints."""
+
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.dependencies import RequestContext
+from app.core.exceptions import ObjectNotFoundError, VersionConflictError
+
+
+async def check_visible_ids(
+    db: AsyncSession,
+    ctx: RequestContext,
+    model,
+    ids: Iterable[int],
+    name: str,
+    owner=None,
+    lock=None,
+):
+    """Check with one IN query that all rows exist and are visible to the user.
+
+    With lock set, the same query locks rows of that model (SELECT ... FOR
+    UPDATE) in ID order until commit. Single-row endpoints lock the same rows,
+    so bulk and single writes exclude each other without Redis round trips.
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :param model: SQLAlchemy model of the rows
+    :param ids: Row IDs
+    :param name: Name of the object used in the error message
+    :param owner: Related model holding team_id, joined when the rows have none
+    :param lock: Model whose rows are locked, model itself or owner
+    """
+    ids = set(ids)
+    if lock is None:
+        stmt = select(func.count(model.id)).select_from(model)
+    else:
+        stmt = select(lock.id).select_from(model).order_by(lock.id)
+        stmt = stmt.with_for_update(of=lock)
+    stmt = stmt.where(model.id.in_(ids))
+    if owner is not None:
+        stmt = stmt.join(owner)
+    stmt = ctx.team_filter(stmt, owner if owner is not None else model)
+    if lock is None:
+        found = await db.scalar(stmt)
+    else:
+        found = len((await db.scalars(stmt)).all())
+    if found != len(ids):
+        raise ObjectNotFoundError(name)
+
+
+async def lock_versions(db: AsyncSession, model, versions: dict[int, int]):
+    """Lock rows which still have the expected version_id.
+
+    :param db: Active database session
+    :param model: SQLAlchemy model of the rows
+    :param versions: Expected version_id by row ID
+    :raise VersionConflictError: If a row was changed or deleted since
+    """
+    table = model.__table__
+    stmt = (
+        select(table.c.id)
+        .where(tuple_(table.c.id, table.c.version_id).in_(list(versions.items())))
+        .order_by(table.c.id)
+        .with_for_update()
+    )
+    if len((await db.scalars(stmt)).all()) != len(versions):
+        raise VersionConflictError(model.__name__)
+
+
+async def bulk_update_rows(
+    db: AsyncSession, model, rows: list[dict], versions: Optional[dict] = None
+) -> int:
+    """Update rows by ID with one executemany statement per set of fields.
+
+    Versioned rows get version_id bumped, as the ORM does for single updates.
+    With versions set, rows are locked by lock_versions first and updated
+    only while they keep the expected version_id.
+    :param db: Active database session
+    :param model: SQLAlchemy model of the rows
+    :param rows: Dictionaries with id and the changed fields
+    :param versions: Expected version_id by row ID
+    :return: Number of updated rows.
+    """
+    table = model.__table__
+    if versions:
+        await lock_versions(db, model, versions)
+    groups = {}
+    for row in rows:
+        fields = tuple(sorted(set(row) - {"id"}))
+        if fields:
+            params = {f"b_{field}": row[field] for field in fields}
+            if versions:
+                params["b_version"] = versions[row["id"]]
+            groups.setdefault(fields, []).append({"b_id": row["id"], **params})
+
+    for fields, params in groups.items():
+        values = {field: bindparam(f"b_{field}") for field in fields}
+        if "version_id" in table.c:
+            values["version_id"] = table.c.version_id + 1
+        stmt = update(table).where(table.c.id == bindparam("b_id")).values(values)
+        if versions:
+            stmt = stmt.where(table.c.version_id == bindparam("b_version"))
+        await db.execute(stmt, params)
+    return sum(len(params) for params in groups.values())
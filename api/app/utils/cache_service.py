@@ -0,0 +1,357 @@
+"""Two-tier cache of computed values (in-process LRU + Redis).
+
+Consistency across API replicas is bounded by CACHE_LOCAL_TTL: a replica
+keeps tag versions and values locally for that long, so it can serve a
+value up to CACHE_LOCAL_TTL seconds after another replica invalidated it.
+The replica that committed the change sees it immediately.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from dotenv import load_dotenv
+from redis import RedisError
+
+from app.utils.redis_service import get_redis_client
+
+logger = logging.getLogger(__name__)
+load_dotenv(".env/api.env")
+CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", "60"))
+CACHE_LOCAL_TTL = float(os.getenv("CACHE_LOCAL_TTL", "5"))
+CACHE_LOCAL_MAX_ITEMS = int(os.getenv("CACHE_LOCAL_MAX_ITEMS", "1024"))
+CACHE_LOCK_TIMEOUT = int(os.getenv("CACHE_LOCK_TIMEOUT", "10"))
+CACHE_WAIT_TIMEOUT = float(os.getenv("CACHE_WAIT_TIMEOUT", "2"))
+
+CACHE_KEY_PREFIX = "cache"
+CACHE_TAG_PREFIX = "cache_tag"
+_MISSING = object()
+
+
+class LocalCache:
+    """Per-process LRU cache with expiring entries."""
+
+    def __init__(self, max_items: int = CACHE_LOCAL_MAX_ITEMS):
+        """Initialize fields.
+
+        :param max_items: Maximum number of kept entries
+        """
+        self.max_items = max_items
+        self.entries = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        """Get a value by key and mark it as recently used.
+
+        :param key: Cache key
+        :return: Cached value or _MISSING if absent or expired.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return _MISSING
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        """Store a value, evicting the least recently used entry when full.
+
+        :param key: Cache key
+        :param value: Value to store
+        :param ttl: Time to live in seconds
+        """
+        self.entries[key] = (value, time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_items:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries."""
+        self.entries.clear()
+
+
+local_cache = LocalCache()
+_tag_versions: dict[str, tuple[str, float]] = {}
+_inflight: dict[str, asyncio.Future] = {}
+registered_tags: set[str] = set()
+_request_invalidations: ContextVar[Optional[list]] = ContextVar(
+    "request_invalidations", default=None
+)
+
+
+def _tag_key(tag: str) -> str:
+    """Build Redis key holding version of a tag.
+
+    :param tag: Tag name
+    :return: Redis key.
+    """
+    return f"{CACHE_TAG_PREFIX}:{tag}"
+
+
+async def get_tag_versions(tags: Iterable[str]) -> dict[str, str]:
+    """Get current versions of tags with one MGET.
+
+    Versions are kept in process for CACHE_LOCAL_TTL seconds, so the local tier
+    can answer without touching Redis. Bumps made by other replicas are seen
+    once the local copy expires.
+    :param tags: Tag names
+    :return: Dictionary of tag to version.
+    """
+    now = time.monotonic()
+    versions = {}
+    missing = []
+    for tag in tags:
+        cached_version = _tag_versions.get(tag)
+        if cached_version and cached_version[1] > now:
+            versions[tag] = cached_version[0]
+        else:
+            missing.append(tag)
+
+    if missing:
+        client = await get_redis_client()
+        values = await client.mget([_tag_key(tag) for tag in missing])
+        for tag, value in zip(missing, values):
+            versions[tag] = value or "0"
+            _tag_versions[tag] = (versions[tag], now + CACHE_LOCAL_TTL)
+    return versions
+
+
+async def invalidate(*tags: str):
+    """Invalidate every cached value depending on any of the tags.
+
+    Versions are bumped in Redis, so other API replicas drop their entries
+    once their local view of tag versions expires.
+    :param tags: Tag names
+    """
+    if not tags:
+        return
+    client = await get_redis_client()
+    async with client.pipeline(transaction=False) as pipe:
+        for tag in tags:
+            pipe.incr(_tag_key(tag))
+        new_versions = await pipe.execute()
+    expires_at = time.monotonic() + CACHE_LOCAL_TTL
+    for tag, version in zip(tags, new_versions):
+        _tag_versions[tag] = (str(version), expires_at)
+
+
+def track_invalidation(task: asyncio.Task):
+    """Let the surrounding awaited_invalidations block wait for an invalidation.
+
+    :param task: Task bumping cache tags
+    """
+    pending = _request_invalidations.get()
+    if pending is not None:
+        pending.append(task)
+
+
+@asynccontextmanager
+async def awaited_invalidations():
+    """Wait on exit for invalidations started by commits inside the block.
+
+    Wraps request handling, so a response is sent only after the tags changed
+    by its commits are bumped and a following read cannot get stale values.
+    Failed invalidations are logged by their tasks and do not fail the block.
+    """
+    pending = []
+    token = _request_invalidations.set(pending)
+    try:
+        yield
+    finally:
+        _request_invalidations.reset(token)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def build_cache_key(
+    namespace: str, versions: dict[str, str], args: tuple, kwargs: dict
+) -> str:
+    """Build cache key from namespace, tag versions and call arguments.
+
+    :param namespace: Cache namespace, usually name of the cached function
+    :param versions: Dictionary of tag to version
+    :param args: Positional call arguments
+    :param kwargs: Keyword call arguments
+    :return: Cache key.
+    """
+    raw = json.dumps([args, kwargs], sort_keys=True, default=str)
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    tag_part = ",".join(f"{tag}={versions[tag]}" for tag in sorted(versions))
+    return f"{CACHE_KEY_PREFIX}:{namespace}:{tag_part}:{digest}"
+
+
+async def _compute_raw(compute: Callable[[], Awaitable[Any]]) -> str:
+    """Compute a value and serialize it to JSON.
+
+    :param compute: Coroutine factory producing the value
+    :return: JSON representation of the value.
+    """
+    return json.dumps(await compute(), default=str)
+
+
+async def _wait_for_value(client, key: str) -> Any:
+    """Poll Redis for a value being computed by another worker.
+
+    :param client: Redis client
+    :param key: Cache key
+    :return: Raw cached value or None when waiting timed out.
+    """
+    deadline = time.monotonic() + CACHE_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        raw = await client.get(key)
+        if raw is not None:
+            return raw
+    return None
+
+
+async def _load_or_compute(
+    key: str, compute: Callable[[], Awaitable[Any]], ttl: int
+) -> Any:
+    """Read a value from Redis or compute it while holding a recompute lock.
+
+    Only one worker recomputes an expired key, others wait for its result
+    and compute on their own only after CACHE_WAIT_TIMEOUT.
+    :param key: Cache key
+    :param compute: Coroutine factory producing the value
+    :param ttl: Redis time to live in seconds
+    :return: Cached or computed value.
+    """
+    try:
+        client = await get_redis_client()
+        raw = await client.get(key)
+        if raw is not None:
+            return json.loads(raw)
+        lock_key = f"{key}:lock"
+        is_locked = await client.set(lock_key, "1", nx=True, ex=CACHE_LOCK_TIMEOUT)
+        if not is_locked:
+            raw = await _wait_for_value(client, key)
+            if raw is not None:
+                return json.loads(raw)
+    except RedisError as e:
+        logger.warning(f"Redis cache tier unavailable for '{key}': {e}")
+        return json.loads(await _compute_raw(compute))
+
+    if not is_locked:
+        return json.loads(await _compute_raw(compute))
+
+    try:
+        raw = await _compute_raw(compute)
+        await client.set(key, raw, ex=ttl)
+    except RedisError as e:
+        logger.warning(f"Failed to store cached value '{key}': {e}")
+    finally:
+        try:
+            await client.delete(lock_key)
+        except RedisError:
+            pass
+    return json.loads(raw)
+
+
+async def get_or_compute(
+    namespace: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: int = CACHE_DEFAULT_TTL,
+    tags: Iterable[str] = (),
+    key_args: tuple = (),
+    key_kwargs: Optional[dict] = None,
+) -> Any:
+    """Get a value from the cache tiers or compute it once.
+
+    Concurrent callers in the same process share a single computation.
+    Values must be JSON serializable and are returned in their JSON form,
+    shared between callers, so they must not be mutated.
+    :param namespace: Cache namespace
+    :param compute: Coroutine factory producing the value
+    :param ttl: Redis time to live in seconds
+    :param tags: Tags whose invalidation drops the value
+    :param key_args: Positional arguments identifying the value
+    :param key_kwargs: Keyword arguments identifying the value
+    :return: Cached or computed value.
+    """
+    tags = tuple(tags)
+    try:
+        versions = await get_tag_versions(tags)
+    except RedisError as e:
+        logger.warning(f"Cache tag versions unavailable for '{namespace}': {e}")
+        return json.loads(await _compute_raw(compute))
+
+    key = build_cache_key(namespace, versions, key_args, key_kwargs or {})
+    value = local_cache.get(key)
+    if value is not _MISSING:
+        return value
+
+    future = _inflight.get(key)
+    if future is not None:
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+        return json.loads(await _compute_raw(compute))
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        value = await _load_or_compute(key, compute, ttl)
+        local_cache.set(key, value, min(CACHE_LOCAL_TTL, ttl))
+        future.set_result(value)
+        return value
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()
+        raise
+    finally:
+        if not future.done():
+            future.cancel()
+        _inflight.pop(key, None)
+
+
+def cached(
+    namespace: Optional[str] = None,
+    ttl: int = CACHE_DEFAULT_TTL,
+    tags: Iterable[str] = (),
+    key_builder: Optional[Callable[..., tuple]] = None,
+):
+    """Cache results of an async function in both cache tiers.
+
+    Tags are usually table names. Commits touching a registered table bump its
+    tag (see app.db.listeners), so cached values never outlive the data.
+    :param namespace: Cache namespace, defaults to qualified function name
+    :param ttl: Redis time to live in seconds
+    :param tags: Tags whose invalidation drops cached values
+    :param key_builder: Callable mapping call arguments to the key arguments,
+        required when arguments are not JSON serializable (e.g. sessions)
+    :return: Decorator.
+    """
+    tags = tuple(tags)
+    registered_tags.update(tags)
+
+    def decorator(func):
+        cache_namespace = namespace or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key_args = key_builder(*args, **kwargs) if key_builder else args
+            return await get_or_compute(
+                cache_namespace,
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                tags=tags,
+                key_args=tuple(key_args),
+                key_kwargs={} if key_builder else kwargs,
+            )
+
+        return wrapper
+
+    return decorator
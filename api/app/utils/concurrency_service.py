@@ -0,0 +1,77 @@
+"""Optimistic concurrency helpers based on entity versions."""
+
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+from fastapi import Header, Response
+
+from app.core.exceptions import ValidationError, VersionConflictError
+from app.utils.redis_service import acquire_lock
+
+
+def get_if_match_version(
+    if_match: Optional[str] = Header(default=None),
+) -> Optional[int]:
+    """Read expected entity version from the If-Match header.
+
+    Requests without the header (or with ``*``) keep the Redis lock path.
+    :param if_match: Raw If-Match header, e.g. "3"
+    :return: Expected version_id or None.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        raise ValidationError("If-Match requires a strong entity tag.")
+    try:
+        return int(value.strip('"'))
+    except ValueError as e:
+        raise ValidationError(f"Invalid If-Match header '{if_match}'.") from e
+
+
+def entity_etag(obj: Any) -> str:
+    """Build strong ETag of a versioned entity.
+
+    :param obj: SQLAlchemy model instance with version_id column
+    :return: ETag header value.
+    """
+    return f'"{obj.version_id}"'
+
+
+def set_entity_etag(response: Response, obj: Any):
+    """Expose entity version as ETag, to be sent back in If-Match.
+
+    :param response: Response of the current request
+    :param obj: SQLAlchemy model instance with version_id column
+    """
+    response.headers["ETag"] = entity_etag(obj)
+
+
+@asynccontextmanager
+async def write_guard(lock_name: str, expected_version: Optional[int]):
+    """Guard a single-entity mutation.
+
+    With an expected version the write relies on version_id optimistic locking
+    and skips Redis entirely, otherwise it takes the distributed lock.
+    :param lock_name: Unique key for the lock, eg. lock:machine:1
+    :param expected_version: Version from If-Match header or None
+    :return: None.
+    """
+    if expected_version is None:
+        async with acquire_lock(lock_name):
+            yield
+    else:
+        yield
+
+
+def check_version(obj: Any, expected_version: Optional[int], obj_type: str):
+    """Verify that the loaded entity is the version the client expects.
+
+    Concurrent writes between this check and commit are caught by
+    version_id_col, which raises StaleDataError on flush.
+    :param obj: SQLAlchemy model instance with version_id column
+    :param expected_version: Version from If-Match header or None
+    :param obj_type: Entity type used in error message
+    """
+    if expected_version is not None and obj.version_id != expected_version:
+        raise VersionConflictError(obj_type)
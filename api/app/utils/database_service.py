@@ -9,13 +9,15 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import HTTPException, status
-from sqlalchemy import delete, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import UniqueConstraint, bindparam, delete, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.exc import StaleDataError
 
 # pylint: disable=unused-import
 from app.db import models
+from app.db.listeners import HISTORY_UPDATE_FORMAT, history_diff_columns
 from app.utils.security import hash_password
 
 # ==========================
@@ -217,3 +219,193 @@ async def delete_old_history_logs(db: AsyncSession, days: int = 3) -> int:
     result = await db.execute(stmt)
     await db.commit()
     return result.rowcount
+
+
+COMPACT_HISTORY_UPDATES_SQL = text("""
+    WITH batch AS (
+        SELECT h.id FROM history h
+        WHERE h.action = 'UPDATE'
+          AND EXISTS (
+              SELECT 1 FROM jsonb_each(h.before_state) b
+              WHERE b.key <> 'version_id'
+                AND (coalesce(h.extra_data, '{}'::jsonb) ? b.key
+                     OR b.value = h.after_state -> b.key)
+          )
+        ORDER BY h.id
+        LIMIT :batch_size
+    )
+    UPDATE history h SET
+        before_state = (
+            SELECT coalesce(jsonb_object_agg(b.key, b.value), '{}'::jsonb)
+            FROM jsonb_each(h.before_state) b
+            WHERE b.key = 'version_id'
+               OR NOT (coalesce(h.extra_data, '{}'::jsonb) ? b.key
+                       OR b.value IS NOT DISTINCT FROM h.after_state -> b.key)
+        ),
+        after_state = (
+            SELECT coalesce(jsonb_object_agg(a.key, a.value), '{}'::jsonb)
+            FROM jsonb_each(h.after_state) a
+            WHERE a.key = 'version_id'
+               OR NOT (coalesce(h.extra_data, '{}'::jsonb) ? a.key
+                       OR a.value IS NOT DISTINCT FROM h.before_state -> a.key)
+        )
+    FROM batch
+    WHERE h.id = batch.id
+    """)
+
+
+async def compact_history_updates(db: AsyncSession, batch_size: int = 1000) -> int:
+    """Rewrite full-snapshot UPDATE history entries to the diff-only format.
+
+    Columns stored in extra_data and unchanged columns are dropped from
+    before_state and after_state, the same way the history listener stores
+    new entries. Batches are committed one by one and compacted rows are not
+    selected again, so the migration can be interrupted and rerun.
+    :param db: Active database session
+    :param batch_size: Number of rows rewritten per transaction
+    :return: Number of compacted rows.
+    """
+    total = 0
+    while True:
+        result = await db.execute(
+            COMPACT_HISTORY_UPDATES_SQL, {"batch_size": batch_size}
+        )
+        await db.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+
+async def backfill_history_diffs(db: AsyncSession, batch_size: int = 1000) -> int:
+    """Compute cleaned diffs of history entries written before they were stored.
+
+    Rows are read in ID order and updated with one executemany statement per
+    batch. Computed rows are not selected again, so the migration can be
+    interrupted and rerun.
+    :param db: Active database session
+    :param batch_size: Number of rows updated per transaction
+    :return: Number of updated rows.
+    """
+    table = models.History.__table__
+    stmt = update(table).where(table.c.id == bindparam("b_id"))
+    stmt = stmt.values(
+        before_diff=bindparam("b_before_diff"), after_diff=bindparam("b_after_diff")
+    )
+    last_id, total = 0, 0
+    while True:
+        rows = (
+            await db.execute(
+                select(
+                    table.c.id,
+                    table.c.before_state,
+                    table.c.after_state,
+                    table.c.extra_data,
+                )
+                .where(table.c.before_diff.is_(None), table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            )
+        ).all()
+        if not rows:
+            return total
+        params = []
+        for row in rows:
+            diff = history_diff_columns(
+                row.before_state, row.after_state, row.extra_data
+            )
+            params.append(
+                {
+                    "b_id": row.id,
+                    "b_before_diff": diff["before_diff"],
+                    "b_after_diff": diff["after_diff"],
+                }
+            )
+        await db.execute(stmt, params)
+        await db.commit()
+        last_id = rows[-1].id
+        total += len(rows)
+
+
+DATA_MIGRATIONS_LOCK_KEY = 7302614
+
+
+async def run_history_migrations(connection: AsyncConnection) -> None:
+    """Run one-off history data migrations on a single replica.
+
+    A session advisory lock lets one replica migrate while the others skip,
+    and finished migrations are recorded in data_migrations so later startups
+    do not scan the history table again.
+    :param connection: Dedicated connection holding the advisory lock
+    :return: None
+    """
+    migrations = [("backfill_history_diffs", backfill_history_diffs)]
+    if HISTORY_UPDATE_FORMAT == "diff":
+        migrations.insert(0, ("compact_history_updates", compact_history_updates))
+
+    lock_params = {"key": DATA_MIGRATIONS_LOCK_KEY}
+    locked = await connection.scalar(
+        text("SELECT pg_try_advisory_lock(:key)"), lock_params
+    )
+    await connection.commit()
+    if not locked:
+        return
+    try:
+        async with AsyncSession(bind=connection, expire_on_commit=False) as db:
+            done = set((await db.scalars(select(models.DataMigration.name))).all())
+            for name, migration in migrations:
+                if name in done:
+                    continue
+                await migration(db)
+                db.add(models.DataMigration(name=name))
+                await db.commit()
+    finally:
+        await connection.execute(text("SELECT pg_advisory_unlock(:key)"), lock_params)
+        await connection.commit()
+
+
+TAG_LINK_MODELS = (
+    models.TagsMachines,
+    models.TagsRacks,
+    models.TagsRooms,
+    models.TagsDocumentation,
+)
+
+
+def dedupe_tag_links(connection: Connection) -> int:
+    """Delete duplicate tag links before their unique constraints are created.
+
+    Runs on the migration connection before the schema is upgraded, because
+    the unique constraint cannot be added while a pair is linked twice. The
+    link with the lowest ID is kept. Tables missing on a fresh database and
+    tables which already have the constraint are skipped without scanning.
+    :param connection: Synchronous database connection
+    :return: Number of deleted links.
+    """
+    total = 0
+    for model in TAG_LINK_MODELS:
+        table = model.__table__
+        constraint = next(
+            constraint
+            for constraint in table.constraints
+            if isinstance(constraint, UniqueConstraint)
+        )
+        pending = connection.scalar(
+            text(
+                "SELECT to_regclass(:table) IS NOT NULL AND NOT EXISTS ("
+                "SELECT 1 FROM pg_constraint "
+                "WHERE conrelid = to_regclass(:table) AND conname = :constraint)"
+            ),
+            {"table": table.name, "constraint": constraint.name},
+        )
+        if not pending:
+            continue
+        columns = constraint.columns.keys()
+        same_pair = " AND ".join(f"a.{column} = b.{column}" for column in columns)
+        result = connection.execute(
+            text(
+                f"DELETE FROM {table.name} a USING {table.name} b "
+                f"WHERE {same_pair} AND a.id > b.id"
+            )
+        )
+        total += result.rowcount
+    return total
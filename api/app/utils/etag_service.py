@@ -0,0 +1,129 @@
+"""Weak ETags for conditional GET of heavy read endpoints."""
+
+import hashlib
+from typing import Any, Iterable, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import BigInteger, Select, cast, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.dependencies import RequestContext
+from app.utils.cache_service import get_tag_versions
+
+
+def fingerprint(model, *criteria) -> Select:
+    """Build a query summarising the current content of table rows.
+
+    Versioned rows are summarised by row count, highest ID and the sum of
+    version_id (every ORM update bumps it). Rows without versions (CPUs,
+    disks, tag links) fall back to a hash of all rows, so such tables should
+    be narrowed by criteria to the rows of one entity.
+    :param model: SQLAlchemy model
+    :param criteria: Optional filters narrowing the summarised rows
+    :return: SQLAlchemy select of a single text column.
+    """
+    table = model.__table__
+    if "version_id" in table.c and "id" in table.c:
+        summary = func.concat_ws(
+            ":", func.count(), func.max(table.c.id), func.sum(table.c.version_id)
+        )
+    else:
+        row_hash = func.hashtext(literal_column(f'"{table.name}"::text'))
+        summary = func.concat_ws(
+            ":", func.count(), func.sum(cast(row_hash, BigInteger))
+        )
+    return select(summary).select_from(table).where(*criteria)
+
+
+async def tables_watermark(db: AsyncSession, fingerprints: Iterable[Any]) -> str:
+    """Get a watermark that changes whenever any of the summarised rows changes.
+
+    Whole tables are summarised by their cache tag versions, which commits
+    bump (see app.db.listeners), so no table is scanned. Such tables must be
+    registered cache tags of a cached function. Versions are read through the
+    local tier of get_tag_versions and can lag behind other replicas for up to
+    CACHE_LOCAL_TTL. All fingerprint queries are evaluated by a single query,
+    which is much cheaper than the joined query of the endpoint itself.
+    :param db: Active database session
+    :param fingerprints: SQLAlchemy models (whole tables) or fingerprint queries
+    :return: Watermark string.
+    """
+    queries = [item for item in fingerprints if isinstance(item, Select)]
+    tables = [
+        item.__tablename__ for item in fingerprints if not isinstance(item, Select)
+    ]
+    parts = []
+    if queries:
+        subqueries = [query.scalar_subquery() for query in queries]
+        parts.append(await db.scalar(select(func.concat_ws("|", *subqueries))))
+    if tables:
+        versions = await get_tag_versions(tables)
+        parts.extend(f"{table}={versions[table]}" for table in tables)
+    return "|".join(parts)
+
+
+def weak_etag(*parts: Any) -> str:
+    """Build weak ETag from arbitrary parts.
+
+    :param parts: Values identifying the response version
+    :return: ETag header value.
+    """
+    raw = "|".join(str(part) for part in parts)
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match header with weak comparison.
+
+    :param request: Incoming request
+    :param etag: Current ETag of the resource
+    :return: True if the client already has the current version.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    current = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == current
+        for candidate in header.split(",")
+    )
+
+
+async def check_not_modified(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    ctx: RequestContext,
+    fingerprints: Iterable[Any],
+    *parts: Any,
+) -> Optional[Response]:
+    """Answer conditional GET before the heavy query runs.
+
+    The ETag covers the watermark, the requested URL and the caller's
+    permissions, since the same URL returns different data to different teams.
+    :param request: Incoming request
+    :param response: Response used to expose the ETag header
+    :param db: Active database session
+    :param ctx: Request context for user and team info
+    :param fingerprints: Models or fingerprint queries of rows in the response
+    :param parts: Extra values the response depends on
+    :return: 304 response if client copy is current, otherwise None.
+    """
+    watermark = await tables_watermark(db, fingerprints)
+    etag = weak_etag(
+        watermark,
+        request.url.path,
+        request.url.query,
+        ctx.current_user.id,
+        ctx.user_type,
+        sorted(ctx.team_ids),
+        *parts,
+    )
+    if etag_matches(request, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+    response.headers["ETag"] = etag
+    return None
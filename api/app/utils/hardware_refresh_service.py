@@ -0,0 +1,241 @@
+"""Scheduled hardware refresh of machines with outdated inventory data."""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import or_, select, update
+
+from app.core.exceptions import ConflictError
+from app.database import AsyncSessionLocal
+from app.db.models import Machines, Metadata
+from app.utils.ansible_service import (
+    PLAYBOOK_DIR,
+    apply_platform_specs,
+    collect_platform_reports,
+    parse_platform_report,
+)
+from app.utils.redis_service import acquire_lock, get_redis_client, keep_lock_alive
+
+logger = logging.getLogger(__name__)
+load_dotenv(".env/api.env")
+HARDWARE_REFRESH_INTERVAL = int(os.getenv("HARDWARE_REFRESH_INTERVAL", "3600"))
+HARDWARE_REFRESH_MAX_AGE_DAYS = int(os.getenv("HARDWARE_REFRESH_MAX_AGE_DAYS", "7"))
+HARDWARE_REFRESH_BATCH_SIZE = int(os.getenv("HARDWARE_REFRESH_BATCH_SIZE", "20"))
+HARDWARE_REFRESH_BATCH_DELAY = int(os.getenv("HARDWARE_REFRESH_BATCH_DELAY", "30"))
+HARDWARE_REFRESH_ANSIBLE_USER = os.getenv("HARDWARE_REFRESH_ANSIBLE_USER", "ansible")
+HARDWARE_REFRESH_LOCK_TIMEOUT = int(os.getenv("HARDWARE_REFRESH_LOCK_TIMEOUT", "60"))
+HARDWARE_REFRESH_RETRY_HOURS = int(os.getenv("HARDWARE_REFRESH_RETRY_HOURS", "24"))
+
+HARDWARE_REFRESH_LOCK = "lock:hardware_refresh"
+HARDWARE_REFRESH_STATUS_KEY = "hardware_refresh_status"
+SCAN_PLAYBOOK = f"{PLAYBOOK_DIR}/scan_platform.yaml"
+
+
+async def save_refresh_progress(progress: dict):
+    """Store progress of the current refresh run in Redis.
+
+    The key has no expiration, so the last run stays visible between cycles.
+    :param progress: Progress dictionary
+    """
+    progress["updated_at"] = datetime.now().isoformat()
+    client = await get_redis_client()
+    await client.set(HARDWARE_REFRESH_STATUS_KEY, json.dumps(progress))
+
+
+async def get_refresh_progress() -> dict:
+    """Read progress of the last refresh run from Redis.
+
+    :return: Progress dictionary or idle state if no run happened yet.
+    """
+    client = await get_redis_client()
+    raw = await client.get(HARDWARE_REFRESH_STATUS_KEY)
+    return json.loads(raw) if raw else {"state": "idle", "batches": []}
+
+
+async def get_stale_machine_ids(
+    max_age_days: int, retry_hours: int = HARDWARE_REFRESH_RETRY_HOURS
+) -> list[int]:
+    """Select machines reachable by Ansible whose hardware data is outdated.
+
+    Machines never scanned come first, then the oldest ones.
+    Machines whose last refresh attempt failed are skipped until retry_hours
+    pass, so unreachable hosts do not take every batch from healthy ones.
+    :param max_age_days: Age in days after which hardware data is outdated
+    :param retry_hours: Hours to wait before retrying a failed machine
+    :return: List of machine IDs.
+    """
+    cutoff = date.today() - timedelta(days=max_age_days)
+    retry_cutoff = datetime.now() - timedelta(hours=retry_hours)
+    stmt = (
+        select(Machines.id)
+        .join(Metadata, Machines.metadata_id == Metadata.id)
+        .where(
+            Metadata.ansible_access.is_(True),
+            or_(Metadata.last_update.is_(None), Metadata.last_update <= cutoff),
+            or_(
+                Metadata.last_refresh_attempt.is_(None),
+                Metadata.last_refresh_attempt <= retry_cutoff,
+            ),
+        )
+        .order_by(
+            Metadata.last_update.asc().nulls_first(),
+            Metadata.last_refresh_attempt.asc().nulls_first(),
+            Machines.id,
+        )
+    )
+    async with AsyncSessionLocal() as db:
+        return list((await db.scalars(stmt)).all())
+
+
+async def refresh_machines_batch(machine_ids: list[int]) -> tuple[int, int]:
+    """Scan one batch of machines with a single playbook run and store the results.
+
+    No database session is held while the playbook runs, the machines are
+    loaded again afterwards to store the results.
+    Hosts that are unreachable or return no report are counted as failed.
+    Every scanned machine gets last_refresh_attempt set, so failed ones are
+    backed off by get_stale_machine_ids.
+    :param machine_ids: IDs of machines to refresh
+    :return: Number of refreshed and failed machines.
+    """
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(
+                select(Machines.id, Machines.name, Machines.metadata_id).where(
+                    Machines.id.in_(machine_ids)
+                )
+            )
+        ).all()
+    ids_by_host = {}
+    for machine_id, name, _ in rows:
+        ids_by_host.setdefault(name, machine_id)
+
+    reports = await collect_platform_reports(
+        SCAN_PLAYBOOK,
+        list(ids_by_host),
+        {"ansible_user": HARDWARE_REFRESH_ANSIBLE_USER},
+        allow_failures=True,
+    )
+    specs_by_host = {}
+    for host in ids_by_host:
+        try:
+            specs_by_host[host] = parse_platform_report(reports, host)
+        except Exception as e:
+            logger.warning(f"Hardware refresh skipped host '{host}': {e}")
+
+    async with AsyncSessionLocal() as db:
+        if specs_by_host:
+            stmt = select(Machines).where(
+                Machines.id.in_([ids_by_host[host] for host in specs_by_host])
+            )
+            machines_by_host = {m.name: m for m in (await db.scalars(stmt)).all()}
+            specs_by_host = {
+                host: specs
+                for host, specs in specs_by_host.items()
+                if host in machines_by_host
+            }
+            await apply_platform_specs(db, specs_by_host, machines_by_host)
+        await db.execute(
+            update(Metadata)
+            .where(Metadata.id.in_([row.metadata_id for row in rows]))
+            .values(last_refresh_attempt=datetime.now())
+        )
+        await db.commit()
+
+    return len(specs_by_host), len(rows) - len(specs_by_host)
+
+
+async def refresh_stale_machines(
+    batch_size: int = HARDWARE_REFRESH_BATCH_SIZE,
+    batch_delay: int = HARDWARE_REFRESH_BATCH_DELAY,
+    max_age_days: int = HARDWARE_REFRESH_MAX_AGE_DAYS,
+) -> dict:
+    """Refresh hardware of all stale machines in rate-limited batches.
+
+    The whole run holds a Redis lock, so only one API replica refreshes at a time.
+    The lock is extended while batches run, so it outlives long playbook runs
+    but expires soon after a crashed worker. The run stops if it was lost.
+    Progress and per-batch timing are published via save_refresh_progress.
+    :param batch_size: Number of machines scanned by one playbook run
+    :param batch_delay: Pause between batches in seconds
+    :param max_age_days: Age in days after which hardware data is outdated
+    :return: Final progress dictionary.
+    """
+    async with acquire_lock(
+        HARDWARE_REFRESH_LOCK, timeout=HARDWARE_REFRESH_LOCK_TIMEOUT, wait_timeout=1
+    ) as lock:
+        keepalive = asyncio.create_task(
+            keep_lock_alive(lock, HARDWARE_REFRESH_LOCK_TIMEOUT / 3)
+        )
+        try:
+            machine_ids = await get_stale_machine_ids(max_age_days)
+            progress = {
+                "state": "running",
+                "started_at": datetime.now().isoformat(),
+                "finished_at": None,
+                "total": len(machine_ids),
+                "processed": 0,
+                "refreshed": 0,
+                "failed": 0,
+                "batches": [],
+            }
+            await save_refresh_progress(progress)
+
+            for index, start in enumerate(range(0, len(machine_ids), batch_size)):
+                if index:
+                    await asyncio.sleep(batch_delay)
+                if keepalive.done():
+                    raise ConflictError(
+                        "Hardware refresh lock was lost."
+                    ) from keepalive.exception()
+                batch_ids = machine_ids[start : start + batch_size]
+                started = time.perf_counter()
+                try:
+                    refreshed, failed = await refresh_machines_batch(batch_ids)
+                    batch_status = "completed"
+                except Exception as e:
+                    logger.error(f"Hardware refresh batch {index + 1} failed: {e}")
+                    refreshed, failed = 0, len(batch_ids)
+                    batch_status = "error"
+
+                progress["processed"] += len(batch_ids)
+                progress["refreshed"] += refreshed
+                progress["failed"] += failed
+                progress["batches"].append(
+                    {
+                        "batch": index + 1,
+                        "size": len(batch_ids),
+                        "refreshed": refreshed,
+                        "failed": failed,
+                        "status": batch_status,
+                        "duration": round(time.perf_counter() - started, 3),
+                    }
+                )
+                await save_refresh_progress(progress)
+
+            progress["state"] = "idle"
+            progress["finished_at"] = datetime.now().isoformat()
+            await save_refresh_progress(progress)
+        finally:
+            keepalive.cancel()
+    return progress
+
+
+async def hardware_refresh_worker():
+    """Periodically refresh hardware of machines with outdated inventory data.
+
+    :return: None.
+    """
+    while True:
+        try:
+            await refresh_stale_machines()
+        except ConflictError:
+            logger.info("Hardware refresh is already running on another worker.")
+        except Exception as e:
+            logger.error(f"Hardware refresh run failed: {e}")
+        await asyncio.sleep(HARDWARE_REFRESH_INTERVAL)
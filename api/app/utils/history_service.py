@@ -0,0 +1,197 @@
+"""Point-in-time reconstruction of entities from history with checkpoints."""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import ConflictError
+from app.database import AsyncSessionLocal
+from app.db.listeners import history_states
+from app.db.models import ActionType, EntityType, History, HistoryCheckpoint
+from app.utils.redis_service import acquire_lock
+
+logger = logging.getLogger(__name__)
+load_dotenv(".env/api.env")
+HISTORY_CHECKPOINT_EVERY = int(os.getenv("HISTORY_CHECKPOINT_EVERY", "50"))
+HISTORY_CHECKPOINT_INTERVAL = int(os.getenv("HISTORY_CHECKPOINT_INTERVAL", "900"))
+HISTORY_CHECKPOINT_BATCH_SIZE = int(os.getenv("HISTORY_CHECKPOINT_BATCH_SIZE", "500"))
+
+HISTORY_CHECKPOINT_LOCK = "lock:history_checkpoints"
+
+
+def apply_history_entry(state: Optional[dict], entry: History) -> Optional[dict]:
+    """Apply one history entry to an entity state.
+
+    CREATE replaces the state with the stored snapshot, UPDATE applies new
+    values of changed columns and DELETE removes the entity. UPDATE entries
+    without extra_data apply their after_state snapshot.
+    :param state: State before the entry, None if the entity does not exist
+    :param entry: History entry
+    :return: State after the entry.
+    """
+    if entry.action == ActionType.CREATE:
+        return dict(entry.after_state or {})
+    if entry.action == ActionType.DELETE:
+        return None
+
+    _, after = history_states(entry.before_state, entry.after_state, entry.extra_data)
+    return {**(state or {}), **after}
+
+
+async def reconstruct_entity_state(
+    db: AsyncSession,
+    entity_type: EntityType,
+    entity_id: int,
+    at: Optional[datetime] = None,
+) -> dict:
+    """Reconstruct entity state at a point in time.
+
+    Starts from the newest checkpoint not later than the requested time and
+    folds only history entries recorded after it. Checkpoints and entries are
+    both ordered by history ID, the requested time is resolved to the last
+    entry recorded before it. The state is incomplete when neither a CREATE
+    entry nor a complete checkpoint precedes the folded updates.
+    :param db: Active database session
+    :param entity_type: Entity type
+    :param entity_id: Entity ID
+    :param at: Point in time, latest state if not provided
+    :return: Dictionary with state and reconstruction details.
+    """
+    checkpoint_stmt = (
+        select(HistoryCheckpoint)
+        .where(
+            HistoryCheckpoint.entity_type == entity_type,
+            HistoryCheckpoint.entity_id == entity_id,
+        )
+        .order_by(HistoryCheckpoint.history_id.desc())
+        .limit(1)
+    )
+    entries_stmt = (
+        select(History)
+        .where(History.entity_type == entity_type, History.entity_id == entity_id)
+        .order_by(History.id)
+    )
+    if at is not None:
+        last_id = await db.scalar(
+            select(func.max(History.id)).where(
+                History.entity_type == entity_type,
+                History.entity_id == entity_id,
+                History.timestamp <= at,
+            )
+        )
+        checkpoint_stmt = checkpoint_stmt.where(
+            HistoryCheckpoint.history_id <= (last_id or 0)
+        )
+        entries_stmt = entries_stmt.where(History.id <= (last_id or 0))
+
+    checkpoint = (await db.execute(checkpoint_stmt)).scalar_one_or_none()
+    state, last_history_id, complete = None, None, False
+    if checkpoint:
+        state, last_history_id = checkpoint.state, checkpoint.history_id
+        complete = checkpoint.complete
+        entries_stmt = entries_stmt.where(History.id > checkpoint.history_id)
+
+    entries = (await db.execute(entries_stmt)).scalars().all()
+    for entry in entries:
+        state = apply_history_entry(state, entry)
+        last_history_id = entry.id
+        complete = complete or entry.action != ActionType.UPDATE
+
+    return {
+        "entity_type": entity_type.value,
+        "entity_id": entity_id,
+        "at": at,
+        "exists": state is not None,
+        "complete": complete,
+        "state": state,
+        "history_id": last_history_id,
+        "checkpoint_history_id": checkpoint.history_id if checkpoint else None,
+        "replayed_entries": len(entries),
+    }
+
+
+async def create_history_checkpoints(
+    every: int = HISTORY_CHECKPOINT_EVERY,
+    batch_size: int = HISTORY_CHECKPOINT_BATCH_SIZE,
+) -> int:
+    """Store checkpoints of entities with many entries since their last one.
+
+    The run holds a Redis lock, so only one API replica creates checkpoints.
+    :param every: Number of entries after which a new checkpoint is stored
+    :param batch_size: Maximum number of entities checkpointed in one run
+    :return: Number of created checkpoints.
+    """
+    async with acquire_lock(
+        HISTORY_CHECKPOINT_LOCK,
+        timeout=max(HISTORY_CHECKPOINT_INTERVAL, 60),
+        wait_timeout=1,
+    ):
+        async with AsyncSessionLocal() as db:
+            last = (
+                select(
+                    HistoryCheckpoint.entity_type,
+                    HistoryCheckpoint.entity_id,
+                    func.max(HistoryCheckpoint.history_id).label("history_id"),
+                )
+                .group_by(HistoryCheckpoint.entity_type, HistoryCheckpoint.entity_id)
+                .subquery()
+            )
+            stmt = (
+                select(History.entity_type, History.entity_id)
+                .outerjoin(
+                    last,
+                    and_(
+                        last.c.entity_type == History.entity_type,
+                        last.c.entity_id == History.entity_id,
+                    ),
+                )
+                .where(History.id > func.coalesce(last.c.history_id, 0))
+                .group_by(History.entity_type, History.entity_id)
+                .having(func.count() >= every)
+                .limit(batch_size)
+            )
+            entities = (await db.execute(stmt)).all()
+
+            for entity_type, entity_id in entities:
+                result = await reconstruct_entity_state(db, entity_type, entity_id)
+                timestamp = await db.scalar(
+                    select(History.timestamp).where(History.id == result["history_id"])
+                )
+                await db.execute(
+                    pg_insert(HistoryCheckpoint)
+                    .values(
+                        entity_type=entity_type,
+                        entity_id=entity_id,
+                        history_id=result["history_id"],
+                        timestamp=timestamp,
+                        state=result["state"],
+                        complete=result["complete"],
+                    )
+                    .on_conflict_do_nothing(constraint="_history_checkpoint_uc")
+                )
+            await db.commit()
+    return len(entities)
+
+
+async def history_checkpoint_worker():
+    """Periodically store history checkpoints.
+
+    :return: None.
+    """
+    while True:
+        try:
+            created = await create_history_checkpoints()
+            if created:
+                logger.info(f"Stored {created} history checkpoints.")
+        except ConflictError:
+            logger.info("History checkpoints are created by another worker.")
+        except Exception as e:
+            logger.error(f"History checkpoint run failed: {e}")
+        await asyncio.sleep(HISTORY_CHECKPOINT_INTERVAL)
@@ -0,0 +1,497 @@
+"""Bulk import and export of machines with their CPUs and disks."""
+
+import csv
+import io
+import json
+import logging
+import os
+import time
+from typing import AsyncIterator, Optional
+
+from dotenv import load_dotenv
+from pydantic import ValidationError as PydanticValidationError
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import ValidationError
+from app.database import AsyncSessionLocal
+from app.db.listeners import HISTORY_UPDATE_FORMAT, INTERNAL_KEYS, mark_cache_tags
+from app.db.models import CPUs, Disks, Machines
+from app.db.schemas import MachineImportRow
+from app.utils.redis_service import acquire_lock
+
+logger = logging.getLogger(__name__)
+load_dotenv(".env/api.env")
+MACHINE_IMPORT_LOCK_TIMEOUT = int(os.getenv("MACHINE_IMPORT_LOCK_TIMEOUT", "600"))
+MACHINE_EXPORT_BATCH_SIZE = int(os.getenv("MACHINE_EXPORT_BATCH_SIZE", "1000"))
+
+MACHINE_IMPORT_LOCK = "lock:machine_import"
+STAGING_TABLE = "machine_import_staging"
+IMPORT_FORMATS = ("csv", "ndjson")
+MACHINE_FIELDS = (
+    "name",
+    "localization_id",
+    "team_id",
+    "mac_address",
+    "ip_address",
+    "pdu_port",
+    "os",
+    "serial_number",
+    "note",
+    "ram",
+    "shelf_id",
+)
+CSV_FIELDS = (*MACHINE_FIELDS, "cpus", "disks")
+STAGING_COLUMNS = (
+    "line",
+    *MACHINE_FIELDS,
+    "cpu_names",
+    "disk_names",
+    "disk_capacities",
+)
+CHANGED_TABLES = ("machines", "metadata", "cpus", "disks")
+
+CREATE_STAGING_SQL = f"""
+CREATE TEMP TABLE {STAGING_TABLE} (
+    line integer NOT NULL,
+    name varchar(100) NOT NULL,
+    localization_id integer NOT NULL,
+    team_id integer,
+    mac_address varchar(17),
+    ip_address varchar(15),
+    pdu_port integer,
+    os varchar(30),
+    serial_number varchar(50),
+    note varchar(500),
+    ram varchar(100),
+    shelf_id integer,
+    cpu_names text[],
+    disk_names text[],
+    disk_capacities text[],
+    machine_id integer,
+    metadata_id integer,
+    is_new boolean NOT NULL DEFAULT false,
+    error text
+) ON COMMIT DROP
+"""
+VALIDATION_SQL = (
+    f"""
+    UPDATE {STAGING_TABLE} s SET error = format('Room %s not found', s.localization_id)
+    WHERE s.error IS NULL
+      AND NOT EXISTS (SELECT 1 FROM rooms r WHERE r.id = s.localization_id)
+    """,
+    f"""
+    UPDATE {STAGING_TABLE} s SET error = format('Team %s not found', s.team_id)
+    WHERE s.error IS NULL AND s.team_id IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM teams t WHERE t.id = s.team_id)
+    """,
+    f"""
+    UPDATE {STAGING_TABLE} s SET error = format('Shelf %s not found', s.shelf_id)
+    WHERE s.error IS NULL AND s.shelf_id IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM shelves sh WHERE sh.id = s.shelf_id)
+    """,
+    f"""
+    UPDATE {STAGING_TABLE} s SET machine_id = m.id, metadata_id = m.metadata_id
+    FROM machines m
+    WHERE m.name = s.name AND m.localization_id = s.localization_id
+    """,
+)
+ACCESS_SQL = (
+    f"""
+    UPDATE {STAGING_TABLE} s SET error = 'Insufficient permissions for target team'
+    WHERE s.error IS NULL
+      AND (s.team_id IS NULL OR NOT s.team_id = ANY(:team_ids))
+    """,
+    f"""
+    UPDATE {STAGING_TABLE} s SET error = 'Insufficient permissions for existing machine'
+    FROM machines m
+    WHERE s.error IS NULL AND m.id = s.machine_id
+      AND (m.team_id IS NULL OR NOT m.team_id = ANY(:team_ids))
+    """,
+)
+HISTORY_CREATE_SQL = f"""
+INSERT INTO history (entity_type, action, entity_id, user_id, after_state,
+    can_rollback, before_diff, after_diff)
+SELECT 'MACHINES', 'CREATE', m.id, :user_id, to_jsonb(m), true, '{{}}'::jsonb,
+    to_jsonb(m) - CAST(:internal_keys AS text[])
+FROM machines m JOIN {STAGING_TABLE} s ON s.machine_id = m.id
+WHERE s.is_new
+"""
+if HISTORY_UPDATE_FORMAT == "diff":
+    UPDATE_STATES_SQL = """
+    jsonb_build_object('version_id', c.version_id),
+    jsonb_build_object('version_id', c.version_id + 1),"""
+else:
+    UPDATE_STATES_SQL = """
+    c.old_row,
+    c.old_row || (SELECT jsonb_object_agg(key, value -> 'new')
+                  FROM jsonb_each(c.changes))
+              || jsonb_build_object('version_id', c.version_id + 1),"""
+HISTORY_UPDATE_SQL = f"""
+INSERT INTO history (entity_type, action, entity_id, user_id, before_state,
+    after_state, extra_data, can_rollback, before_diff, after_diff)
+SELECT 'MACHINES', 'UPDATE', c.machine_id, :user_id,{UPDATE_STATES_SQL}
+    c.changes, true,
+    coalesce((SELECT jsonb_object_agg(key, value -> 'old') FROM jsonb_each(c.changes)
+              WHERE NOT key = ANY(CAST(:internal_keys AS text[]))), '{{}}'::jsonb),
+    coalesce((SELECT jsonb_object_agg(key, value -> 'new') FROM jsonb_each(c.changes)
+              WHERE NOT key = ANY(CAST(:internal_keys AS text[]))), '{{}}'::jsonb)
+FROM (
+    SELECT s.machine_id, m.version_id, to_jsonb(m) AS old_row,
+        (SELECT jsonb_object_agg(o.key, jsonb_build_object('old', o.value,
+                                                           'new', n.value))
+         FROM jsonb_each(jsonb_build_object(
+                {", ".join(f"'{field}', m.{field}" for field in MACHINE_FIELDS)})) o
+         JOIN jsonb_each(jsonb_build_object(
+                {", ".join(f"'{field}', s.{field}" for field in MACHINE_FIELDS)})) n
+           ON n.key = o.key
+         WHERE o.value IS DISTINCT FROM n.value) AS changes
+    FROM {STAGING_TABLE} s JOIN machines m ON m.id = s.machine_id
+    WHERE NOT s.is_new AND s.error IS NULL
+) c
+WHERE c.changes IS NOT NULL
+"""
+MERGE_SQL = (
+    f"""
+    UPDATE {STAGING_TABLE}
+    SET machine_id = nextval(pg_get_serial_sequence('machines', 'id')),
+        metadata_id = nextval(pg_get_serial_sequence('metadata', 'id')),
+        is_new = true
+    WHERE machine_id IS NULL AND error IS NULL
+    """,
+    f"""
+    INSERT INTO metadata
+        (id, agent_prometheus, ansible_access, ansible_root_access, version_id)
+    SELECT metadata_id, false, false, false, 1 FROM {STAGING_TABLE} WHERE is_new
+    """,
+    f"""
+    INSERT INTO machines (id, {", ".join(MACHINE_FIELDS)}, added_on, metadata_id,
+        version_id)
+    SELECT machine_id, {", ".join(MACHINE_FIELDS)}, localtimestamp, metadata_id, 1
+    FROM {STAGING_TABLE} WHERE is_new
+    """,
+    HISTORY_CREATE_SQL,
+    HISTORY_UPDATE_SQL,
+    f"""
+    UPDATE machines m
+    SET {", ".join(f"{field} = s.{field}" for field in MACHINE_FIELDS)},
+        version_id = m.version_id + 1
+    FROM {STAGING_TABLE} s
+    WHERE s.machine_id = m.id AND NOT s.is_new AND s.error IS NULL
+      AND ({", ".join(f"m.{field}" for field in MACHINE_FIELDS)})
+          IS DISTINCT FROM ({", ".join(f"s.{field}" for field in MACHINE_FIELDS)})
+    """,
+    f"""
+    DELETE FROM cpus WHERE machine_id IN (
+        SELECT machine_id FROM {STAGING_TABLE}
+        WHERE error IS NULL AND NOT is_new AND cpu_names IS NOT NULL
+    )
+    """,
+    f"""
+    INSERT INTO cpus (name, machine_id)
+    SELECT unnest(cpu_names), machine_id FROM {STAGING_TABLE}
+    WHERE error IS NULL AND cpu_names IS NOT NULL
+    """,
+    f"""
+    DELETE FROM disks WHERE machine_id IN (
+        SELECT machine_id FROM {STAGING_TABLE}
+        WHERE error IS NULL AND NOT is_new AND disk_names IS NOT NULL
+    )
+    """,
+    f"""
+    INSERT INTO disks (name, capacity, machine_id)
+    SELECT d.name, d.capacity, s.machine_id
+    FROM {STAGING_TABLE} s, unnest(s.disk_names, s.disk_capacities) AS d(name, capacity)
+    WHERE s.error IS NULL AND s.disk_names IS NOT NULL
+    """,
+)
+
+
+def resolve_format(filename: Optional[str], file_format: Optional[str]) -> str:
+    """Resolve format of an import file from explicit format or file extension.
+
+    :param filename: Name of the uploaded file
+    :param file_format: Explicitly requested format
+    :return: "csv" or "ndjson".
+    """
+    if file_format:
+        resolved = file_format.lower()
+    elif filename and filename.lower().endswith(".csv"):
+        resolved = "csv"
+    else:
+        resolved = "ndjson"
+    if resolved not in IMPORT_FORMATS:
+        raise ValidationError(f"Unsupported import format: {file_format}")
+    return resolved
+
+
+def csv_to_record(row: dict) -> dict:
+    """Convert flat CSV row to machine record.
+
+    Empty cells become None. CPUs are separated with ";", disks are written
+    as "name:capacity" pairs separated with ";". A missing cpus or disks
+    column keeps current components, an empty cell removes them.
+    :param row: CSV row dictionary
+    :return: Machine record dictionary.
+    """
+    record = {
+        field: (value if value != "" else None)
+        for field, value in row.items()
+        if field in MACHINE_FIELDS
+    }
+    if row.get("cpus") is not None:
+        record["cpus"] = [cpu for cpu in row["cpus"].split(";") if cpu]
+    if row.get("disks") is not None:
+        record["disks"] = []
+        for disk in filter(None, row["disks"].split(";")):
+            name, _, capacity = disk.partition(":")
+            record["disks"].append({"name": name, "capacity": capacity or None})
+    return record
+
+
+def parse_machine_rows(
+    content: bytes, file_format: str
+) -> tuple[list[tuple[int, MachineImportRow]], list[dict]]:
+    """Parse and validate import file.
+
+    Rows are validated one by one, so a single broken line does not reject
+    the whole file.
+    :param content: Raw file content
+    :param file_format: "csv" or "ndjson"
+    :return: Valid (line, row) pairs and error dictionaries.
+    """
+    try:
+        decoded = content.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise ValidationError("Import file must be UTF-8 encoded") from e
+
+    if file_format == "csv":
+        reader = csv.DictReader(io.StringIO(decoded))
+        records = ((reader.line_num, csv_to_record(row)) for row in reader)
+    else:
+        records = (
+            (line, raw) for line, raw in enumerate(decoded.splitlines(), 1) if raw
+        )
+
+    rows, errors, seen = [], [], {}
+    for line, record in records:
+        try:
+            if isinstance(record, str):
+                record = json.loads(record)
+            row = MachineImportRow.model_validate(record)
+        except (json.JSONDecodeError, PydanticValidationError) as e:
+            errors.append({"type": "error", "line": line, "error": str(e)})
+            continue
+        key = (row.name, row.localization_id)
+        if key in seen:
+            errors.append(
+                {
+                    "type": "error",
+                    "line": line,
+                    "name": row.name,
+                    "error": f"Duplicate of line {seen[key]}",
+                }
+            )
+            continue
+        seen[key] = line
+        rows.append((line, row))
+    return rows, errors
+
+
+def staging_record(line: int, row: MachineImportRow) -> tuple:
+    """Convert import row to a COPY record of the staging table.
+
+    :param line: Line number in the import file
+    :param row: Validated import row
+    :return: Tuple ordered as STAGING_COLUMNS.
+    """
+    disks = row.disks
+    return (
+        line,
+        *(getattr(row, field) for field in MACHINE_FIELDS),
+        row.cpus,
+        [disk.name for disk in disks] if disks is not None else None,
+        [disk.capacity for disk in disks] if disks is not None else None,
+    )
+
+
+async def import_machines(
+    db: AsyncSession,
+    rows: list[tuple[int, MachineImportRow]],
+    team_ids: Optional[list[int]],
+) -> AsyncIterator[dict]:
+    """Load machines through a staging table and merge them set-based.
+
+    Rows are copied into a temporary table with COPY, validated against rooms,
+    teams, shelves and permissions, matched to existing machines by name and
+    room, and then inserted or updated with a handful of statements.
+    Caller commits the transaction.
+    :param db: Active database session
+    :param rows: Valid (line, row) pairs
+    :param team_ids: Teams the user may manage, None for admins
+    :return: Async iterator of progress, error and summary events.
+    """
+    started = time.perf_counter()
+    await db.execute(text(CREATE_STAGING_SQL))
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        STAGING_TABLE,
+        records=[staging_record(line, row) for line, row in rows],
+        columns=STAGING_COLUMNS,
+    )
+    yield {"type": "progress", "stage": "staged", "rows": len(rows)}
+
+    for statement in VALIDATION_SQL:
+        await db.execute(text(statement))
+    if team_ids is not None:
+        for statement in ACCESS_SQL:
+            await db.execute(text(statement), {"team_ids": team_ids})
+    failed = await db.execute(
+        text(
+            f"SELECT line, name, error FROM {STAGING_TABLE} "
+            "WHERE error IS NOT NULL ORDER BY line"
+        )
+    )
+    failed_count = 0
+    for line, name, error in failed:
+        failed_count += 1
+        yield {"type": "error", "line": line, "name": name, "error": error}
+    yield {"type": "progress", "stage": "validated", "failed": failed_count}
+
+    history_params = {
+        "user_id": db.info.get("user_id", 1),
+        "internal_keys": sorted(INTERNAL_KEYS),
+    }
+    for statement in MERGE_SQL:
+        await db.execute(text(statement), history_params)
+    created, updated = (
+        await db.execute(
+            text(
+                f"SELECT count(*) FILTER (WHERE is_new), "
+                f"count(*) FILTER (WHERE NOT is_new) "
+                f"FROM {STAGING_TABLE} WHERE error IS NULL"
+            )
+        )
+    ).one()
+    mark_cache_tags(db.sync_session, CHANGED_TABLES)
+    yield {
+        "type": "summary",
+        "created": created,
+        "updated": updated,
+        "failed": failed_count,
+        "duration": round(time.perf_counter() - started, 3),
+    }
+
+
+async def machine_import_report(
+    rows: list[tuple[int, MachineImportRow]],
+    parse_errors: list[dict],
+    team_ids: Optional[list[int]],
+    user_id: int,
+) -> AsyncIterator[str]:
+    """Run machine import and report its progress as NDJSON lines.
+
+    Only one import runs at a time. The report always ends with a summary,
+    or with a "failed" event when the import was rolled back.
+    :param rows: Valid (line, row) pairs
+    :param parse_errors: Errors found while parsing the file
+    :param team_ids: Teams the user may manage, None for admins
+    :param user_id: ID of the importing user
+    :return: Async iterator of JSON lines.
+    """
+    yield json.dumps(
+        {"type": "progress", "stage": "parsed", "rows": len(rows) + len(parse_errors)}
+    ) + "\n"
+    for error in parse_errors:
+        yield json.dumps(error) + "\n"
+
+    async with AsyncSessionLocal() as db:
+        db.info["user_id"] = user_id
+        try:
+            async with acquire_lock(
+                MACHINE_IMPORT_LOCK, timeout=MACHINE_IMPORT_LOCK_TIMEOUT
+            ):
+                async for event in import_machines(db, rows, team_ids):
+                    if event["type"] == "summary":
+                        await db.commit()
+                        event["failed"] += len(parse_errors)
+                    yield json.dumps(event, default=str) + "\n"
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Machine import failed: {e}")
+            message = getattr(e, "message", None) or "Import rolled back"
+            yield json.dumps({"type": "failed", "error": message}) + "\n"
+
+
+def machine_export_stmt():
+    """Build query of machines with aggregated CPUs and disks.
+
+    :return: SQLAlchemy select statement.
+    """
+    cpu_names = (
+        select(func.array_agg(aggregate_order_by(CPUs.name, CPUs.id)))
+        .where(CPUs.machine_id == Machines.id)
+        .scalar_subquery()
+    )
+    disk_names = (
+        select(func.array_agg(aggregate_order_by(Disks.name, Disks.id)))
+        .where(Disks.machine_id == Machines.id)
+        .scalar_subquery()
+    )
+    disk_capacities = (
+        select(func.array_agg(aggregate_order_by(Disks.capacity, Disks.id)))
+        .where(Disks.machine_id == Machines.id)
+        .scalar_subquery()
+    )
+    return select(
+        *(getattr(Machines, field) for field in MACHINE_FIELDS),
+        cpu_names,
+        disk_names,
+        disk_capacities,
+    ).order_by(Machines.id)
+
+
+async def export_machines(stmt, file_format: str) -> AsyncIterator[str]:
+    """Stream machines in the import file format from a server-side cursor.
+
+    :param stmt: Machine export statement, already filtered by team
+    :param file_format: "csv" or "ndjson"
+    :return: Async iterator of file chunks.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if file_format == "csv":
+        writer.writerow(CSV_FIELDS)
+
+    stmt = stmt.execution_options(yield_per=MACHINE_EXPORT_BATCH_SIZE)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            for row in partition:
+                record = dict(zip(MACHINE_FIELDS, row))
+                cpus, disk_names, disk_capacities = row[len(MACHINE_FIELDS) :]
+                record["cpus"] = cpus or []
+                record["disks"] = [
+                    {"name": name, "capacity": capacity}
+                    for name, capacity in zip(disk_names or [], disk_capacities or [])
+                ]
+                if file_format == "csv":
+                    writer.writerow(
+                        [
+                            *(record[field] for field in MACHINE_FIELDS),
+                            ";".join(record["cpus"]),
+                            ";".join(
+                                f"{d['name']}:{d['capacity'] or ''}"
+                                for d in record["disks"]
+                            ),
+                        ]
+                    )
+                else:
+                    buffer.write(json.dumps(record) + "\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
@@ -6,8 +6,11 @@ import os
 from typing import List, Optional
 
 import aiofiles
+import aiofiles.os
 import httpx
 from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.exceptions import (
     ExternalServiceError,
@@ -15,10 +18,15 @@ from app.core.exceptions import (
     TargetSaveError,
     ValidationError,
 )
+from app.db.models import Machines, Metadata, Teams
+from app.utils.redis_service import acquire_lock
 
 load_dotenv(".env/api.env")
 PROMETHEUS_URL = os.getenv("PROMETHEUS_URL")
 PROMETHEUS_TARGETS_PATH = os.getenv("PROMETHEUS_TARGETS_PATH")
+PROMETHEUS_TARGETS_FLUSH_INTERVAL = float(
+    os.getenv("PROMETHEUS_TARGETS_FLUSH_INTERVAL", "1")
+)
 
 DEFAULT_QUERIES = {
     "status": "up",
@@ -29,7 +37,8 @@ DEFAULT_QUERIES = {
     '/ node_filesystem_size_bytes{fstype!="tmpfs", mountpoint!="/boot"}',
 }
 
-_targets_lock = asyncio.Lock()
+PROMETHEUS_TARGETS_LOCK = "lock:prometheus_targets"
+NODE_EXPORTER_PORT = 9100
 
 
 async def _request(
@@ -139,38 +148,132 @@ async def load_targets_file():
 async def save_targets_file(targets: List[dict]):
     """Save Prometheus targets to the targets file.
 
+    The content is written to a temporary file next to the targets file and
+    swapped in with os.replace, so Prometheus never reads a half-written file.
     :param targets: List of target dictionaries.
     """
     if not PROMETHEUS_TARGETS_PATH:
         raise TargetSaveError("PROMETHEUS_TARGETS_PATH is not set.")
+    tmp_path = f"{PROMETHEUS_TARGETS_PATH}.{os.getpid()}.tmp"
     try:
-        async with aiofiles.open(
-            PROMETHEUS_TARGETS_PATH, mode="w", encoding="utf-8"
-        ) as file:
+        async with aiofiles.open(tmp_path, mode="w", encoding="utf-8") as file:
             await file.write(json.dumps(targets, indent=2))
+            await file.flush()
+            await asyncio.to_thread(os.fsync, file.fileno())
+        await aiofiles.os.replace(tmp_path, PROMETHEUS_TARGETS_PATH)
     except (OSError, TypeError) as e:
         raise ValidationError(
             "Prometheus targets file is corrupted or unreadable"
         ) from e
 
 
+class TargetRegistry:
+    """Registry of Prometheus file_sd targets with coalesced writes.
+
+    Changes submitted within one flush interval are applied together with a
+    single read-modify-write of the targets file. The file update is guarded by
+    a Redis lock, so API workers in other processes do not overwrite each other.
+    """
+
+    def __init__(self, flush_interval: float):
+        """Initialize fields.
+
+        :param flush_interval: Seconds to wait for more changes before writing
+        """
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._flush_task = None
+
+    async def submit(self, op: str, instance: str, labels: Optional[dict] = None):
+        """Queue a target change and wait until it is written to the file.
+
+        :param op: "add" or "remove"
+        :param instance: Target instance
+        :param labels: Labels of an added target
+        :return: Added entry for "add", None for "remove".
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((op, instance, labels, future))
+        self._schedule_flush()
+        return await future
+
+    def _schedule_flush(self):
+        """Start a delayed flush unless one is already waiting.
+
+        The running flush task itself does not count, as it has already taken
+        its batch of changes.
+        """
+        if (
+            self._flush_task is None
+            or self._flush_task.done()
+            or self._flush_task is asyncio.current_task()
+        ):
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        """Wait for the flush interval, then write all queued changes."""
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        """Apply all queued changes with one locked read and one atomic write.
+
+        Changes submitted while the file is being written are flushed by a
+        newly scheduled task.
+        """
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        results = []
+        try:
+            async with acquire_lock(PROMETHEUS_TARGETS_LOCK):
+                targets = await load_targets_file()
+                changed = False
+                for op, instance, labels, future in pending:
+                    if op == "add":
+                        entry = {"targets": [instance], "labels": labels}
+                        targets.append(entry)
+                        changed = True
+                        results.append((future, entry))
+                        continue
+
+                    kept = [t for t in targets if instance not in t.get("targets", [])]
+                    if len(kept) == len(targets):
+                        error = ObjectNotFoundError("Prometheus target", instance)
+                        results.append((future, error))
+                        continue
+                    targets = kept
+                    changed = True
+                    results.append((future, None))
+
+                if changed:
+                    await save_targets_file(targets)
+        except Exception as e:
+            results = [(future, e) for *_, future in pending]
+
+        for future, result in results:
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        if self._pending:
+            self._schedule_flush()
+
+
+target_registry = TargetRegistry(PROMETHEUS_TARGETS_FLUSH_INTERVAL)
+
+
 async def add_prometheus_target(instance: str, labels: dict):
     """Add a new target to the Prometheus targets file.
 
     :param instance: Target instance to add
     :param labels: Labels for the new target.
     """
-    entry = {"targets": [instance], "labels": labels}
-    async with _targets_lock:
-        targets = await load_targets_file()
-        targets.append(entry)
-        try:
-            await save_targets_file(targets)
-        except TargetSaveError as e:
-            raise ValidationError(
-                "Prometheus targets file is corrupted or unreadable"
-            ) from e
-    return entry
+    return await target_registry.submit("add", instance, labels)
 
 
 async def remove_prometheus_target(instance: str):
@@ -178,16 +281,117 @@ async def remove_prometheus_target(instance: str):
 
     :param instance: Target instance to delete
     """
-    async with _targets_lock:
-        targets = await load_targets_file()
-        new_targets = [t for t in targets if instance not in t.get("targets", [])]
+    await target_registry.submit("remove", instance)
 
-        if len(new_targets) == len(targets):
-            raise ObjectNotFoundError("Prometheus target", instance)
 
-        try:
-            await save_targets_file(new_targets)
-        except TargetSaveError as e:
-            raise ValidationError(
-                "Prometheus targets file maybe corrupted or unreadable"
-            ) from e
+async def get_machine_targets(
+    db: AsyncSession, team_ids: Optional[List[int]] = None
+) -> tuple[dict, set]:
+    """Derive node exporter targets from the Machines and Metadata tables.
+
+    :param db: Active database session
+    :param team_ids: Limit machines to these teams, all machines if None
+    :return: Desired labels keyed by instance and set of all known hostnames.
+    """
+    stmt = (
+        select(Machines.name, Machines.team_id, Teams.name, Metadata.agent_prometheus)
+        .join(Metadata, Machines.metadata_id == Metadata.id)
+        .outerjoin(Teams, Machines.team_id == Teams.id)
+    )
+    if team_ids is not None:
+        stmt = stmt.where(Machines.team_id.in_(team_ids))
+
+    desired = {}
+    hosts = set()
+    for name, team_id, team_name, has_agent in (await db.execute(stmt)).all():
+        hosts.add(name)
+        if not has_agent:
+            continue
+        labels = {"host": name}
+        if team_id:
+            labels["team"] = team_name or f"team_{team_id}"
+        desired[f"{name}:{NODE_EXPORTER_PORT}"] = labels
+    return desired, hosts
+
+
+def get_online_hosts(status_data: Optional[str]) -> set:
+    """Extract hosts reported as up from the cached status snapshot.
+
+    :param status_data: JSON snapshot stored by the status worker
+    :return: Set of hostnames/IPs without exporter port.
+    """
+    if not status_data:
+        return set()
+    return {
+        s["instance"].rsplit(":", maxsplit=1)[0]
+        for s in json.loads(status_data).get("status", [])
+        if s.get("value") == 1.0 and s.get("instance")
+    }
+
+
+def merge_targets(
+    current: List[dict], desired: dict, managed_hosts: set, prune: bool = False
+) -> tuple[List[dict], dict]:
+    """Merge desired targets into the current file_sd content.
+
+    Labels of existing entries are kept and extended with the desired ones.
+    Only node exporter instances of machines are managed, so targets of other
+    hosts and targets added by hand on other ports are never touched.
+    :param current: Current content of the targets file
+    :param desired: Desired labels keyed by instance
+    :param managed_hosts: Hostnames of machines covered by the sync
+    :param prune: Remove node exporter targets of covered machines without
+        Prometheus agent
+    :return: New targets list and lists of added, updated and removed instances.
+    """
+    merged = []
+    seen = set()
+    diff = {"added": [], "updated": [], "removed": []}
+    managed_instances = {f"{host}:{NODE_EXPORTER_PORT}" for host in managed_hosts}
+
+    for entry in current:
+        labels = entry.get("labels", {})
+        kept = []
+        for instance in entry.get("targets", []):
+            if instance in desired:
+                if instance in seen:
+                    continue
+                seen.add(instance)
+                new_labels = {**labels, **desired[instance]}
+                if new_labels != labels:
+                    diff["updated"].append(instance)
+                merged.append({"targets": [instance], "labels": new_labels})
+            elif prune and instance in managed_instances:
+                diff["removed"].append(instance)
+            else:
+                kept.append(instance)
+        if kept:
+            merged.append({"targets": kept, "labels": labels})
+
+    for instance, labels in desired.items():
+        if instance not in seen:
+            diff["added"].append(instance)
+            merged.append({"targets": [instance], "labels": labels})
+
+    return merged, diff
+
+
+async def sync_machine_targets(
+    db: AsyncSession, team_ids: Optional[List[int]] = None, prune: bool = False
+) -> dict:
+    """Synchronize the targets file with machines that run a Prometheus agent.
+
+    The file is written once, and only when the merged content differs.
+    :param db: Active database session
+    :param team_ids: Limit machines to these teams, all machines if None
+    :param prune: Remove targets of covered machines without Prometheus agent
+    :return: Summary of the synchronization.
+    """
+    desired, hosts = await get_machine_targets(db, team_ids)
+    async with acquire_lock(PROMETHEUS_TARGETS_LOCK):
+        current = await load_targets_file()
+        merged, diff = merge_targets(current, desired, hosts, prune)
+        changed = merged != current
+        if changed:
+            await save_targets_file(merged)
+    return {"changed": changed, "total": len(merged), **diff}
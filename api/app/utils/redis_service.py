@@ -3,7 +3,8 @@
 import asyncio
 import logging
 import os
-from contextlib import asynccontextmanager
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
 
 import redis.asyncio as aioredis
 from dotenv import load_dotenv
@@ -15,6 +16,10 @@ logger = logging.getLogger(__name__)
 load_dotenv(".env/api.env")
 REDIS_URL = os.getenv("REDIS_URL")
 COLLECT_TIMEOUT = int(os.getenv("COLLECT_TIMEOUT"))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "10"))
 
 
 # pylint: disable=too-few-public-methods
@@ -24,44 +29,107 @@ class RedisClientManager:
     def __init__(self):
         """Initialize fields."""
         self.client = None
+        self.pool = None
         self._loop = None
 
     async def get_client(self):
-        """Get a singleton Redis client instance."""
-        try:
-            current_loop = asyncio.get_running_loop()
-        except RuntimeError:
-            return await aioredis.from_url(REDIS_URL, decode_responses=True)
+        """Get a singleton Redis client instance.
+
+        The client is bound to an explicitly sized connection pool, which is
+        rebuilt when the running event loop changes. When all connections are
+        in use, callers wait up to REDIS_POOL_TIMEOUT seconds for a free one
+        instead of failing at once.
+        """
+        current_loop = asyncio.get_running_loop()
         if self.client is not None and self._loop is not current_loop:
             self.client = None
+            self.pool = None
             self._loop = None
 
         if self.client is None:
-            self.client = await aioredis.from_url(
-                REDIS_URL, encoding="utf-8", decode_responses=True
+            self.pool = aioredis.BlockingConnectionPool.from_url(
+                REDIS_URL,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                timeout=REDIS_POOL_TIMEOUT,
+                health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+                encoding="utf-8",
+                decode_responses=True,
             )
+            self.client = aioredis.Redis(connection_pool=self.pool)
             self._loop = current_loop
 
         return self.client
 
     async def close(self):
-        """Close the Redis client connection."""
+        """Close the Redis client connection and its pool."""
         if self.client is not None:
             try:
                 current_loop = asyncio.get_running_loop()
                 if self._loop is current_loop:
                     await self.client.aclose()
+                    await self.pool.aclose()
             except Exception:
                 logger.warning("Failed to close redis connection, ignoring.")
             finally:
                 self.client = None
+                self.pool = None
                 self._loop = None
 
+    def pool_stats(self) -> dict:
+        """Describe usage of the current connection pool.
 
-redis_manager = RedisClientManager()
+        :return: Pool size limit and number of open connections.
+        """
+        if self.pool is None:
+            return {"max_connections": REDIS_MAX_CONNECTIONS, "in_use": 0, "idle": 0}
+        # pylint: disable=protected-access
+        return {
+            "max_connections": self.pool.max_connections,
+            "in_use": len(self.pool._in_use_connections),
+            "idle": len(self.pool._available_connections),
+        }
+
+
+class RedisLatencyMetrics:
+    """Per-command latency counters of Redis helpers."""
+
+    def __init__(self):
+        """Initialize fields."""
+        self.commands = {}
+
+    def record(self, command: str, started: float):
+        """Record duration of one Redis round trip.
+
+        :param command: Helper or command name
+        :param started: Value of time.perf_counter() before the call
+        """
+        elapsed = (time.perf_counter() - started) * 1000
+        stats = self.commands.setdefault(
+            command, {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+        stats["count"] += 1
+        stats["total_ms"] += elapsed
+        stats["max_ms"] = max(stats["max_ms"], elapsed)
+
+    def snapshot(self) -> dict:
+        """Return collected counters with average latency.
+
+        :return: Dictionary of command name to latency stats in milliseconds.
+        """
+        return {
+            command: {
+                "count": stats["count"],
+                "avg_ms": round(stats["total_ms"] / stats["count"], 3),
+                "max_ms": round(stats["max_ms"], 3),
+            }
+            for command, stats in self.commands.items()
+        }
 
 
 redis_manager = RedisClientManager()
+redis_metrics = RedisLatencyMetrics()
 
 
 async def get_redis_client():
@@ -80,7 +148,9 @@ async def set_cache(key: str, value: str):
     :param expire: Expiration time in seconds.
     """
     redis_client = await get_redis_client()
+    started = time.perf_counter()
     await redis_client.set(key, value, ex=COLLECT_TIMEOUT)
+    redis_metrics.record("set", started)
 
 
 async def get_cache(key: str):
@@ -90,7 +160,44 @@ async def get_cache(key: str):
     :return: Value from redis cache.
     """
     r = await get_redis_client()
-    return await r.get(key)
+    started = time.perf_counter()
+    value = await r.get(key)
+    redis_metrics.record("get", started)
+    return value
+
+
+async def get_cache_many(*keys: str) -> list:
+    """Get several values from Redis cache in one round trip.
+
+    :param keys: Cache keys
+    :return: Values in the order of keys, None for missing ones.
+    """
+    r = await get_redis_client()
+    started = time.perf_counter()
+    values = await r.mget(keys)
+    redis_metrics.record("mget", started)
+    return values
+
+
+async def redis_health() -> dict:
+    """Check Redis availability and report latency metrics.
+
+    :return: Dictionary with status, ping latency, pool usage and command stats.
+    """
+    started = time.perf_counter()
+    try:
+        r = await get_redis_client()
+        await r.ping()
+        status = "ok"
+    except (RedisError, OSError) as e:
+        logger.warning(f"Redis health check failed: {e}")
+        status = "unavailable"
+    return {
+        "status": status,
+        "ping_ms": round((time.perf_counter() - started) * 1000, 3),
+        "pool": redis_manager.pool_stats(),
+        "commands": redis_metrics.snapshot(),
+    }
 
 
 @asynccontextmanager
@@ -103,7 +210,7 @@ async def acquire_lock(
     :param lock_name: Unique key for the lock, eg. lock:machine:1
     :param timeout: Auto-release time in seconds
     :param wait_timeout: Waiting for lock before dropping
-    :return: None.
+    :return: Held lock, e.g. for keep_lock_alive.
     """
     client = await get_redis_client()
     lock = client.lock(lock_name, timeout=timeout, blocking_timeout=wait_timeout)
@@ -118,7 +225,7 @@ async def acquire_lock(
                 f"is currently locked by another user. "
                 f"Please try again in a moment."
             )
-        yield
+        yield lock
 
     except RedisError as e:
         raise ExternalServiceError(
@@ -131,3 +238,38 @@ async def acquire_lock(
                 await lock.release()
             except RedisError as e:
                 logger.error(f"Failed to release redis lock '{lock_name}': {e}")
+
+
+async def keep_lock_alive(lock, interval: float):
+    """Reset the auto-release time of a held lock until cancelled.
+
+    Meant to run as a task next to work that may outlast the lock timeout.
+    Ends with LockNotOwnedError once the lock expired and was taken over.
+    :param lock: Lock yielded by acquire_lock
+    :param interval: Seconds between extensions, well below the lock timeout
+    :return: None.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        await lock.reacquire()
+
+
+@asynccontextmanager
+async def acquire_locks(
+    lock_names, timeout: int = COLLECT_TIMEOUT, wait_timeout: int = 5
+):
+    """Context manager holding several Redis locks at once.
+
+    Locks are taken in sorted order, so two batches sharing some resources
+    never wait for each other in a cycle.
+    :param lock_names: Iterable of lock keys
+    :param timeout: Auto-release time in seconds
+    :param wait_timeout: Waiting for each lock before dropping
+    :return: None.
+    """
+    async with AsyncExitStack() as stack:
+        for lock_name in sorted(set(lock_names)):
+            await stack.enter_async_context(
+                acquire_lock(lock_name, timeout=timeout, wait_timeout=wait_timeout)
+            )
+        yield
@@ -0,0 +1,105 @@
+"""Rental availability of inventory items over date ranges."""
+
+from datetime import date
+from typing import Iterable
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import ValidationError
+from app.db.models import Inventory, Rentals
+
+
+def reserved_peak_stmt(item_ids: Iterable[int], start_date: date, end_date: date):
+    """Build query for the highest reserved quantity per item within a range.
+
+    Reservations only grow on days some rental starts, so the peak is found by
+    summing overlapping rentals on the range start and on every rental start
+    inside the range. Overlapping rentals are found through the
+    (item_id, end_date, start_date) index.
+    :param item_ids: Inventory item IDs
+    :param start_date: First day of the range
+    :param end_date: Last day of the range
+    :return: SQLAlchemy select of (item_id, reserved) rows.
+    """
+    overlapping = (
+        select(Rentals.item_id, Rentals.start_date, Rentals.end_date, Rentals.quantity)
+        .where(
+            Rentals.item_id.in_(list(item_ids)),
+            Rentals.end_date >= start_date,
+            Rentals.start_date <= end_date,
+        )
+        .cte("overlapping")
+    )
+    checkpoints = (
+        select(
+            overlapping.c.item_id,
+            func.greatest(overlapping.c.start_date, literal(start_date)).label("day"),
+        )
+        .distinct()
+        .cte("checkpoints")
+    )
+    usage = (
+        select(
+            checkpoints.c.item_id,
+            func.sum(overlapping.c.quantity).label("reserved"),
+        )
+        .join(
+            overlapping,
+            (overlapping.c.item_id == checkpoints.c.item_id)
+            & (overlapping.c.start_date <= checkpoints.c.day)
+            & (overlapping.c.end_date >= checkpoints.c.day),
+        )
+        .group_by(checkpoints.c.item_id, checkpoints.c.day)
+        .subquery()
+    )
+    return select(usage.c.item_id, func.max(usage.c.reserved)).group_by(usage.c.item_id)
+
+
+async def get_reserved_quantities(
+    db: AsyncSession, item_ids: Iterable[int], start_date: date, end_date: date
+) -> dict[int, int]:
+    """Get the highest quantity of each item rented on any day of a range.
+
+    :param db: Active database session
+    :param item_ids: Inventory item IDs
+    :param start_date: First day of the range
+    :param end_date: Last day of the range
+    :return: Dictionary of item ID to reserved quantity, items without
+        overlapping rentals are omitted.
+    """
+    if start_date > end_date:
+        raise ValidationError("Start date must not be after end date")
+    item_ids = list(item_ids)
+    if not item_ids:
+        return {}
+    result = await db.execute(reserved_peak_stmt(item_ids, start_date, end_date))
+    return {item_id: int(reserved) for item_id, reserved in result.all()}
+
+
+async def get_availability(
+    db: AsyncSession, items: Iterable[Inventory], start_date: date, end_date: date
+) -> list[dict]:
+    """Get free quantity of items for the whole date range.
+
+    :param db: Active database session
+    :param items: Inventory items
+    :param start_date: First day of the range
+    :param end_date: Last day of the range
+    :return: List of availability dictionaries.
+    """
+    items = list(items)
+    reserved = await get_reserved_quantities(
+        db, [item.id for item in items], start_date, end_date
+    )
+    return [
+        {
+            "item_id": item.id,
+            "total_quantity": item.quantity,
+            "reserved_quantity": reserved.get(item.id, 0),
+            "available_quantity": max(item.quantity - reserved.get(item.id, 0), 0),
+            "start_date": start_date,
+            "end_date": end_date,
+        }
+        for item in items
+    ]
@@ -0,0 +1,192 @@
+"""Benchmark of the history subpage listing on a synthetic history table.
+
+Seeds UPDATE entries of machine-like entities in steps (10k and 100k rows by
+default) and compares the former per-row diff computation with the
+projection of precomputed diffs used by blackboxed_history_stmt.
+
+Run from the api directory against a disposable database:
+    python -m tests.benchmarks.benchmark_history --repeat 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import joinedload
+
+from app.auth.dependencies import RequestContext
+from app.database import AsyncSessionLocal
+from app.db.listeners import history_diff_columns
+from app.db.models import ActionType, EntityType, History, User, UserType
+from app.routers.database_history_router import resolve_entity_name
+from app.routers.subpage_history_router import blackboxed_history_stmt, get_state_diff
+
+MACHINE_STATE = {
+    "localization_id": 1,
+    "mac_address": "aa:bb:cc:dd:ee:ff",
+    "ip_address": "10.0.0.1",
+    "pdu_port": 4,
+    "team_id": 1,
+    "os": "debian",
+    "serial_number": "SN-0000000000",
+    "note": "Synthetic machine used by the history benchmark " * 4,
+    "added_on": "2024-01-01T00:00:00",
+    "ram": "64 GB",
+    "metadata_id": 1,
+    "shelf_id": None,
+}
+
+
+def history_row(index: int, user_id: int) -> dict:
+    """Build one full-snapshot UPDATE entry with its precomputed diff.
+
+    :param index: Sequence number of the entry
+    :param user_id: Author of the entry
+    :return: History row values.
+    """
+    entity_id = 10_000_000 + index % 5000
+    before = {
+        **MACHINE_STATE,
+        "id": entity_id,
+        "name": f"bench-srv-{entity_id}",
+        "version_id": index,
+    }
+    after = {**before, "os": f"debian-{index}", "version_id": index + 1}
+    extra_data = {"os": {"old": before["os"], "new": after["os"]}}
+    return {
+        "entity_type": EntityType.MACHINES,
+        "action": ActionType.UPDATE,
+        "entity_id": entity_id,
+        "user_id": user_id,
+        "before_state": before,
+        "after_state": after,
+        "extra_data": extra_data,
+        "can_rollback": True,
+        **history_diff_columns(before, after, extra_data),
+    }
+
+
+async def seed(db, start: int, stop: int, user_id: int) -> list[int]:
+    """Insert history entries in chunks.
+
+    :param db: Active database session
+    :param start: First sequence number
+    :param stop: Sequence number after the last entry
+    :param user_id: Author of the entries
+    :return: IDs of inserted entries.
+    """
+    ids = []
+    for chunk in range(start, stop, 5000):
+        rows = [history_row(i, user_id) for i in range(chunk, min(chunk + 5000, stop))]
+        ids.extend(
+            (await db.scalars(insert(History).returning(History.id), rows)).all()
+        )
+    await db.commit()
+    return ids
+
+
+async def legacy_listing(ctx: RequestContext, limit: int) -> int:
+    """Run the former listing, computing diffs and names for every row.
+
+    :param ctx: Request context of an admin
+    :param limit: Number of entries
+    :return: Number of entries.
+    """
+    async with AsyncSessionLocal() as db:
+        stmt = (
+            select(History)
+            .join(User, History.user_id == User.id)
+            .options(joinedload(History.user))
+        )
+        stmt = ctx.team_filter(stmt, User)
+        stmt = stmt.order_by(History.timestamp.desc()).limit(limit)
+        logs = (await db.execute(stmt)).unique().scalars().all()
+        results = []
+        for log in logs:
+            clean_before, clean_after = get_state_diff(
+                log.before_state, log.after_state
+            )
+            results.append(
+                (clean_before, clean_after, await resolve_entity_name(log, db))
+            )
+        return len(results)
+
+
+async def projection_listing(ctx: RequestContext, limit: int) -> int:
+    """Run the current listing over precomputed diffs.
+
+    :param ctx: Request context of an admin
+    :param limit: Number of entries
+    :return: Number of entries.
+    """
+    async with AsyncSessionLocal() as db:
+        return len((await db.execute(blackboxed_history_stmt(ctx, limit))).all())
+
+
+async def measure(name: str, func, repeat: int):
+    """Print median and best wall time of a query.
+
+    :param name: Label of the measured variant
+    :param func: Coroutine factory running the query
+    :param repeat: Number of runs
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = await func()
+        timings.append(time.perf_counter() - started)
+    print(
+        f"{name:<36} rows={count:<7} median={statistics.median(timings):.3f}s "
+        f"best={min(timings):.3f}s"
+    )
+
+
+async def main():
+    """Seed history in steps, run both variants and clean up."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Keep seeded rows")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        admin = await db.scalar(
+            select(User).where(User.user_type == UserType.ADMIN).limit(1)
+        )
+        ctx = await RequestContext.for_websocket(admin, db)
+
+    ids, seeded = [], 0
+    try:
+        for rows in sorted(args.rows):
+            async with AsyncSessionLocal() as db:
+                ids.extend(await seed(db, seeded, rows, admin.id))
+            seeded = rows
+            print(f"history rows seeded: {seeded}")
+            for limit in (args.limit, rows):
+                await measure(
+                    f"per-row diffs, limit {limit}",
+                    lambda: legacy_listing(ctx, limit),
+                    args.repeat,
+                )
+                await measure(
+                    f"precomputed diffs, limit {limit}",
+                    lambda: projection_listing(ctx, limit),
+                    args.repeat,
+                )
+    finally:
+        if not args.keep and ids:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    delete(History).where(
+                        History.id.between(min(ids), max(ids)),
+                        History.entity_id >= 10_000_000,
+                    )
+                )
+                await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,207 @@
+"""Benchmark of the rack listing query on a synthetic data center.
+
+Seeds one team with 1k racks, 40 shelves per rack and 20k machines, then
+compares the former joinedload query with racks_overview_stmt.
+
+Run from the api directory against a disposable database:
+    python -m tests.benchmarks.benchmark_racks --repeat 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import joinedload
+
+from app.database import AsyncSessionLocal
+from app.db.models import (
+    Machines,
+    Metadata,
+    Rack,
+    Rooms,
+    Shelf,
+    Tags,
+    TagsRacks,
+    Teams,
+)
+from app.routers.database_rack_router import racks_overview_stmt
+
+
+async def seed(db, racks: int, shelves: int, machines: int, tags: int) -> dict:
+    """Insert a synthetic data center with set-based statements.
+
+    :param db: Active database session
+    :param racks: Number of racks
+    :param shelves: Number of shelves per rack
+    :param machines: Number of machines spread over the shelves
+    :param tags: Number of tags, each rack gets up to three of them
+    :return: IDs needed to query and clean up the data.
+    """
+    prefix = f"bench-{uuid.uuid4().hex[:6]}"
+    team_id = await db.scalar(insert(Teams).values(name=prefix).returning(Teams.id))
+    room_id = await db.scalar(
+        insert(Rooms)
+        .values(name=prefix, room_type="srv", team_id=team_id)
+        .returning(Rooms.id)
+    )
+    meta_id = await db.scalar(insert(Metadata).values().returning(Metadata.id))
+    tag_ids = (
+        await db.scalars(
+            insert(Tags).returning(Tags.id),
+            [{"name": f"{prefix}-{i}", "color": "red"} for i in range(tags)],
+        )
+    ).all()
+    rack_ids = (
+        await db.scalars(
+            insert(Rack).returning(Rack.id, sort_by_parameter_order=True),
+            [
+                {"name": f"{prefix}-rack-{i}", "room_id": room_id, "team_id": team_id}
+                for i in range(racks)
+            ],
+        )
+    ).all()
+    await db.execute(
+        insert(TagsRacks),
+        [
+            {"rack_id": rack_id, "tag_id": tag_ids[(i + j) % len(tag_ids)]}
+            for i, rack_id in enumerate(rack_ids)
+            for j in range(min(3, len(tag_ids)))
+        ],
+    )
+    shelf_ids = (
+        await db.scalars(
+            insert(Shelf).returning(Shelf.id, sort_by_parameter_order=True),
+            [
+                {"name": f"S{order}", "order": order, "rack_id": rack_id}
+                for rack_id in rack_ids
+                for order in range(shelves)
+            ],
+        )
+    ).all()
+    await db.execute(
+        insert(Machines),
+        [
+            {
+                "name": f"{prefix}-srv-{i}",
+                "localization_id": room_id,
+                "team_id": team_id,
+                "metadata_id": meta_id,
+                "shelf_id": shelf_ids[i % len(shelf_ids)],
+                "ip_address": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+            }
+            for i in range(machines)
+        ],
+    )
+    await db.commit()
+    return {
+        "team_id": team_id,
+        "room_id": room_id,
+        "meta_id": meta_id,
+        "tag_ids": tag_ids,
+        "rack_ids": rack_ids,
+    }
+
+
+async def cleanup(db, ids: dict):
+    """Remove seeded rows.
+
+    :param db: Active database session
+    :param ids: IDs returned by seed
+    """
+    await db.execute(delete(Machines).where(Machines.team_id == ids["team_id"]))
+    await db.execute(delete(TagsRacks).where(TagsRacks.rack_id.in_(ids["rack_ids"])))
+    await db.execute(delete(Shelf).where(Shelf.rack_id.in_(ids["rack_ids"])))
+    await db.execute(delete(Rack).where(Rack.team_id == ids["team_id"]))
+    await db.execute(delete(Tags).where(Tags.id.in_(ids["tag_ids"])))
+    await db.execute(delete(Metadata).where(Metadata.id == ids["meta_id"]))
+    await db.execute(delete(Rooms).where(Rooms.id == ids["room_id"]))
+    await db.execute(delete(Teams).where(Teams.id == ids["team_id"]))
+    await db.commit()
+
+
+async def legacy_query(team_id: int) -> int:
+    """Run the former rack listing with chained joinedloads.
+
+    :param team_id: Team owning the seeded racks
+    :return: Number of racks.
+    """
+    async with AsyncSessionLocal() as db:
+        stmt = (
+            select(Rack)
+            .where(Rack.team_id == team_id)
+            .options(
+                joinedload(Rack.room),
+                joinedload(Rack.team),
+                joinedload(Rack.tags),
+                joinedload(Rack.shelves).joinedload(Shelf.machines),
+            )
+        )
+        result = await db.execute(stmt)
+        return len(result.unique().scalars().all())
+
+
+async def overview_query(team_id: int, limit=None) -> int:
+    """Run the current rack listing query.
+
+    :param team_id: Team owning the seeded racks
+    :param limit: Optional page size
+    :return: Number of racks.
+    """
+    async with AsyncSessionLocal() as db:
+        stmt = racks_overview_stmt(team_ids=[team_id])
+        if limit:
+            stmt = stmt.limit(limit)
+        return len((await db.execute(stmt)).all())
+
+
+async def measure(name: str, func, repeat: int):
+    """Print median and best wall time of a query.
+
+    :param name: Label of the measured variant
+    :param func: Coroutine factory running the query
+    :param repeat: Number of runs
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = await func()
+        timings.append(time.perf_counter() - started)
+    print(
+        f"{name:<28} racks={count:<6} median={statistics.median(timings):.3f}s "
+        f"best={min(timings):.3f}s"
+    )
+
+
+async def main():
+    """Seed the data center, run all variants and clean up."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--racks", type=int, default=1000)
+    parser.add_argument("--shelves", type=int, default=40)
+    parser.add_argument("--machines", type=int, default=20000)
+    parser.add_argument("--tags", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Keep seeded rows")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        ids = await seed(db, args.racks, args.shelves, args.machines, args.tags)
+    try:
+        team_id = ids["team_id"]
+        await measure("joinedload (legacy)", lambda: legacy_query(team_id), args.repeat)
+        await measure("selectinload", lambda: overview_query(team_id), args.repeat)
+        await measure(
+            "selectinload, page of 50",
+            lambda: overview_query(team_id, limit=50),
+            args.repeat,
+        )
+    finally:
+        if not args.keep:
+            async with AsyncSessionLocal() as db:
+                await cleanup(db, ids)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -75,6 +75,7 @@ async def refresh_redis_client(monkeypatch):
     :return: New redis client connection
     """
     redis_manager.client = None
+    redis_manager.pool = None
     redis_manager._loop = None
 
     yield redis_manager
@@ -85,6 +86,7 @@ async def refresh_redis_client(monkeypatch):
 def mock_ansible_success(monkeypatch):
     """Mock ansible runner to always return success.
 
+    Reports put in ``mock_run.reports`` are emitted as scan playbook events.
     :param monkeypatch: Monkey patching fixture
     :return: Ansible runner mock
     """
@@ -92,7 +94,29 @@ def mock_ansible_success(monkeypatch):
     mock_result = MagicMock()
     mock_result.rc = 0
     mock_result.status = "successful"
-    mock_run.return_value = mock_result
+    mock_run.reports = {}
+
+    def _run(**kwargs):
+        """Emit a platform_info event for every host with a registered report."""
+        handler = kwargs.get("event_handler")
+        for host in kwargs.get("inventory", {}).get("all", {}).get("hosts", {}):
+            if handler and host in mock_run.reports:
+                handler(
+                    {
+                        "event": "runner_on_ok",
+                        "event_data": {
+                            "host": host,
+                            "res": {
+                                "ansible_facts": {
+                                    "platform_info": mock_run.reports[host]
+                                }
+                            },
+                        },
+                    }
+                )
+        return mock_result
+
+    mock_run.side_effect = _run
 
     monkeypatch.setattr("app.utils.ansible_service.ansible_runner.run", mock_run)
     return mock_run
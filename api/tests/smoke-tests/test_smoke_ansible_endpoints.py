@@ -1,14 +1,17 @@
 """Ansible tests verify ansible logic."""
 
-import json
-import os
+import uuid
+from datetime import date, timedelta
 
 import pytest
 from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
 from app.db.models import Machines, Metadata, Rooms
-from app.utils.ansible_service import REPORTS_DIR
+from app.utils.hardware_refresh_service import (
+    get_stale_machine_ids,
+    refresh_stale_machines,
+)
 
 pytestmark = [
     pytest.mark.smoke,
@@ -18,17 +21,20 @@ pytestmark = [
 ]
 
 
-def helper_write_report(
-    hostname: str, os_name: str = "Ubuntu 22.04", cpu_name: str = "Intel Test"
+def helper_register_report(
+    ansible_mock,
+    hostname: str,
+    os_name: str = "Ubuntu 22.04",
+    cpu_name: str = "Intel Test",
 ):
-    """Creates a fake JSON report file on the disk to simulate Ansible output.
+    """Registers a fake platform report to simulate Ansible scan output.
 
+    :param ansible_mock: Mocked ansible runner from mock_ansible_success.
     :param hostname: The IP or hostname of the machine.
     :param os_name: OS name to put in the report.
     :param cpu_name: CPU name to put in the report.
     """
-    os.makedirs(REPORTS_DIR, exist_ok=True)
-    report_data = {
+    ansible_mock.reports[hostname] = {
         hostname: {
             "distribution": {
                 "name": os_name.split()[0],
@@ -41,9 +47,6 @@ def helper_write_report(
             "metadata": {"has_agent": True},
         }
     }
-    path = os.path.join(REPORTS_DIR, f"{hostname}-platform-info.json")
-    with open(path, "w") as f:
-        json.dump(report_data, f)
 
 
 @pytest.mark.database
@@ -55,7 +58,7 @@ async def test_discovery_flow(
     and confirms their existence directly via DB session.
     """
     test_ip = "127.0.0.1"
-    helper_write_report(test_ip)
+    helper_register_report(mock_ansible_success, test_ip)
 
     payload = {"hosts": [test_ip], "extra_vars": {"ansible_user": "test"}}
 
@@ -80,6 +83,54 @@ async def test_discovery_flow(
     assert "Intel Test" in machine.cpus[0].name
 
 
+@pytest.mark.database
+async def test_discovery_bulk_mixed_hosts(
+    test_client, db_session, service_header, mock_ansible_success
+):
+    """Verifies that one discovery call updates known hosts and creates new ones.
+
+    Hosts without a report are reported as errors without failing the batch.
+    Hosts get a random /24 subnet per run, so the new host is created on
+    every rerun.
+    """
+    subnet = uuid.uuid4().int % 2**16
+    known_ip, new_ip, missing_ip = (
+        f"10.{subnet >> 8}.{subnet & 255}.{host}" for host in (1, 2, 3)
+    )
+    helper_register_report(mock_ansible_success, known_ip, cpu_name="Old CPU")
+    payload = {"hosts": [known_ip], "extra_vars": {"ansible_user": "test"}}
+    await test_client.post("/ansible/discovery", json=payload, headers=service_header)
+
+    helper_register_report(
+        mock_ansible_success, known_ip, os_name="Debian 12", cpu_name="New CPU"
+    )
+    helper_register_report(mock_ansible_success, new_ip)
+    payload = {
+        "hosts": [known_ip, new_ip, missing_ip, new_ip],
+        "extra_vars": {"ansible_user": "test"},
+    }
+    response = await test_client.post(
+        "/ansible/discovery", json=payload, headers=service_header
+    )
+
+    assert response.status_code == 200
+    summary = {s["host"]: s["status"] for s in response.json()["summary"]}
+    assert summary == {known_ip: "updated", new_ip: "created", missing_ip: "error"}
+
+    stmt = (
+        select(Machines)
+        .options(joinedload(Machines.cpus), joinedload(Machines.machine_metadata))
+        .where(Machines.name.in_([known_ip, new_ip]))
+    )
+    machines = {
+        m.name: m for m in (await db_session.execute(stmt)).unique().scalars().all()
+    }
+    assert machines[known_ip].os == "Debian 12"
+    assert [c.name for c in machines[known_ip].cpus] == ["New CPU (4 cores)"]
+    assert machines[known_ip].machine_metadata.agent_prometheus is True
+    assert machines[new_ip].machine_metadata.ansible_access is True
+
+
 @pytest.mark.database
 async def test_refresh_flow(
     test_client, db_session, service_header, mock_ansible_success
@@ -94,7 +145,9 @@ async def test_refresh_flow(
     original_os = "Ubuntu 22.04"
     cpu_name = "AMD Ryzen"
 
-    helper_write_report(test_ip, os_name=original_os, cpu_name=cpu_name)
+    helper_register_report(
+        mock_ansible_success, test_ip, os_name=original_os, cpu_name=cpu_name
+    )
     discovery_payload = {"hosts": [test_ip], "extra_vars": {"ansible_user": "test"}}
     await test_client.post(
         "/ansible/discovery", json=discovery_payload, headers=service_header
@@ -140,6 +193,119 @@ async def test_refresh_flow(
     assert updated_machine.cpus[0].name == f"{cpu_name} (4 cores)"
 
 
+@pytest.mark.database
+async def test_refresh_takes_reported_hostname(
+    test_client, db_session, service_header, mock_ansible_success
+):
+    """Tests that refresh renames the machine to the hostname in its report."""
+    subnet = uuid.uuid4().int % 2**16
+    test_ip = f"10.{subnet >> 8}.{subnet & 255}.10"
+    helper_register_report(mock_ansible_success, test_ip)
+    payload = {"hosts": [test_ip], "extra_vars": {"ansible_user": "test"}}
+    await test_client.post("/ansible/discovery", json=payload, headers=service_header)
+    machine_id = await db_session.scalar(
+        select(Machines.id).where(Machines.name == test_ip)
+    )
+
+    new_name = f"host-{uuid.uuid4().hex[:8]}"
+    report = mock_ansible_success.reports[test_ip]
+    report[new_name] = report.pop(test_ip)
+    response = await test_client.post(
+        f"/ansible/machine/{machine_id}/refresh",
+        json={"host": test_ip, "extra_vars": {"ansible_user": "test"}},
+        headers=service_header,
+    )
+
+    assert response.status_code == 200
+    db_session.expire_all()
+    machine = await db_session.get(Machines, machine_id)
+    assert machine.name == new_name
+
+
+@pytest.mark.database
+async def test_scheduled_refresh_of_stale_machines(
+    test_client, db_session, service_header, mock_ansible_success
+):
+    """Tests that the scheduled refresh updates only machines with outdated data.
+
+    Progress with per-batch timing is exposed through the status endpoint.
+    """
+    stale_ip, fresh_ip = "10.30.0.1", "10.30.0.2"
+    for ip in (stale_ip, fresh_ip):
+        helper_register_report(mock_ansible_success, ip, os_name="Ubuntu 20.04")
+    payload = {"hosts": [stale_ip, fresh_ip], "extra_vars": {"ansible_user": "test"}}
+    await test_client.post("/ansible/discovery", json=payload, headers=service_header)
+
+    stmt = (
+        select(Machines)
+        .options(joinedload(Machines.machine_metadata))
+        .where(Machines.name == stale_ip)
+    )
+    stale = (await db_session.execute(stmt)).unique().scalar_one()
+    stale.machine_metadata.last_update = date.today() - timedelta(days=30)
+    await db_session.commit()
+
+    for ip in (stale_ip, fresh_ip):
+        helper_register_report(mock_ansible_success, ip, os_name="Ubuntu 24.04")
+    progress = await refresh_stale_machines(batch_size=5, batch_delay=0)
+
+    assert progress["state"] == "idle"
+    assert progress["refreshed"] >= 1
+    assert all("duration" in batch for batch in progress["batches"])
+
+    db_session.expire_all()
+    machines = {
+        m.name: m
+        for m in (
+            await db_session.execute(
+                select(Machines).where(Machines.name.in_([stale_ip, fresh_ip]))
+            )
+        ).scalars()
+    }
+    assert machines[stale_ip].os == "Ubuntu 24.04"
+    assert machines[fresh_ip].os == "Ubuntu 20.04"
+
+    response = await test_client.get("/ansible/refresh/status", headers=service_header)
+    assert response.status_code == 200
+    assert response.json()["finished_at"] == progress["finished_at"]
+
+
+async def test_scheduled_refresh_backs_off_failed_machines(
+    test_client, db_session, service_header, mock_ansible_success
+):
+    """Tests that unreachable machines are not retried until the backoff passes.
+
+    Without a recorded attempt they would stay first in line on every run.
+    """
+    failed_ip, healthy_ip = "10.30.1.1", "10.30.1.2"
+    for ip in (failed_ip, healthy_ip):
+        helper_register_report(mock_ansible_success, ip)
+    payload = {"hosts": [failed_ip, healthy_ip], "extra_vars": {"ansible_user": "t"}}
+    await test_client.post("/ansible/discovery", json=payload, headers=service_header)
+
+    stmt = (
+        select(Machines)
+        .options(joinedload(Machines.machine_metadata))
+        .where(Machines.name.in_([failed_ip, healthy_ip]))
+    )
+    machines = {m.name: m for m in (await db_session.execute(stmt)).unique().scalars()}
+    for machine in machines.values():
+        machine.machine_metadata.last_update = date.today() - timedelta(days=30)
+    await db_session.commit()
+    failed_id = machines[failed_ip].id
+    failed_metadata_id = machines[failed_ip].metadata_id
+
+    del mock_ansible_success.reports[failed_ip]
+    await refresh_stale_machines(batch_size=5, batch_delay=0)
+
+    db_session.expire_all()
+    metadata = await db_session.get(Metadata, failed_metadata_id)
+    assert metadata.last_update == date.today() - timedelta(days=30)
+    assert metadata.last_refresh_attempt is not None
+    assert failed_id not in await get_stale_machine_ids(7)
+    assert failed_id in await get_stale_machine_ids(7, retry_hours=0)
+
+
 async def test_create_user_simple(test_client, mock_ansible_success, service_header):
     """Tests the basic execution of the user creation endpoint."""
     payload = {
@@ -5,7 +5,10 @@ import uuid
 
 import pytest
 from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 
+from app.database import AsyncSessionLocal
 from app.db.models import Inventory, Machines, Rentals
 
 pytestmark = [
@@ -108,3 +111,152 @@ async def test_rental_race_condition_async(test_client, db_session, service_head
 
     assert 201 in status_codes, "First rental should succeed!"
     assert 409 in status_codes, "Second rental should fail with 409 Conflict!"
+
+
+async def test_optimistic_update_with_if_match(test_client, service_header):
+    """Test lock-free updates guarded by If-Match.
+
+    Two clients read the same category version and both try to update it.
+    The first write wins, the second one gets 409 instead of overwriting it.
+    """
+    ac = test_client
+    cat_resp = await ac.post(
+        "/db/categories", json={"name": unique_str("Opt")}, headers=service_header
+    )
+    cat_id = cat_resp.json()["id"]
+
+    get_resp = await ac.get(f"/db/categories/{cat_id}", headers=service_header)
+    etag = get_resp.headers["ETag"]
+    assert etag == '"1"'
+
+    first = await ac.patch(
+        f"/db/categories/{cat_id}",
+        json={"name": unique_str("OptA")},
+        headers={**service_header, "If-Match": etag},
+    )
+    assert first.status_code == 200
+    assert first.headers["ETag"] == '"2"'
+
+    second = await ac.patch(
+        f"/db/categories/{cat_id}",
+        json={"name": unique_str("OptB")},
+        headers={**service_header, "If-Match": etag},
+    )
+    assert second.status_code == 409
+    assert second.json()["code"] == "VERSION_CONFLICT"
+
+    stale_delete = await ac.delete(
+        f"/db/categories/{cat_id}", headers={**service_header, "If-Match": etag}
+    )
+    assert stale_delete.status_code == 409
+
+    delete_resp = await ac.delete(
+        f"/db/categories/{cat_id}",
+        headers={**service_header, "If-Match": first.headers["ETag"]},
+    )
+    assert delete_resp.status_code == 204
+
+
+@pytest.mark.database
+async def test_cpu_writes_wait_for_machine_row_lock(test_client, service_header):
+    """Test that single and bulk CPU writes take the same machine row lock.
+
+    While another transaction holds the machine row, both writes wait and
+    finish once it commits.
+    """
+    ac = test_client
+    headers = service_header
+    team_id = (
+        await ac.post("/db/teams", json={"name": unique_str("Lock")}, headers=headers)
+    ).json()["id"]
+    room_id = (
+        await ac.post(
+            "/db/rooms",
+            json={
+                "name": unique_str("LockRoom"),
+                "room_type": "srv",
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+    ).json()["id"]
+    meta_id = (
+        await ac.post(
+            "/db/metadata",
+            json={"agent_prometheus": False, "ansible_access": False},
+            headers=headers,
+        )
+    ).json()["id"]
+    machine_id = (
+        await ac.post(
+            "/db/machines/",
+            json={
+                "name": unique_str("lock-srv"),
+                "localization_id": room_id,
+                "metadata_id": meta_id,
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+    ).json()["id"]
+    cpus = await ac.post(
+        "/db/cpus/bulk",
+        json=[{"name": "Xeon", "machine_id": machine_id}],
+        headers=headers,
+    )
+    cpu_id = cpus.json()[0]["id"]
+
+    async with AsyncSessionLocal() as holder:
+        await holder.execute(
+            select(Machines.id).where(Machines.id == machine_id).with_for_update()
+        )
+        single = asyncio.create_task(
+            ac.patch(
+                f"/db/cpus/{cpu_id}",
+                json={"id": cpu_id, "name": "EPYC"},
+                headers=headers,
+            )
+        )
+        bulk = asyncio.create_task(
+            ac.patch(
+                "/db/cpus/bulk",
+                json=[{"id": cpu_id, "name": "Opteron"}],
+                headers=headers,
+            )
+        )
+        await asyncio.sleep(0.3)
+        assert not single.done()
+        assert not bulk.done()
+        await holder.commit()
+
+    assert (await single).status_code == 200
+    assert (await bulk).status_code == 200
+
+
+@pytest.mark.parametrize("entity", ["categories", "tags"])
+async def test_stale_commit_returns_version_conflict(
+    test_client, service_header, monkeypatch, entity
+):
+    """Test that a write losing the version race at commit returns 409.
+
+    Routers do not map StaleDataError themselves, the global handler does.
+    """
+    ac = test_client
+    created = await ac.post(
+        f"/db/{entity}",
+        json={"name": unique_str("Stale"), "color": "red"},
+        headers=service_header,
+    )
+    entity_id = created.json()["id"]
+
+    async def stale_commit(self):
+        raise StaleDataError("version_id does not match")
+
+    monkeypatch.setattr(AsyncSession, "commit", stale_commit)
+    response = await ac.patch(
+        f"/db/{entity}/{entity_id}",
+        json={"name": unique_str("Stale")},
+        headers=service_header,
+    )
+    assert response.status_code == 409
+    assert response.json()["code"] == "VERSION_CONFLICT"
@@ -1,12 +1,18 @@
 """API Smoke Tests. Verifies that HTTP endpoints are reachable, accept valid JSON."""
 
+import asyncio
+import json
 import uuid
+from datetime import date, timedelta
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import null, select, update
 
-from app.db import models
+from app.db import listeners, models
 from app.main import app
+from app.utils.cache_service import get_tag_versions, invalidate
+from app.utils.database_service import backfill_history_diffs
+from app.utils.redis_service import set_cache
 
 pytestmark = [
     pytest.mark.smoke,
@@ -265,3 +271,1115 @@ async def test_machine_full_lifecycle(db_session):
 
     assert history is not None, "History listener did not record CREATE action."
     assert history.user_id is not None
+
+
+async def test_room_details_conditional_get(test_client, service_header):
+    """Test weak ETag and If-None-Match on room details.
+
+    Unchanged data returns 304, any change in involved tables returns 200.
+    """
+    ac = test_client
+    headers = service_header
+
+    team_res = await ac.post(
+        "/db/teams", json={"name": unique_str("ETag_Team")}, headers=headers
+    )
+    team_id = team_res.json()["id"]
+    room_res = await ac.post(
+        "/db/rooms",
+        json={"name": unique_str("ETag_Room"), "room_type": "srv", "team_id": team_id},
+        headers=headers,
+    )
+    room_id = room_res.json()["id"]
+
+    first = await ac.get(f"/db/rooms/{room_id}/details", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    cached = await ac.get(
+        f"/db/rooms/{room_id}/details", headers={**headers, "If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+    rack_res = await ac.post(
+        "/db/racks",
+        json={"name": unique_str("ETag_Rack"), "room_id": room_id, "team_id": team_id},
+        headers=headers,
+    )
+    assert rack_res.status_code == 201
+
+    changed = await ac.get(
+        f"/db/rooms/{room_id}/details", headers={**headers, "If-None-Match": etag}
+    )
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json()["racks"]) == 1
+
+
+async def test_racks_conditional_get_tag_links(test_client, service_header):
+    """Test racks listing ETag changes when only a rack tag link changes."""
+    ac = test_client
+    headers = service_header
+    team_id = (
+        await ac.post(
+            "/db/teams", json={"name": unique_str("ETag_R_Team")}, headers=headers
+        )
+    ).json()["id"]
+    room_id = (
+        await ac.post(
+            "/db/rooms",
+            json={
+                "name": unique_str("ETag_R_Room"),
+                "room_type": "srv",
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+    ).json()["id"]
+    rack_id = (
+        await ac.post(
+            "/db/racks",
+            json={
+                "name": unique_str("ETag_R_Rack"),
+                "room_id": room_id,
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+    ).json()["id"]
+    tag_id = (
+        await ac.post(
+            "/db/tags",
+            json={"name": unique_str("ETAG"), "color": "red"},
+            headers=headers,
+        )
+    ).json()["id"]
+
+    etag = (await ac.get("/db/racks", headers=headers)).headers["ETag"]
+    cached = await ac.get("/db/racks", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    assigned = await ac.post(
+        "/db/tags/bulk/assign",
+        json={
+            "tag_ids": [tag_id],
+            "entities": [{"entity_id": rack_id, "entity_type": "rack"}],
+        },
+        headers=headers,
+    )
+    assert assigned.json()["assigned"] == 1
+    changed = await ac.get("/db/racks", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    rack = next(rack for rack in changed.json() if rack["id"] == rack_id)
+    assert [tag["id"] for tag in rack["tags"]] == [tag_id]
+
+
+async def test_machine_detail_conditional_get(test_client, service_header):
+    """Test machine details ETag covers only rows of the machine.
+
+    Live stats are not part of the conditional representation, changes of
+    other machines keep the ETag and CPU changes of the machine replace it.
+    """
+    ac = test_client
+    headers = service_header
+    team_id = (
+        await ac.post(
+            "/db/teams", json={"name": unique_str("ETag_M_Team")}, headers=headers
+        )
+    ).json()["id"]
+    room_id = (
+        await ac.post(
+            "/db/rooms",
+            json={
+                "name": unique_str("ETag_M_Room"),
+                "room_type": "srv",
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+    ).json()["id"]
+    machine_ids = []
+    for prefix in ("etag-srv", "etag-other"):
+        meta_id = (
+            await ac.post(
+                "/db/metadata", json={"agent_prometheus": False}, headers=headers
+            )
+        ).json()["id"]
+        machine_res = await ac.post(
+            "/db/machines/",
+            json={
+                "name": unique_str(prefix),
+                "localization_id": room_id,
+                "metadata_id": meta_id,
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+        assert machine_res.status_code == 201
+        machine_ids.append(machine_res.json()["id"])
+    machine_id, other_id = machine_ids
+    url = f"/db/machines/{machine_id}/full"
+
+    live = await ac.get(url, headers=headers)
+    assert live.status_code == 200
+    assert "ETag" not in live.headers
+
+    first = await ac.get(url, params={"live": "false"}, headers=headers)
+    assert first.status_code == 200
+    assert first.json()["network_status"] == "Unknown"
+    etag = first.headers["ETag"]
+
+    await ac.patch(f"/db/machines/{other_id}", json={"os": "Arch"}, headers=headers)
+    cached = await ac.get(
+        url, params={"live": "false"}, headers={**headers, "If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+
+    cpu_res = await ac.post(
+        "/db/cpus/bulk",
+        json=[{"name": "ETag CPU", "machine_id": machine_id}],
+        headers=headers,
+    )
+    assert cpu_res.status_code == 201
+    changed = await ac.get(
+        url, params={"live": "false"}, headers={**headers, "If-None-Match": etag}
+    )
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [cpu["name"] for cpu in changed.json()["cpus"]] == ["ETag CPU"]
+
+
+async def test_racks_pagination(test_client, service_header):
+    """Test paginated rack listing with total count header."""
+    ac = test_client
+    team_res = await ac.post(
+        "/db/teams", json={"name": unique_str("Page_Team")}, headers=service_header
+    )
+    team_id = team_res.json()["id"]
+    room_res = await ac.post(
+        "/db/rooms",
+        json={"name": unique_str("Page_Room"), "room_type": "srv", "team_id": team_id},
+        headers=service_header,
+    )
+    room_id = room_res.json()["id"]
+    for _ in range(3):
+        await ac.post(
+            "/db/racks",
+            json={
+                "name": unique_str("Page_Rack"),
+                "room_id": room_id,
+                "team_id": team_id,
+            },
+            headers=service_header,
+        )
+
+    first_page = await ac.get(
+        "/db/racks",
+        params={"room_ids": room_id, "limit": 2},
+        headers=service_header,
+    )
+    assert first_page.status_code == 200
+    assert first_page.headers["X-Total-Count"] == "3"
+    assert len(first_page.json()) == 2
+
+    second_page = await ac.get(
+        "/db/racks",
+        params={"room_ids": room_id, "limit": 2, "offset": 2},
+        headers=service_header,
+    )
+    assert len(second_page.json()) == 1
+    assert second_page.json()[0]["room_name"] is not None
+
+
+async def test_cached_rack_reads_follow_writes(
+    test_client, service_header, monkeypatch
+):
+    """Test that cached rack listing and room details show a write at once.
+
+    Tag bumps are slowed down, so the test fails unless responses wait for
+    the invalidations started by their commits.
+    """
+
+    async def slow_invalidate(*tags):
+        await asyncio.sleep(0.2)
+        await invalidate(*tags)
+
+    monkeypatch.setattr(listeners, "invalidate", slow_invalidate)
+    ac = test_client
+    team_res = await ac.post(
+        "/db/teams", json={"name": unique_str("Cache_Team")}, headers=service_header
+    )
+    team_id = team_res.json()["id"]
+    room_res = await ac.post(
+        "/db/rooms",
+        json={"name": unique_str("Cache_Room"), "room_type": "srv", "team_id": team_id},
+        headers=service_header,
+    )
+    room_id = room_res.json()["id"]
+    rack_res = await ac.post(
+        "/db/racks",
+        json={"name": unique_str("Cache_Rack"), "room_id": room_id, "team_id": team_id},
+        headers=service_header,
+    )
+    rack_id = rack_res.json()["id"]
+
+    listing = await ac.get(
+        "/db/racks", params={"room_ids": room_id}, headers=service_header
+    )
+    details = await ac.get(f"/db/rooms/{room_id}/details", headers=service_header)
+    assert [rack["id"] for rack in listing.json()] == [rack_id]
+    assert [rack["id"] for rack in details.json()["racks"]] == [rack_id]
+
+    renamed = unique_str("Cache_Rack_Renamed")
+    patch_res = await ac.patch(
+        f"/db/racks/{rack_id}", json={"name": renamed}, headers=service_header
+    )
+    assert patch_res.status_code == 200
+
+    listing = await ac.get(
+        "/db/racks", params={"room_ids": room_id}, headers=service_header
+    )
+    details = await ac.get(f"/db/rooms/{room_id}/details", headers=service_header)
+    assert [rack["name"] for rack in listing.json()] == [renamed]
+    assert [rack["name"] for rack in details.json()["racks"]] == [renamed]
+
+
+async def test_rooms_dashboard_counts(test_client, service_header):
+    """Test rack, machine and online counts of the rooms dashboard."""
+    ac = test_client
+    headers = service_header
+    team_res = await ac.post(
+        "/db/teams", json={"name": unique_str("Dash_Team")}, headers=headers
+    )
+    team_id = team_res.json()["id"]
+    room_res = await ac.post(
+        "/db/rooms",
+        json={"name": unique_str("Dash_Room"), "room_type": "srv", "team_id": team_id},
+        headers=headers,
+    )
+    room_id = room_res.json()["id"]
+    await ac.post(
+        "/db/racks",
+        json={"name": unique_str("Dash_Rack"), "room_id": room_id, "team_id": team_id},
+        headers=headers,
+    )
+    meta_res = await ac.post(
+        "/db/metadata",
+        json={"agent_prometheus": True, "ansible_access": False},
+        headers=headers,
+    )
+    hostnames = [unique_str("dash-srv") for _ in range(2)]
+    for hostname in hostnames:
+        machine_res = await ac.post(
+            "/db/machines/",
+            json={
+                "name": hostname,
+                "localization_id": room_id,
+                "metadata_id": meta_res.json()["id"],
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+        assert machine_res.status_code == 201
+
+    await set_cache(
+        "prometheus_metrics_cache",
+        json.dumps(
+            {
+                "status": [
+                    {"instance": f"{hostnames[0]}:9100", "value": 1.0},
+                    {"instance": f"{hostnames[1]}:9100", "value": 0.0},
+                ]
+            }
+        ),
+    )
+    response = await ac.get("/db/rooms/dashboard", headers=headers)
+    assert response.status_code == 200
+    room = next(r for r in response.json() if r["id"] == room_id)
+    assert room["rack_count"] == 1
+    assert room["machine_count"] == 2
+    assert room["online_count"] == 1
+
+
+async def test_room_details_stream(test_client, service_header):
+    """Test NDJSON room details stream emits room header and one line per rack."""
+    ac = test_client
+    headers = service_header
+    team_res = await ac.post(
+        "/db/teams", json={"name": unique_str("Stream_Team")}, headers=headers
+    )
+    team_id = team_res.json()["id"]
+    room_res = await ac.post(
+        "/db/rooms",
+        json={
+            "name": unique_str("Stream_Room"),
+            "room_type": "srv",
+            "team_id": team_id,
+        },
+        headers=headers,
+    )
+    room_id = room_res.json()["id"]
+    for _ in range(3):
+        await ac.post(
+            "/db/racks",
+            json={
+                "name": unique_str("Stream_Rack"),
+                "room_id": room_id,
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+
+    response = await ac.get(f"/db/rooms/{room_id}/details/stream", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["type"] == "room"
+    assert lines[0]["id"] == room_id
+    racks = lines[1:]
+    assert len(racks) == 3
+    assert all(rack["type"] == "rack" and rack["machines"] == [] for rack in racks)
+
+    details = await ac.get(f"/db/rooms/{room_id}/details", headers=headers)
+    assert {r["id"] for r in details.json()["racks"]} == {r["id"] for r in racks}
+
+    missing = await ac.get("/db/rooms/999999999/details/stream", headers=headers)
+    assert missing.status_code == 404
+
+
+async def test_team_full_detail_machine_placement(test_client, service_header):
+    """Test placed machines come ordered by shelf and unplaced ones follow."""
+    ac = test_client
+    headers = service_header
+    team_res = await ac.post(
+        "/db/teams", json={"name": unique_str("Detail_Team")}, headers=headers
+    )
+    team_id = team_res.json()["id"]
+    room_res = await ac.post(
+        "/db/rooms",
+        json={
+            "name": unique_str("Detail_Room"),
+            "room_type": "srv",
+            "team_id": team_id,
+        },
+        headers=headers,
+    )
+    room_id = room_res.json()["id"]
+    rack_res = await ac.post(
+        "/db/racks",
+        json={
+            "name": unique_str("Detail_Rack"),
+            "room_id": room_id,
+            "team_id": team_id,
+        },
+        headers=headers,
+    )
+    rack_id = rack_res.json()["id"]
+    shelf_ids = {}
+    for order in (2, 1):
+        shelf_res = await ac.post(
+            f"/db/shelf/{rack_id}",
+            json={"name": f"S{order}", "order": order},
+            headers=headers,
+        )
+        assert shelf_res.status_code == 201
+        shelf_ids[order] = shelf_res.json()["id"]
+    meta_res = await ac.post(
+        "/db/metadata",
+        json={"agent_prometheus": False, "ansible_access": False},
+        headers=headers,
+    )
+
+    machine_ids = {}
+    for label, shelf_id in (
+        ("top", shelf_ids[2]),
+        ("low", shelf_ids[1]),
+        ("free", None),
+    ):
+        machine_res = await ac.post(
+            "/db/machines/",
+            json={
+                "name": unique_str(f"detail-{label}"),
+                "localization_id": room_id,
+                "metadata_id": meta_res.json()["id"],
+                "team_id": team_id,
+                "shelf_id": shelf_id,
+            },
+            headers=headers,
+        )
+        assert machine_res.status_code == 201
+        machine_ids[label] = machine_res.json()["id"]
+
+    tag_res = await ac.post(
+        "/db/tags",
+        json={"name": unique_str("DETAIL"), "color": "blue"},
+        headers=headers,
+    )
+    await ac.post(
+        "/db/tags/assign",
+        json={
+            "tag_ids": [tag_res.json()["id"]],
+            "entity_id": machine_ids["free"],
+            "entity_type": "machine",
+        },
+        headers=headers,
+    )
+
+    response = await ac.get(f"/db/teams/team_info/{team_id}", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert [m["id"] for m in data["machines"]] == [
+        machine_ids["low"],
+        machine_ids["top"],
+        machine_ids["free"],
+    ]
+    assert [m["shelf_order"] for m in data["machines"]] == [1, 2, 0]
+    assert data["machines"][2]["rack_name"] == "Unplaced"
+    assert data["machines"][2]["tags"][0]["color"] == "blue"
+    assert data["racks"][0]["machines_count"] == 2
+
+
+async def test_inventory_details_active_rentals(test_client, service_header):
+    """Test inventory details count only rentals that did not end yet."""
+    ac = test_client
+    headers = service_header
+    team_res = await ac.post(
+        "/db/teams", json={"name": unique_str("Inv_Team")}, headers=headers
+    )
+    team_id = team_res.json()["id"]
+    room_res = await ac.post(
+        "/db/rooms",
+        json={"name": unique_str("Inv_Room"), "room_type": "srv", "team_id": team_id},
+        headers=headers,
+    )
+    cat_res = await ac.post(
+        "/db/categories", json={"name": unique_str("Inv_Cat")}, headers=headers
+    )
+    item_res = await ac.post(
+        "/db/inventory/",
+        json={
+            "name": unique_str("Cable"),
+            "quantity": 5,
+            "category_id": cat_res.json()["id"],
+            "localization_id": room_res.json()["id"],
+            "team_id": team_id,
+        },
+        headers=headers,
+    )
+    item_id = item_res.json()["id"]
+
+    today = date.today()
+    for start, end in (
+        (today - timedelta(days=10), today - timedelta(days=5)),
+        (today, today + timedelta(days=3)),
+    ):
+        rental_res = await ac.post(
+            "/db/rentals",
+            json={
+                "item_id": item_id,
+                "quantity": 2,
+                "start_date": start.isoformat(),
+                "end_date": end.isoformat(),
+            },
+            headers=headers,
+        )
+        assert rental_res.status_code == 201
+
+    response = await ac.get("/db/inventory/details", headers=headers)
+    assert response.status_code == 200
+    item = next(i for i in response.json() if i["id"] == item_id)
+    assert item["in_stock_quantity"] == 3
+    assert len(item["active_rentals"]) == 1
+    assert item["active_rentals"][0]["quantity"] == 2
+
+    page = await ac.get(
+        "/db/inventory/details", params={"limit": 1, "offset": 0}, headers=headers
+    )
+    assert page.status_code == 200
+    assert len(page.json()) == 1
+    assert int(page.headers["X-Total-Count"]) >= 1
+
+
+async def test_inventory_availability_uses_peak_reservation(
+    test_client, service_header
+):
+    """Test availability counts only rentals overlapping on the same day."""
+    ac = test_client
+    headers = service_header
+    team_res = await ac.post(
+        "/db/teams", json={"name": unique_str("Avail_Team")}, headers=headers
+    )
+    team_id = team_res.json()["id"]
+    room_res = await ac.post(
+        "/db/rooms",
+        json={"name": unique_str("Avail_Room"), "room_type": "srv", "team_id": team_id},
+        headers=headers,
+    )
+    cat_res = await ac.post(
+        "/db/categories", json={"name": unique_str("Avail_Cat")}, headers=headers
+    )
+    item_res = await ac.post(
+        "/db/inventory/",
+        json={
+            "name": unique_str("Probe"),
+            "quantity": 5,
+            "category_id": cat_res.json()["id"],
+            "localization_id": room_res.json()["id"],
+            "team_id": team_id,
+        },
+        headers=headers,
+    )
+    item_id = item_res.json()["id"]
+
+    start = date.today() + timedelta(days=1)
+    for first_day, last_day in ((0, 2), (4, 6)):
+        rental_res = await ac.post(
+            "/db/rentals",
+            json={
+                "item_id": item_id,
+                "quantity": 2,
+                "start_date": (start + timedelta(days=first_day)).isoformat(),
+                "end_date": (start + timedelta(days=last_day)).isoformat(),
+            },
+            headers=headers,
+        )
+        assert rental_res.status_code == 201
+
+    params = {
+        "item_ids": [item_id],
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=6)).isoformat(),
+    }
+    response = await ac.get(
+        "/db/inventory/availability", params=params, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()[0]["reserved_quantity"] == 2
+    assert response.json()[0]["available_quantity"] == 3
+
+    rental_res = await ac.post(
+        "/db/rentals",
+        json={
+            "item_id": item_id,
+            "quantity": 3,
+            "start_date": params["start_date"],
+            "end_date": params["end_date"],
+        },
+        headers=headers,
+    )
+    assert rental_res.status_code == 201
+
+    response = await ac.get(
+        "/db/inventory/availability", params=params, headers=headers
+    )
+    assert response.json()[0]["available_quantity"] == 0
+
+
+async def test_bulk_rentals_and_returns(test_client, service_header):
+    """Test batch rentals are all-or-nothing and can be returned in one call."""
+    ac = test_client
+    headers = service_header
+    team_res = await ac.post(
+        "/db/teams", json={"name": unique_str("Kit_Team")}, headers=headers
+    )
+    team_id = team_res.json()["id"]
+    room_res = await ac.post(
+        "/db/rooms",
+        json={"name": unique_str("Kit_Room"), "room_type": "srv", "team_id": team_id},
+        headers=headers,
+    )
+    cat_res = await ac.post(
+        "/db/categories", json={"name": unique_str("Kit_Cat")}, headers=headers
+    )
+    item_ids = []
+    for quantity in (2, 1):
+        item_res = await ac.post(
+            "/db/inventory/",
+            json={
+                "name": unique_str("Kit"),
+                "quantity": quantity,
+                "category_id": cat_res.json()["id"],
+                "localization_id": room_res.json()["id"],
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+        item_ids.append(item_res.json()["id"])
+
+    period = {
+        "start_date": date.today().isoformat(),
+        "end_date": (date.today() + timedelta(days=2)).isoformat(),
+    }
+    too_many = await ac.post(
+        "/db/rentals/bulk",
+        json=[
+            {"item_id": item_ids[0], "quantity": 1, **period},
+            {"item_id": item_ids[1], "quantity": 2, **period},
+        ],
+        headers=headers,
+    )
+    assert too_many.status_code == 409
+    availability = await ac.get(
+        "/db/inventory/availability",
+        params={"item_ids": item_ids, **period},
+        headers=headers,
+    )
+    assert [a["reserved_quantity"] for a in availability.json()] == [0, 0]
+
+    created = await ac.post(
+        "/db/rentals/bulk",
+        json=[
+            {"item_id": item_ids[1], "quantity": 1, **period},
+            {"item_id": item_ids[0], "quantity": 2, **period},
+        ],
+        headers=headers,
+    )
+    assert created.status_code == 201
+    rental_ids = [r["id"] for r in created.json()]
+    assert len(rental_ids) == 2
+
+    returned = await ac.post(
+        "/db/rentals/bulk/return",
+        json=[
+            {"rental_id": rental_ids[0]},
+            {"rental_id": rental_ids[1], "quantity": 1},
+        ],
+        headers=headers,
+    )
+    assert returned.status_code == 200
+    assert len(returned.json()["details"]) == 2
+    partial = await ac.get(f"/db/rentals/{rental_ids[1]}", headers=headers)
+    assert partial.json()["quantity"] == 1
+
+
+async def test_bulk_tag_assign_and_detach(test_client, service_header):
+    """Test bulk tagging skips existing links and detaches across entity types."""
+    ac = test_client
+    headers = service_header
+    team_res = await ac.post(
+        "/db/teams", json={"name": unique_str("Tag_Team")}, headers=headers
+    )
+    team_id = team_res.json()["id"]
+    room_res = await ac.post(
+        "/db/rooms",
+        json={"name": unique_str("Tag_Room"), "room_type": "srv", "team_id": team_id},
+        headers=headers,
+    )
+    room_id = room_res.json()["id"]
+    rack_ids = []
+    for _ in range(2):
+        rack_res = await ac.post(
+            "/db/racks",
+            json={
+                "name": unique_str("Tag_Rack"),
+                "room_id": room_id,
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+        rack_ids.append(rack_res.json()["id"])
+    tag_ids = []
+    for color in ("red", "green"):
+        tag_res = await ac.post(
+            "/db/tags",
+            json={"name": unique_str("BULK"), "color": color},
+            headers=headers,
+        )
+        tag_ids.append(tag_res.json()["id"])
+
+    entities = [{"entity_type": "rack", "entity_id": rack_id} for rack_id in rack_ids]
+    entities.append({"entity_type": "room", "entity_id": room_id})
+    payload = {"tag_ids": tag_ids, "entities": entities}
+
+    first = await ac.post("/db/tags/bulk/assign", json=payload, headers=headers)
+    assert first.status_code == 200
+    assert first.json()["assigned"] == 6
+    repeated = await ac.post("/db/tags/bulk/assign", json=payload, headers=headers)
+    assert repeated.json()["assigned"] == 0
+
+    detached = await ac.post(
+        "/db/tags/bulk/detach",
+        json={"tag_ids": [tag_ids[0]], "entities": entities},
+        headers=headers,
+    )
+    assert detached.json()["detached"] == 3
+
+    missing = await ac.post(
+        "/db/tags/bulk/assign",
+        json={
+            "tag_ids": tag_ids,
+            "entities": [{"entity_type": "rack", "entity_id": 999999999}],
+        },
+        headers=headers,
+    )
+    assert missing.status_code == 404
+
+
+async def test_machine_import_and_export(test_client, service_header, db_session):
+    """Test bulk machine import creates, updates and reports rejected rows.
+
+    Imported machines get the same History entries as ORM writes.
+    """
+    ac = test_client
+    headers = service_header
+    team_res = await ac.post(
+        "/db/teams", json={"name": unique_str("Import_Team")}, headers=headers
+    )
+    team_id = team_res.json()["id"]
+    room_res = await ac.post(
+        "/db/rooms",
+        json={
+            "name": unique_str("Import_Room"),
+            "room_type": "srv",
+            "team_id": team_id,
+        },
+        headers=headers,
+    )
+    room_id = room_res.json()["id"]
+    hosts = [unique_str("imp") for _ in range(2)]
+    lines = [
+        {
+            "name": hosts[0],
+            "localization_id": room_id,
+            "team_id": team_id,
+            "cpus": ["Xeon", "Xeon"],
+            "disks": [{"name": "ssd0", "capacity": "480GB"}],
+        },
+        {"name": hosts[1], "localization_id": room_id, "team_id": team_id},
+        {"name": unique_str("imp"), "localization_id": 999999999},
+        {"localization_id": room_id},
+    ]
+    content = "\n".join(json.dumps(line) for line in lines)
+    import_tags = ("machines", "metadata", "cpus", "disks")
+    listeners.registered_tags.update(import_tags)
+    versions_before = await get_tag_versions(import_tags)
+
+    response = await ac.post(
+        "/db/machines/import",
+        files={"file": ("machines.ndjson", content, "application/x-ndjson")},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    summary = events[-1]
+    assert summary["type"] == "summary"
+    assert (summary["created"], summary["updated"], summary["failed"]) == (2, 0, 2)
+    assert {e["line"] for e in events if e["type"] == "error"} == {3, 4}
+    versions_after = await get_tag_versions(import_tags)
+    assert all(versions_after[t] != versions_before[t] for t in import_tags)
+
+    csv_content = f"name,localization_id,team_id,os,cpus\n{hosts[1]},{room_id},{team_id},Debian,EPYC\n"
+    response = await ac.post(
+        "/db/machines/import",
+        files={"file": ("machines.csv", csv_content, "text/csv")},
+        headers=headers,
+    )
+    summary = json.loads(response.text.splitlines()[-1])
+    assert (summary["created"], summary["updated"], summary["failed"]) == (0, 1, 0)
+
+    machine_id = await db_session.scalar(
+        select(models.Machines.id).where(models.Machines.name == hosts[1])
+    )
+    logs = (
+        await db_session.scalars(
+            select(models.History)
+            .where(
+                models.History.entity_type == models.EntityType.MACHINES,
+                models.History.entity_id == machine_id,
+            )
+            .order_by(models.History.id)
+        )
+    ).all()
+    assert [log.action for log in logs] == [
+        models.ActionType.CREATE,
+        models.ActionType.UPDATE,
+    ]
+    assert logs[0].after_state["name"] == hosts[1]
+    assert logs[0].after_diff["name"] == hosts[1]
+    assert logs[1].extra_data == {"os": {"old": None, "new": "Debian"}}
+    assert (logs[1].before_diff, logs[1].after_diff) == ({"os": None}, {"os": "Debian"})
+    state = await ac.get(f"/db/history/state/machines/{machine_id}", headers=headers)
+    assert state.json()["state"]["os"] == "Debian"
+    assert state.json()["state"]["version_id"] == 2
+
+    export = await ac.get(
+        "/db/machines/export", params={"format": "ndjson"}, headers=headers
+    )
+    assert export.status_code == 200
+    exported = {
+        record["name"]: record
+        for record in map(json.loads, export.text.splitlines())
+        if record["name"] in hosts
+    }
+    assert exported[hosts[0]]["cpus"] == ["Xeon", "Xeon"]
+    assert exported[hosts[0]]["disks"] == [{"name": "ssd0", "capacity": "480GB"}]
+    assert exported[hosts[1]]["os"] == "Debian"
+    assert exported[hosts[1]]["cpus"] == ["EPYC"]
+
+    csv_export = await ac.get(
+        "/db/machines/export", params={"format": "csv"}, headers=headers
+    )
+    assert csv_export.text.startswith("name,localization_id")
+
+
+async def test_history_export_stream(test_client, service_header):
+    """Test history export filters by entity and streams diffs."""
+    ac = test_client
+    headers = service_header
+    cat_res = await ac.post(
+        "/db/categories", json={"name": unique_str("Audit_Cat")}, headers=headers
+    )
+    cat_id = cat_res.json()["id"]
+    await ac.patch(
+        f"/db/categories/{cat_id}",
+        json={"name": unique_str("Audit_Cat_Renamed")},
+        headers=headers,
+    )
+
+    params = {"entity_type": "categories", "entity_id": cat_id, "format": "ndjson"}
+    response = await ac.get("/sub/history/export", params=params, headers=headers)
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["action"] for r in records] == ["create", "update"]
+    assert set(records[1]["after_state"]) == {"name"}
+
+    csv_response = await ac.get(
+        "/sub/history/export", params={**params, "format": "csv"}, headers=headers
+    )
+    rows = csv_response.text.splitlines()
+    assert rows[0].startswith("id,timestamp,action")
+    assert len(rows) == 3
+
+    future = await ac.get(
+        "/sub/history/export",
+        params={**params, "since": "2999-01-01T00:00:00"},
+        headers=headers,
+    )
+    assert future.text == ""
+
+
+async def test_blackboxed_history_precomputed_diffs(
+    test_client, service_header, db_session
+):
+    """Test history subpage returns diffs stored with the entries."""
+    ac = test_client
+    headers = service_header
+    old_name, new_name = unique_str("Diff_Cat"), unique_str("Diff_Cat_Renamed")
+    cat_res = await ac.post("/db/categories", json={"name": old_name}, headers=headers)
+    cat_id = cat_res.json()["id"]
+    await ac.patch(f"/db/categories/{cat_id}", json={"name": new_name}, headers=headers)
+
+    logs = (
+        await db_session.scalars(
+            select(models.History)
+            .filter(
+                models.History.entity_type == models.EntityType.CATEGORIES,
+                models.History.entity_id == cat_id,
+            )
+            .order_by(models.History.id)
+        )
+    ).all()
+    assert logs[0].after_diff == {"name": old_name}
+    assert logs[1].before_diff == {"name": old_name}
+    assert logs[1].after_diff == {"name": new_name}
+
+    response = await ac.get("/sub/history", params={"limit": 1000}, headers=headers)
+    assert response.status_code == 200
+    entries = {entry["id"]: entry for entry in response.json()}
+    assert entries[logs[1].id]["before_state"] == {"name": old_name}
+    assert entries[logs[1].id]["after_state"] == {"name": new_name}
+    assert entries[logs[0].id]["before_state"] is None
+
+    await db_session.execute(
+        update(models.History)
+        .where(models.History.id == logs[1].id)
+        .values(before_diff=null(), after_diff=null())
+    )
+    await db_session.commit()
+    assert await backfill_history_diffs(db_session) >= 1
+    await db_session.refresh(logs[1])
+    assert logs[1].after_diff == {"name": new_name}
+
+
+async def test_blackboxed_history_item_update_diff(
+    test_client, service_header, db_session
+):
+    """Test history detail returns changed fields of diff-only UPDATE entries."""
+    ac = test_client
+    headers = service_header
+    old_name, new_name = unique_str("Item_Cat"), unique_str("Item_Cat_Renamed")
+    cat_res = await ac.post("/db/categories", json={"name": old_name}, headers=headers)
+    cat_id = cat_res.json()["id"]
+    patch_res = await ac.patch(
+        f"/db/categories/{cat_id}", json={"name": new_name}, headers=headers
+    )
+    assert patch_res.status_code == 200
+
+    log = await db_session.scalar(
+        select(models.History)
+        .filter(
+            models.History.entity_type == models.EntityType.CATEGORIES,
+            models.History.entity_id == cat_id,
+            models.History.action == models.ActionType.UPDATE,
+        )
+        .order_by(models.History.id.desc())
+    )
+    response = await ac.get(f"/sub/history/{log.id}", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["action"] == models.ActionType.UPDATE.value
+    assert data["before_state"] == {"name": old_name}
+    assert data["after_state"] == {"name": new_name}
+
+    response = await ac.get(f"/db/history/{log.id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["before_state"]["name"] == old_name
+    assert response.json()["after_state"]["name"] == new_name
+    assert "version_id" in response.json()["after_state"]
+
+    await db_session.execute(
+        update(models.History)
+        .where(models.History.id == log.id)
+        .values(before_diff=null(), after_diff=null())
+    )
+    await db_session.commit()
+    response = await ac.get(f"/sub/history/{log.id}", headers=headers)
+    assert response.json()["before_state"] == {"name": old_name}
+    assert response.json()["after_state"] == {"name": new_name}
+
+
+async def test_bulk_hardware_and_shelves(test_client, service_header):
+    """Test bulk create, replace, update and delete of shelves, CPUs and disks."""
+    ac = test_client
+    headers = service_header
+    team_id = (
+        await ac.post(
+            "/db/teams", json={"name": unique_str("Bulk_HW")}, headers=headers
+        )
+    ).json()["id"]
+    room_id = (
+        await ac.post(
+            "/db/rooms",
+            json={
+                "name": unique_str("Bulk_Room"),
+                "room_type": "srv",
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+    ).json()["id"]
+    rack_id = (
+        await ac.post(
+            "/db/racks",
+            json={
+                "name": unique_str("Bulk_Rack"),
+                "room_id": room_id,
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+    ).json()["id"]
+    meta_id = (
+        await ac.post(
+            "/db/metadata",
+            json={"agent_prometheus": False, "ansible_access": False},
+            headers=headers,
+        )
+    ).json()["id"]
+    machine_ids = []
+    for _ in range(2):
+        res = await ac.post(
+            "/db/machines/",
+            json={
+                "name": unique_str("bulk-srv"),
+                "localization_id": room_id,
+                "metadata_id": meta_id,
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+        machine_ids.append(res.json()["id"])
+
+    shelves = await ac.post(
+        f"/db/shelf/{rack_id}/bulk",
+        json=[{"name": f"S{order}", "order": order} for order in range(40)],
+        headers=headers,
+    )
+    assert shelves.status_code == 201
+    shelf_ids = [shelf["id"] for shelf in shelves.json()]
+    assert len(shelf_ids) == 40
+    assert shelves.json()[0]["rack_name"].startswith("Bulk_Rack")
+
+    renamed = await ac.patch(
+        "/db/shelf/bulk",
+        json=[{"id": shelf_ids[0], "name": "Top"}, {"id": shelf_ids[1], "order": 99}],
+        headers=headers,
+    )
+    assert renamed.json()["updated"] == 2
+    shelf = (await ac.get(f"/db/shelf/{shelf_ids[0]}", headers=headers)).json()
+    assert shelf["name"] == "Top"
+
+    await ac.post(
+        f"/db/machines/{machine_ids[0]}/mount/{shelf_ids[0]}", headers=headers
+    )
+    occupied = await ac.post(
+        "/db/shelf/bulk/delete", json={"ids": shelf_ids[:2]}, headers=headers
+    )
+    assert occupied.status_code == 400
+    deleted = await ac.post(
+        "/db/shelf/bulk/delete", json={"ids": shelf_ids[1:]}, headers=headers
+    )
+    assert deleted.json()["deleted"] == 39
+
+    cpus = await ac.post(
+        "/db/cpus/bulk",
+        json=[{"name": "Xeon", "machine_id": machine_id} for machine_id in machine_ids],
+        headers=headers,
+    )
+    assert cpus.status_code == 201
+    cpu_ids = [cpu["id"] for cpu in cpus.json()]
+
+    disks = await ac.put(
+        "/db/disks/bulk",
+        json=[
+            {
+                "machine_id": machine_id,
+                "disks": [{"name": "sda", "capacity": "1TB"}, {"name": "sdb"}],
+            }
+            for machine_id in machine_ids
+        ],
+        headers=headers,
+    )
+    assert disks.status_code == 200
+    assert len(disks.json()) == 4
+    replaced = await ac.put(
+        "/db/disks/bulk",
+        json=[{"machine_id": machine_ids[0], "disks": [{"name": "nvme0n1"}]}],
+        headers=headers,
+    )
+    disk_id = replaced.json()[0]["id"]
+    updated = await ac.patch(
+        "/db/disks/bulk", json=[{"id": disk_id, "capacity": "2TB"}], headers=headers
+    )
+    assert updated.json()["updated"] == 1
+    machine_disks = [
+        disk
+        for disk in (await ac.get("/db/disks/", headers=headers)).json()
+        if disk["machine_id"] in machine_ids
+    ]
+    assert sorted(disk["name"] for disk in machine_disks) == ["nvme0n1", "sda", "sdb"]
+    assert [d["capacity"] for d in machine_disks if d["id"] == disk_id] == ["2TB"]
+
+    removed = await ac.post(
+        "/db/cpus/bulk/delete", json={"ids": cpu_ids}, headers=headers
+    )
+    assert removed.json()["deleted"] == 2
+
+    missing = await ac.post(
+        "/db/cpus/bulk",
+        json=[{"name": "Xeon", "machine_id": 999999999}],
+        headers=headers,
+    )
+    assert missing.status_code == 404
@@ -5,13 +5,17 @@ import uuid
 import pytest
 from sqlalchemy import select
 
+from app.core.exceptions import VersionConflictError
 from app.db import models, schemas
 from app.routers.database_history_router import (
+    _apply_rollback_plan,
+    _plan_rollback,
     _rollback_create,
     _rollback_delete,
     _rollback_update,
 )
 from app.utils import database_service as service
+from app.utils import history_service
 
 pytestmark = [pytest.mark.smoke, pytest.mark.database, pytest.mark.asyncio]
 
@@ -186,3 +190,232 @@ async def test_history_full_cycle_with_rollback(
 
     final_check = await db_session.get(models.User, user_id)
     assert final_check is None, "Rollback CREATE didn't delete the user"
+
+
+@pytest.mark.database
+async def test_entity_state_at_point_in_time(test_client, db_session, service_header):
+    """Test reconstruction of entity state before and after a checkpoint."""
+    original, renamed, final = (unique_str("StateCat") for _ in range(3))
+    res = await test_client.post(
+        "/db/categories", json={"name": original}, headers=service_header
+    )
+    cat_id = res.json()["id"]
+    for name in (renamed, final):
+        await test_client.patch(
+            f"/db/categories/{cat_id}", json={"name": name}, headers=service_header
+        )
+
+    logs = (
+        await db_session.scalars(
+            select(models.History)
+            .filter(
+                models.History.entity_type == models.EntityType.CATEGORIES,
+                models.History.entity_id == cat_id,
+            )
+            .order_by(models.History.id)
+        )
+    ).all()
+    assert len(logs) == 3
+
+    url = f"/db/history/state/categories/{cat_id}"
+    at_rename = await test_client.get(
+        url, params={"at": logs[1].timestamp.isoformat()}, headers=service_header
+    )
+    assert at_rename.status_code == 200
+    assert at_rename.json()["state"]["name"] == renamed
+    assert at_rename.json()["replayed_entries"] == 2
+
+    assert await history_service.create_history_checkpoints(every=3, batch_size=10**6)
+
+    latest = (await test_client.get(url, headers=service_header)).json()
+    assert latest["exists"] is True
+    assert latest["state"]["name"] == final
+    assert latest["complete"] is True
+    assert latest["checkpoint_history_id"] == logs[2].id
+    assert latest["replayed_entries"] == 0
+
+    await test_client.delete(f"/db/categories/{cat_id}", headers=service_header)
+    deleted = (await test_client.get(url, headers=service_header)).json()
+    assert deleted["exists"] is False
+    assert deleted["replayed_entries"] == 1
+
+    missing = await test_client.get(
+        "/db/history/state/categories/999999999", headers=service_header
+    )
+    assert missing.status_code == 404
+
+
+@pytest.mark.database
+async def test_entity_state_without_create_entry(db_session):
+    """Test reconstruction from full-snapshot updates without a CREATE entry.
+
+    1. UPDATE without extra_data -> Check after_state snapshot is applied
+    2. No CREATE entry or checkpoint -> Check state is flagged incomplete
+    """
+    entity_id = uuid.uuid4().int % 10**8 + 10**9
+    db_session.add_all(
+        [
+            models.History(
+                entity_type=models.EntityType.CATEGORIES,
+                action=models.ActionType.UPDATE,
+                entity_id=entity_id,
+                before_state={"name": "old", "version_id": 1},
+                after_state={"name": "new", "version_id": 2},
+            ),
+            models.History(
+                entity_type=models.EntityType.CATEGORIES,
+                action=models.ActionType.UPDATE,
+                entity_id=entity_id,
+                before_state={"version_id": 2},
+                after_state={"version_id": 3},
+                extra_data={"name": {"old": "new", "new": "newer"}},
+            ),
+        ]
+    )
+    await db_session.commit()
+
+    result = await history_service.reconstruct_entity_state(
+        db_session, models.EntityType.CATEGORIES, entity_id
+    )
+    assert result["state"] == {"name": "newer", "version_id": 3}
+    assert result["complete"] is False
+    assert result["replayed_entries"] == 2
+
+
+@pytest.mark.database
+async def test_batch_rollback_dry_run_and_apply(
+    test_client, db_session, service_header
+):
+    """Test batch rollback of updates and a delete of several machines."""
+    ac, headers = test_client, service_header
+    team_id = (
+        await ac.post(
+            "/db/teams", json={"name": unique_str("BatchTeam")}, headers=headers
+        )
+    ).json()["id"]
+    room_id = (
+        await ac.post(
+            "/db/rooms",
+            json={
+                "name": unique_str("BatchRoom"),
+                "room_type": "srv",
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+    ).json()["id"]
+    meta_id = (
+        await ac.post(
+            "/db/metadata",
+            json={"agent_prometheus": False, "ansible_access": False},
+            headers=headers,
+        )
+    ).json()["id"]
+    names = [unique_str("batch-srv") for _ in range(3)]
+    machine_ids = []
+    for name in names:
+        res = await ac.post(
+            "/db/machines/",
+            json={
+                "name": name,
+                "localization_id": room_id,
+                "metadata_id": meta_id,
+                "team_id": team_id,
+            },
+            headers=headers,
+        )
+        machine_ids.append(res.json()["id"])
+
+    for machine_id in machine_ids:
+        for os_name in ("debian", "ubuntu"):
+            await ac.patch(
+                f"/db/machines/{machine_id}", json={"os": os_name}, headers=headers
+            )
+    await ac.delete(f"/db/machines/{machine_ids[2]}", headers=headers)
+
+    history_ids = (
+        await db_session.scalars(
+            select(models.History.id).filter(
+                models.History.entity_type == models.EntityType.MACHINES,
+                models.History.entity_id.in_(machine_ids),
+                models.History.action != models.ActionType.CREATE,
+            )
+        )
+    ).all()
+    assert len(history_ids) == 7
+
+    payload = {"history_ids": history_ids, "dry_run": True}
+    dry = await ac.post("/db/history/rollback", json=payload, headers=headers)
+    assert dry.status_code == 200
+    plan = {change["entity_id"]: change for change in dry.json()["changes"]}
+    assert plan[machine_ids[0]]["operation"] == "update"
+    assert plan[machine_ids[0]]["changes"]["os"] == {"old": "ubuntu", "new": None}
+    assert plan[machine_ids[2]]["operation"] == "restore"
+    machine = await ac.get(f"/db/machines/{machine_ids[0]}", headers=headers)
+    assert machine.json()["os"] == "ubuntu"
+
+    payload["dry_run"] = False
+    applied = await ac.post("/db/history/rollback", json=payload, headers=headers)
+    assert applied.status_code == 200
+    assert applied.json()["entries"] == 7
+    for machine_id, name in zip(machine_ids, names):
+        res = await ac.get(f"/db/machines/{machine_id}", headers=headers)
+        assert res.status_code == 200
+        assert res.json()["name"] == name
+        assert res.json()["os"] is None
+
+    again = await ac.post(
+        "/db/history/rollback",
+        json={"history_ids": history_ids, "dry_run": True},
+        headers=headers,
+    )
+    assert again.json()["changes"] == []
+
+    unfiltered = await ac.post("/db/history/rollback", json={}, headers=headers)
+    assert unfiltered.status_code == 400
+
+
+@pytest.mark.database
+async def test_batch_rollback_conflicts_with_concurrent_change(
+    test_client, db_session, service_header
+):
+    """Test that applying a stale rollback plan raises a version conflict.
+
+    1. Plan update rollback, rename meanwhile -> Check conflict
+    2. Plan create rollback, rename meanwhile -> Check conflict
+    """
+    cat_id = (
+        await test_client.post(
+            "/db/categories",
+            json={"name": unique_str("PlanCat")},
+            headers=service_header,
+        )
+    ).json()["id"]
+
+    for action in (models.ActionType.UPDATE, models.ActionType.CREATE):
+        if action == models.ActionType.UPDATE:
+            await test_client.patch(
+                f"/db/categories/{cat_id}",
+                json={"name": unique_str("PlanCat")},
+                headers=service_header,
+            )
+        entries = (
+            await db_session.scalars(
+                select(models.History).filter(
+                    models.History.entity_type == models.EntityType.CATEGORIES,
+                    models.History.entity_id == cat_id,
+                    models.History.action == action,
+                )
+            )
+        ).all()
+        plan = await _plan_rollback(entries, db_session)
+        await db_session.rollback()
+
+        await test_client.patch(
+            f"/db/categories/{cat_id}",
+            json={"name": unique_str("PlanCat")},
+            headers=service_header,
+        )
+        with pytest.raises(VersionConflictError):
+            await _apply_rollback_plan(plan, db_session, 1)
+        await db_session.rollback()
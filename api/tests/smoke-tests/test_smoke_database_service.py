@@ -3,12 +3,13 @@
 import uuid
 
 import pytest
-from sqlalchemy import select, text
+from sqlalchemy import event, select, text
 from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm.exc import StaleDataError
 import app.db.listeners
-from app.database import AsyncSessionLocal
+from app.database import AsyncSessionLocal, async_engine
 from app.db import models
+from app.utils.database_service import dedupe_tag_links
 
 pytestmark = [pytest.mark.smoke, pytest.mark.database, pytest.mark.asyncio]
 
@@ -58,3 +59,76 @@ async def test_optimistic_locking_protection(db_session):
     with pytest.raises(StaleDataError):
         db_session.add(category)
         await db_session.commit()
+
+
+async def test_dedupe_tag_links_keeps_oldest_link():
+    """Check that duplicate tag links are removed before the unique constraint.
+
+    The constraint is dropped inside a transaction that is rolled back, so the
+    duplicates never leave the test. Once constraints exist, no table is scanned.
+    """
+    async with async_engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            await conn.execute(
+                text(
+                    "ALTER TABLE tags_documentation DROP CONSTRAINT _documentation_tag_uc"
+                )
+            )
+            tag_id = await conn.scalar(
+                text(
+                    "INSERT INTO tags (name, color, version_id) VALUES (:name, 'red', 1) RETURNING id"
+                ),
+                {"name": generate_unique_name("DedupeTag")[:50]},
+            )
+            doc_id = await conn.scalar(
+                text(
+                    "INSERT INTO documentation (title, author, added_on, version_id) "
+                    "VALUES (:title, 'smoke', now(), 1) RETURNING id"
+                ),
+                {"title": generate_unique_name("DedupeDoc")},
+            )
+            link_ids = [
+                await conn.scalar(
+                    text(
+                        "INSERT INTO tags_documentation (documentation_id, tag_id) "
+                        "VALUES (:doc_id, :tag_id) RETURNING id"
+                    ),
+                    {"doc_id": doc_id, "tag_id": tag_id},
+                )
+                for _ in range(3)
+            ]
+
+            assert await conn.run_sync(dedupe_tag_links) == 2
+            remaining = await conn.scalars(
+                text(
+                    "SELECT id FROM tags_documentation WHERE documentation_id = :doc_id"
+                ),
+                {"doc_id": doc_id},
+            )
+            assert remaining.all() == [min(link_ids)]
+            assert await conn.run_sync(dedupe_tag_links) == 0
+
+            await conn.execute(
+                text(
+                    "ALTER TABLE tags_documentation ADD CONSTRAINT _documentation_tag_uc "
+                    "UNIQUE (documentation_id, tag_id)"
+                )
+            )
+            statements = []
+
+            def dedupe_with_constraints(sync_conn):
+                @event.listens_for(sync_conn, "before_cursor_execute")
+                def record(conn, cursor, statement, *args):
+                    statements.append(statement)
+
+                try:
+                    return dedupe_tag_links(sync_conn)
+                finally:
+                    event.remove(sync_conn, "before_cursor_execute", record)
+
+            assert await conn.run_sync(dedupe_with_constraints) == 0
+            assert statements
+            assert not [stmt for stmt in statements if "DELETE" in stmt]
+        finally:
+            await transaction.rollback()
@@ -1,11 +1,19 @@
 """Smoke tests for Database Listener functionality."""
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import delete, select, text, update
 
 # pylint: disable=unused-import
 import app.db.listeners
+from app.database import async_engine
 from app.db import models
+from app.routers.subpage_history_router import get_state_diff
+from app.utils.cache_service import awaited_invalidations, cached, get_tag_versions
+from app.utils.database_service import (
+    DATA_MIGRATIONS_LOCK_KEY,
+    compact_history_updates,
+    run_history_migrations,
+)
 
 pytestmark = [pytest.mark.smoke, pytest.mark.database, pytest.mark.asyncio]
 
@@ -88,3 +96,150 @@ async def test_full_entity_lifecycle_with_history(db_session, unique_category_na
         .first()
     )
     assert history_delete is not None, "No DELETE log in history table"
+
+
+async def test_update_history_diff_format_and_compaction(
+    db_session, unique_category_name
+):
+    """Test diff-only UPDATE entries and compaction of full snapshots.
+
+    1. UPDATE -> Check states keep only version_id, changes stay in extra_data
+    2. Full snapshot entry -> Check compaction keeps the same diff
+    """
+    category = models.Categories(name=unique_category_name)
+    db_session.add(category)
+    await db_session.commit()
+    category.name = f"DIFF-{unique_category_name}"
+    await db_session.commit()
+
+    history_update = (
+        await db_session.execute(
+            select(models.History).filter(
+                models.History.entity_id == category.id,
+                models.History.entity_type == models.EntityType.CATEGORIES,
+                models.History.action == models.ActionType.UPDATE,
+            )
+        )
+    ).scalar_one()
+    assert set(history_update.before_state) == {"version_id"}
+    assert set(history_update.after_state) == {"version_id"}
+    assert history_update.extra_data["name"]["new"] == category.name
+
+    full_entry = models.History(
+        entity_type=models.EntityType.CATEGORIES,
+        action=models.ActionType.UPDATE,
+        entity_id=category.id,
+        before_state={"id": category.id, "name": "old", "version_id": 2},
+        after_state={"id": category.id, "name": "new", "version_id": 2},
+        extra_data={"name": {"old": "old", "new": "new"}},
+    )
+    db_session.add(full_entry)
+    await db_session.commit()
+    full_diff = get_state_diff(
+        full_entry.before_state, full_entry.after_state, full_entry.extra_data
+    )
+
+    assert await compact_history_updates(db_session, batch_size=2) >= 1
+    await db_session.refresh(full_entry)
+    assert full_entry.before_state == {"version_id": 2}
+    assert full_entry.after_state == {"version_id": 2}
+    assert (
+        get_state_diff(
+            full_entry.before_state, full_entry.after_state, full_entry.extra_data
+        )
+        == full_diff
+        == ({"name": "old"}, {"name": "new"})
+    )
+    assert await compact_history_updates(db_session) == 0
+
+
+async def test_history_migrations_run_once(db_session, unique_category_name):
+    """Test that history migrations are skipped once recorded or while locked.
+
+    1. Migrations done -> Check full snapshot entry is not compacted again
+    2. Lock held by another replica -> Check migrations are skipped
+    3. Lock released -> Check entry is compacted and marker recorded
+    """
+
+    async def migrate():
+        async with async_engine.connect() as connection:
+            await run_history_migrations(connection)
+
+    await migrate()
+    full_entry = models.History(
+        entity_type=models.EntityType.CATEGORIES,
+        action=models.ActionType.UPDATE,
+        entity_id=0,
+        before_state={"name": unique_category_name, "version_id": 1},
+        after_state={"name": f"NEW-{unique_category_name}", "version_id": 2},
+        extra_data={"name": {"old": unique_category_name, "new": "new"}},
+    )
+    db_session.add(full_entry)
+    await db_session.commit()
+
+    await migrate()
+    await db_session.refresh(full_entry)
+    assert "name" in full_entry.before_state
+
+    await db_session.execute(delete(models.DataMigration))
+    await db_session.commit()
+    async with async_engine.connect() as holder:
+        await holder.execute(
+            text("SELECT pg_advisory_lock(:key)"), {"key": DATA_MIGRATIONS_LOCK_KEY}
+        )
+        await migrate()
+        await db_session.refresh(full_entry)
+        assert "name" in full_entry.before_state
+        await holder.execute(
+            text("SELECT pg_advisory_unlock(:key)"), {"key": DATA_MIGRATIONS_LOCK_KEY}
+        )
+
+    await migrate()
+    await db_session.refresh(full_entry)
+    assert full_entry.before_state == {"version_id": 1}
+    names = set((await db_session.scalars(select(models.DataMigration.name))).all())
+    assert "compact_history_updates" in names
+
+
+async def test_commit_invalidates_cached_tables(
+    db_session, unique_category_name, refresh_redis_client
+):
+    """Test that commits touching a cached table bump its cache tag.
+
+    Unit of work changes, bulk UPDATE statements and raw text() writes are
+    tracked, and awaited_invalidations returns only after the tags are bumped.
+    """
+
+    @cached(namespace="smoke-categories", tags=("categories",))
+    async def category_names():
+        result = await db_session.execute(select(models.Categories.name))
+        return sorted(result.scalars().all())
+
+    assert unique_category_name not in await category_names()
+
+    category = models.Categories(name=unique_category_name)
+    db_session.add(category)
+    async with awaited_invalidations():
+        await db_session.commit()
+    assert unique_category_name in await category_names()
+
+    renamed = f"RENAMED-{unique_category_name}"
+    await db_session.execute(
+        update(models.Categories)
+        .where(models.Categories.id == category.id)
+        .values(name=renamed)
+    )
+    version_before = (await get_tag_versions(["categories"]))["categories"]
+    async with awaited_invalidations():
+        await db_session.commit()
+    assert (await get_tag_versions(["categories"]))["categories"] != version_before
+    assert renamed in await category_names()
+
+    raw_renamed = f"RAW-{unique_category_name}"
+    await db_session.execute(
+        text("UPDATE categories SET name = :name WHERE id = :id"),
+        {"name": raw_renamed, "id": category.id},
+    )
+    async with awaited_invalidations():
+        await db_session.commit()
+    assert raw_renamed in await category_names()
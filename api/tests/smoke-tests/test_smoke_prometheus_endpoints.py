@@ -1,5 +1,7 @@
 """Smoke tests for Prometheus-related endpoints."""
 
+import json
+
 import pytest
 
 from app.db.models import User, UserType
@@ -56,3 +58,45 @@ async def test_prometheus_target_endpoint_connection(test_client, service_header
         "/prometheus/target", json=payload, headers=service_header
     )
     assert response.status_code in (200, 400, 422)
+
+
+@pytest.mark.database
+async def test_prometheus_targets_sync_endpoint(
+    test_client, service_header, mock_ansible_success, tmp_path, monkeypatch
+):
+    """Smoke test for /prometheus/targets/sync endpoint.
+
+    A discovered host with node exporter is registered once, unrelated targets
+    are kept and a repeated sync does not rewrite the file.
+    """
+    targets_path = tmp_path / "targets.json"
+    targets_path.write_text(json.dumps([{"targets": ["external:9100"], "labels": {}}]))
+    monkeypatch.setattr(
+        "app.utils.prometheus_service.PROMETHEUS_TARGETS_PATH", str(targets_path)
+    )
+
+    mock_ansible_success.reports["10.40.0.1"] = {
+        "10.40.0.1": {"metadata": {"has_agent": True}}
+    }
+    await test_client.post(
+        "/ansible/discovery",
+        json={"hosts": ["10.40.0.1"], "extra_vars": {}},
+        headers=service_header,
+    )
+
+    response = await test_client.post(
+        "/prometheus/targets/sync", headers=service_header
+    )
+    assert response.status_code == 200
+    assert response.json()["changed"] is True
+    assert "10.40.0.1:9100" in response.json()["added"]
+
+    targets = json.loads(targets_path.read_text())
+    instances = [i for t in targets for i in t["targets"]]
+    assert "external:9100" in instances
+    assert instances.count("10.40.0.1:9100") == 1
+
+    response = await test_client.post(
+        "/prometheus/targets/sync", headers=service_header
+    )
+    assert response.json()["changed"] is False
@@ -0,0 +1,35 @@
+"""Unit tests for Ansible service utilities."""
+
+import pytest
+
+from app.core.exceptions import ObjectNotFoundError, ValidationError
+from app.utils.ansible_service import collect_platform_reports, parse_platform_report
+
+pytestmark = [pytest.mark.unit, pytest.mark.ansible, pytest.mark.asyncio]
+
+
+async def test_collect_platform_reports_from_events(mock_ansible_success):
+    """Test that platform info is captured from runner events in memory."""
+    mock_ansible_success.reports["scan-host"] = {
+        "scan-host": {
+            "distribution": {"name": "Ubuntu", "version": "24.04"},
+            "metadata": {"has_agent": True},
+        }
+    }
+
+    reports = await collect_platform_reports(
+        "scan_platform.yaml", ["scan-host", "silent-host"], {}
+    )
+
+    assert set(reports) == {"scan-host"}
+    specs = parse_platform_report(reports, "scan-host")
+    assert specs["os"] == "Ubuntu 24.04"
+    assert specs["agent_prometheus"] is True
+
+
+async def test_parse_platform_report_errors():
+    """Test that missing and malformed reports raise application errors."""
+    with pytest.raises(ObjectNotFoundError):
+        parse_platform_report({}, "missing-host")
+    with pytest.raises(ValidationError):
+        parse_platform_report({"broken-host": {}}, "broken-host")
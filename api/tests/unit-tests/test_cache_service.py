@@ -0,0 +1,113 @@
+"""Unit tests for the two-tier cache service."""
+
+import asyncio
+from unittest import mock
+
+import pytest
+
+from app.utils import cache_service
+from app.utils.cache_service import (
+    LocalCache,
+    awaited_invalidations,
+    cached,
+    invalidate,
+)
+
+pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
+
+
+@pytest.fixture(autouse=True)
+def clean_local_tier():
+    """Reset in-process cache state between tests."""
+    cache_service.local_cache.clear()
+    cache_service._tag_versions.clear()
+    yield
+    cache_service.local_cache.clear()
+    cache_service._tag_versions.clear()
+
+
+@pytest.fixture
+def cache_redis_mock():
+    """Mock Redis client used by the cache service.
+
+    :return: Mocked Redis client with empty cache
+    """
+    with mock.patch("app.utils.cache_service.get_redis_client") as get_client:
+        client = mock.AsyncMock()
+        client.get.return_value = None
+        client.set.return_value = True
+        client.mget.side_effect = lambda keys: [None] * len(keys)
+        get_client.return_value = client
+        yield client
+
+
+async def test_local_cache_evicts_least_recently_used():
+    """Test that the local tier keeps only the most recently used entries."""
+    local = LocalCache(max_items=2)
+    local.set("a", 1, ttl=60)
+    local.set("b", 2, ttl=60)
+    assert local.get("a") == 1
+    local.set("c", 3, ttl=60)
+
+    assert local.get("b") is cache_service._MISSING
+    assert local.get("a") == 1
+    assert local.get("c") == 3
+
+
+async def test_cached_computes_once_for_concurrent_callers(cache_redis_mock):
+    """Test single-flight computation and local tier hits."""
+    calls = []
+
+    @cached(namespace="test-single-flight", ttl=30, tags=("racks",))
+    async def heavy(rack_id: int):
+        calls.append(rack_id)
+        await asyncio.sleep(0.01)
+        return {"id": rack_id}
+
+    results = await asyncio.gather(*(heavy(1) for _ in range(5)))
+    assert results == [{"id": 1}] * 5
+    assert calls == [1]
+    cache_redis_mock.set.assert_any_await(mock.ANY, '{"id": 1}', ex=30)
+
+    cache_redis_mock.get.reset_mock()
+    assert await heavy(1) == {"id": 1}
+    cache_redis_mock.get.assert_not_awaited()
+    assert calls == [1]
+
+
+async def test_invalidate_bumps_tag_version(cache_redis_mock):
+    """Test that invalidating a tag forces recomputation."""
+    calls = []
+    pipe = mock.MagicMock()
+    pipe.execute = mock.AsyncMock(return_value=[1])
+    cache_redis_mock.pipeline = mock.MagicMock()
+    cache_redis_mock.pipeline.return_value.__aenter__.return_value = pipe
+
+    @cached(namespace="test-invalidate", tags=("rooms",))
+    async def heavy():
+        calls.append(1)
+        return len(calls)
+
+    assert await heavy() == 1
+    assert await heavy() == 1
+    await invalidate("rooms")
+    pipe.incr.assert_called_once_with("cache_tag:rooms")
+    assert await heavy() == 2
+
+
+async def test_awaited_invalidations_waits_for_tracked_tasks():
+    """Test that the block exits only after invalidations started inside it."""
+    finished = []
+
+    async def slow_invalidation():
+        await asyncio.sleep(0.01)
+        finished.append(1)
+
+    async with awaited_invalidations():
+        cache_service.track_invalidation(asyncio.create_task(slow_invalidation()))
+        assert not finished
+    assert finished == [1]
+
+    cache_service.track_invalidation(asyncio.create_task(slow_invalidation()))
+    assert finished == [1]
+    await asyncio.sleep(0.02)
@@ -1,11 +1,22 @@
 """Unit tests for Prometheus service utilities."""
 
+import asyncio
+import json
+from contextlib import asynccontextmanager
 from unittest import mock
 
 import httpx
 import pytest
 
-from app.utils.prometheus_service import add_prometheus_target, fetch_prometheus_metrics
+from app.core.exceptions import ObjectNotFoundError
+from app.utils import prometheus_service
+from app.utils.prometheus_service import (
+    TargetRegistry,
+    add_prometheus_target,
+    fetch_prometheus_metrics,
+    merge_targets,
+    save_targets_file,
+)
 
 pytestmark = [pytest.mark.unit, pytest.mark.asyncio]
 
@@ -64,3 +75,115 @@ async def test_add_prometheus_target():
 
     assert entry["targets"] == ["host1:9100"]
     assert entry["labels"]["env"] == {"env": "dev"} or entry["labels"]["env"] == "dev"
+
+
+@asynccontextmanager
+async def fake_lock(*args, **kwargs):
+    """Stand-in for the Redis lock."""
+    yield
+
+
+async def test_target_registry_coalesces_writes():
+    """Test that concurrent target changes end up in a single file write."""
+    registry = TargetRegistry(flush_interval=0.01)
+    current = [{"targets": ["old:9100"], "labels": {}}]
+    saved = []
+
+    async def fake_save(targets):
+        saved.append(targets)
+
+    with mock.patch.object(prometheus_service, "acquire_lock", fake_lock), mock.patch(
+        "app.utils.prometheus_service.load_targets_file", return_value=current
+    ), mock.patch("app.utils.prometheus_service.save_targets_file", fake_save):
+        results = await asyncio.gather(
+            *[registry.submit("add", f"host{i}:9100", {"i": str(i)}) for i in range(5)],
+            registry.submit("remove", "old:9100"),
+            registry.submit("remove", "missing:9100"),
+            return_exceptions=True,
+        )
+
+    assert len(saved) == 1
+    assert [t["targets"] for t in saved[0]] == [[f"host{i}:9100"] for i in range(5)]
+    assert results[0] == {"targets": ["host0:9100"], "labels": {"i": "0"}}
+    assert results[5] is None
+    assert isinstance(results[6], ObjectNotFoundError)
+
+
+async def test_target_registry_submit_during_flush():
+    """Test that a change submitted while a flush is writing is not lost."""
+    registry = TargetRegistry(flush_interval=0.01)
+    writing, release = asyncio.Event(), asyncio.Event()
+    saved = []
+
+    async def fake_save(targets):
+        saved.append([t["targets"] for t in targets])
+        if len(saved) == 1:
+            writing.set()
+            await release.wait()
+
+    async def fake_load():
+        return []
+
+    with mock.patch.object(prometheus_service, "acquire_lock", fake_lock), mock.patch(
+        "app.utils.prometheus_service.load_targets_file", fake_load
+    ), mock.patch("app.utils.prometheus_service.save_targets_file", fake_save):
+        first = asyncio.create_task(registry.submit("add", "a:9100", {}))
+        await writing.wait()
+        second = asyncio.create_task(registry.submit("add", "b:9100", {}))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.wait_for(asyncio.gather(first, second), timeout=1)
+
+    assert [r["targets"] for r in results] == [["a:9100"], ["b:9100"]]
+    assert saved == [[["a:9100"]], [["b:9100"]]]
+    assert not registry._pending
+
+
+async def test_save_targets_file_is_atomic(tmp_path):
+    """Test that the targets file is replaced without leaving temporary files."""
+    path = tmp_path / "targets.json"
+    path.write_text("[]")
+    with mock.patch.object(prometheus_service, "PROMETHEUS_TARGETS_PATH", str(path)):
+        await save_targets_file([{"targets": ["host1:9100"], "labels": {}}])
+
+    assert json.loads(path.read_text())[0]["targets"] == ["host1:9100"]
+    assert [p.name for p in tmp_path.iterdir()] == ["targets.json"]
+
+
+def test_merge_targets_diff():
+    """Test merging machine targets into existing file_sd content.
+
+    Pruning removes only node exporter instances of managed hosts and keeps
+    targets added by hand on other ports.
+    """
+    current = [
+        {"targets": ["known:9100", "external:9100"], "labels": {"env": "lab"}},
+        {"targets": ["noagent:9100"], "labels": {}},
+        {"targets": ["noagent:9200", "known:8080"], "labels": {"job": "custom"}},
+    ]
+    desired = {
+        "known:9100": {"host": "known", "team": "A"},
+        "new:9100": {"host": "new"},
+    }
+    hosts = {"known", "new", "noagent"}
+
+    merged, diff = merge_targets(current, desired, hosts, prune=True)
+
+    assert diff == {
+        "added": ["new:9100"],
+        "updated": ["known:9100"],
+        "removed": ["noagent:9100"],
+    }
+    assert merged[0] == {
+        "targets": ["known:9100"],
+        "labels": {"env": "lab", "host": "known", "team": "A"},
+    }
+    assert {"targets": ["external:9100"], "labels": {"env": "lab"}} in merged
+    assert {
+        "targets": ["noagent:9200", "known:8080"],
+        "labels": {"job": "custom"},
+    } in merged
+
+    again, diff = merge_targets(merged, desired, hosts, prune=True)
+    assert again == merged
+    assert diff == {"added": [], "updated": [], "removed": []}
@@ -1,24 +1,38 @@
 """Unit tests for Redis service utilities."""
 
+import asyncio
 from unittest import mock
 
 import pytest
 
-from app.utils.redis_service import get_cache, get_redis_client, set_cache
+from app.utils.redis_service import (
+    REDIS_MAX_CONNECTIONS,
+    REDIS_POOL_TIMEOUT,
+    get_cache,
+    get_cache_many,
+    get_redis_client,
+    keep_lock_alive,
+    redis_manager,
+    set_cache,
+)
 
 
 @pytest.mark.unit
 @pytest.mark.asyncio
 async def test_get_redis_client_singleton():
     """Test that get_redis_client returns a singleton instance."""
-    fake_instance = mock.AsyncMock()
+    redis_manager.client = None
     with mock.patch(
-        "app.utils.redis_service.aioredis.from_url",
-        new=mock.AsyncMock(return_value=fake_instance),
-    ):
+        "app.utils.redis_service.aioredis.BlockingConnectionPool.from_url"
+    ) as pool_factory:
         client1 = await get_redis_client()
         client2 = await get_redis_client()
     assert client1 is client2
+    pool_factory.assert_called_once()
+    assert pool_factory.call_args.kwargs["max_connections"] == REDIS_MAX_CONNECTIONS
+    assert pool_factory.call_args.kwargs["timeout"] == REDIS_POOL_TIMEOUT
+    redis_manager.client = None
+    redis_manager.pool = None
 
 
 @pytest.mark.unit
@@ -41,3 +55,26 @@ async def test_get_cache(redis_client_mock):
     value = await get_cache(key)
     redis_client_mock.get.assert_awaited_once_with(key)
     assert value == expected_value
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_get_cache_many(redis_client_mock):
+    """Test getting several values from Redis cache with one MGET."""
+    redis_client_mock.mget.return_value = ["first", None]
+    values = await get_cache_many("key_1", "key_2")
+    redis_client_mock.mget.assert_awaited_once_with(("key_1", "key_2"))
+    assert values == ["first", None]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_keep_lock_alive_extends_lock():
+    """Test that a held lock is extended until the keepalive task is cancelled."""
+    lock = mock.AsyncMock()
+    task = asyncio.create_task(keep_lock_alive(lock, 0.01))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert lock.reacquire.await_count >= 2